@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     User, Specialite, Cabinet, Professionnel, ProfessionnelCabinet,
-    MotifConsultation, DisponibiliteHoraire, RendezVous, Favoris
+    MotifConsultation, DisponibiliteHoraire, Creneau, RendezVous, Favoris, Evenement
 )
 
 
@@ -40,6 +40,7 @@ class ProfessionnelAdmin(admin.ModelAdmin):
     list_filter = ['statut_validation', 'specialite', 'accepte_teleconsultation', 'date_inscription']
     search_fields = ['nom', 'prenom', 'email', 'numero_rpps']
     readonly_fields = ['date_inscription']
+    raw_id_fields = ['user']
 
 
 @admin.register(ProfessionnelCabinet)
@@ -63,6 +64,14 @@ class DisponibiliteHoraireAdmin(admin.ModelAdmin):
     search_fields = ['professionnel__nom', 'professionnel__prenom', 'cabinet__nom']
 
 
+@admin.register(Creneau)
+class CreneauAdmin(admin.ModelAdmin):
+    list_display = ['date', 'heure_debut', 'heure_fin', 'professionnel', 'cabinet', 'statut']
+    list_filter = ['statut', 'date']
+    search_fields = ['professionnel__nom', 'professionnel__prenom', 'cabinet__nom']
+    date_hierarchy = 'date'
+
+
 @admin.register(RendezVous)
 class RendezVousAdmin(admin.ModelAdmin):
     list_display = ['date', 'heure_debut', 'patient', 'professionnel', 'cabinet', 'statut', 'mode']
@@ -79,3 +88,10 @@ class FavorisAdmin(admin.ModelAdmin):
     list_filter = ['date_ajout']
     search_fields = ['patient__username', 'professionnel__nom', 'professionnel__prenom']
     readonly_fields = ['date_ajout']
+
+
+@admin.register(Evenement)
+class EvenementAdmin(admin.ModelAdmin):
+    list_display = ['id', 'type', 'statut', 'tentatives', 'prochain_essai', 'date_creation', 'date_traitement']
+    list_filter = ['statut', 'type']
+    readonly_fields = ['date_creation', 'date_traitement']
@@ -0,0 +1,233 @@
+"""
+Statistiques des rendez-vous pour les tableaux de bord (professionnel, admin).
+
+Les compteurs viennent de requêtes GROUP BY (période, dimension, statut, mode) :
+sur les agrégats quotidiens StatistiqueJour pour les jours couverts par
+refresh_rollups (voir rollups.py), sur RendezVous pour les suivants et pour les
+jours signalés modifiés depuis. La capacité vient des règles DisponibiliteHoraire
+ramenées à un nombre de créneaux par jour de semaine, puis multipliées par le
+nombre de ces jours dans chaque période.
+- montant d'un rendez-vous : tarif du motif, ou tarif_consultation du
+  professionnel pour un motif gratuit
+- chiffre_affaires : rendez-vous terminés ; chiffre_affaires_prevu : confirmés
+- taux_absence : no_show / (terminés + no_show)
+- taux_occupation : rendez-vous non annulés / créneaux offerts. Les règles n'ont
+  pas d'historique : la capacité d'une période passée est celle des règles actuelles
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, When
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .availability import STATUTS_NON_BLOQUANTS, decouper_regles
+from .models import (
+    Cabinet, DisponibiliteHoraire, JourARecalculer, Professionnel, RendezVous, RepereStatistiques,
+    Specialite, StatistiqueJour,
+)
+
+
+PERIODES = ['jour', 'semaine', 'mois']
+# dimension : (champ de RendezVous et de DisponibiliteHoraire, objets des libellés)
+DIMENSIONS = {
+    'professionnel': ('professionnel_id', Professionnel.objects.select_related('specialite')),
+    'cabinet': ('cabinet_id', Cabinet.objects.all()),
+    'specialite': ('professionnel__specialite_id', Specialite.objects.all()),
+}
+DUREE_MAX_JOURS = 3660
+LIGNES_MAX = 20000
+STATUTS = [statut for statut, _ in RendezVous.STATUT_CHOICES]
+MODES = [mode for mode, _ in RendezVous.MODE_CHOICES]
+
+MONTANT = Case(
+    When(motif_consultation__tarif__gt=0, then=F('motif_consultation__tarif')),
+    default=F('professionnel__tarif_consultation'),
+    output_field=DecimalField(max_digits=10, decimal_places=2),
+)
+
+
+def debut_periode(jour, periode):
+    """Premier jour de la période (jour, semaine ISO commençant le lundi, mois) contenant `jour`"""
+    if periode == 'semaine':
+        return jour - timedelta(days=jour.weekday())
+    if periode == 'mois':
+        return jour.replace(day=1)
+    return jour
+
+
+def jours_par_periode(debut, fin, periode):
+    """{début de période: Counter(jour de semaine: nombre de jours)} entre debut et fin inclus"""
+    jours = defaultdict(Counter)
+    jour = debut
+    while jour <= fin:
+        jours[debut_periode(jour, periode)][jour.weekday()] += 1
+        jour += timedelta(days=1)
+    return jours
+
+
+def grouper(queryset, periode, dimension, nombre, valeur):
+    """Lignes (période, clé, statut, mode, nombre, montant) du queryset : une requête GROUP BY"""
+    champs = ['periode', 'statut', 'mode']
+    if periode == 'semaine':
+        queryset = queryset.annotate(periode=TruncWeek('date'))
+    elif periode == 'mois':
+        queryset = queryset.annotate(periode=TruncMonth('date'))
+    else:
+        queryset = queryset.annotate(periode=F('date'))
+    if dimension:
+        queryset = queryset.annotate(cle=F(DIMENSIONS[dimension][0]))
+        champs.append('cle')
+    lignes = queryset.values(*champs).annotate(nombre=nombre, montant=valeur).order_by()
+    return [
+        (ligne['periode'], ligne.get('cle'), ligne['statut'], ligne['mode'], ligne['nombre'], ligne['montant'])
+        for ligne in lignes
+    ]
+
+
+def compter(debut, fin, periode, dimension, filtres, repere):
+    """
+    Lignes de la période : agrégats quotidiens jusqu'au repère de refresh_rollups,
+    rendez-vous ensuite et pour les jours signalés modifiés depuis
+    """
+    rendez_vous = RendezVous.objects.filter(date__range=(debut, fin), **filtres)
+    if repere is None or repere.jusqu_au < debut:
+        return grouper(rendez_vous, periode, dimension, Count('id'), Sum(MONTANT))
+
+    agreges = (debut, min(fin, repere.jusqu_au))
+    a_recalculer = list(JourARecalculer.objects.filter(date__range=agreges).values_list('date', flat=True))
+    lignes = grouper(
+        StatistiqueJour.objects.filter(date__range=agreges, **filtres).exclude(date__in=a_recalculer),
+        periode, dimension, Sum('nombre'), Sum('montant')
+    )
+    if fin > repere.jusqu_au or a_recalculer:
+        rendez_vous = rendez_vous.filter(Q(date__gt=repere.jusqu_au) | Q(date__in=a_recalculer))
+        lignes += grouper(rendez_vous, periode, dimension, Count('id'), Sum(MONTANT))
+    return lignes
+
+
+def capacites(dimension, filtres):
+    """{clé: [créneaux offerts par jour de semaine, lundi d'abord]} d'après les règles actuelles"""
+    champ = DIMENSIONS[dimension][0] if dimension else None
+    regles = defaultdict(list)
+    valeurs = ['professionnel_id', 'cabinet_id', 'jour_semaine', 'heure_debut', 'heure_fin', 'duree_creneau']
+    if champ and champ not in valeurs:
+        valeurs.append(champ)
+    for regle in DisponibiliteHoraire.objects.filter(**filtres).values(*valeurs):
+        cle = regle[champ] if champ else None
+        regles[(cle, regle['professionnel_id'], regle['cabinet_id'], regle['jour_semaine'])].append(
+            (regle['heure_debut'], regle['heure_fin'], regle['duree_creneau'])
+        )
+
+    par_cle = defaultdict(lambda: [0] * 7)
+    for (cle, _, _, jour_semaine), liste in regles.items():
+        par_cle[cle][jour_semaine] += len(decouper_regles(liste))
+    return par_cle
+
+
+def taux(numerateur, denominateur):
+    return round(numerateur / denominateur, 4) if denominateur else None
+
+
+def montant(valeur):
+    return str((valeur or Decimal(0)).quantize(Decimal('0.01')))
+
+
+class Cumul:
+    """Compteurs d'une ligne de résultat (une période et une clé de dimension)"""
+
+    def __init__(self):
+        self.statuts = Counter()
+        self.modes = Counter()
+        self.chiffre_affaires = Decimal(0)
+        self.chiffre_affaires_prevu = Decimal(0)
+        self.capacite = 0
+
+    def ajouter(self, statut, mode, nombre, valeur):
+        self.statuts[statut] += nombre
+        if statut not in STATUTS_NON_BLOQUANTS:
+            self.modes[mode] += nombre
+        if statut == 'termine':
+            self.chiffre_affaires += valeur or 0
+        elif statut == 'confirme':
+            self.chiffre_affaires_prevu += valeur or 0
+
+    def fusionner(self, autre):
+        self.statuts.update(autre.statuts)
+        self.modes.update(autre.modes)
+        self.chiffre_affaires += autre.chiffre_affaires
+        self.chiffre_affaires_prevu += autre.chiffre_affaires_prevu
+        self.capacite += autre.capacite
+
+    def en_dict(self):
+        occupes = sum(n for statut, n in self.statuts.items() if statut not in STATUTS_NON_BLOQUANTS)
+        return {
+            'rendez_vous': sum(self.statuts.values()),
+            'statuts': {statut: self.statuts[statut] for statut in STATUTS},
+            'modes': {mode: self.modes[mode] for mode in MODES},
+            'taux_absence': taux(self.statuts['no_show'], self.statuts['termine'] + self.statuts['no_show']),
+            'chiffre_affaires': montant(self.chiffre_affaires),
+            'chiffre_affaires_prevu': montant(self.chiffre_affaires_prevu),
+            'capacite': self.capacite,
+            'taux_occupation': taux(occupes, self.capacite),
+        }
+
+
+def statistiques(debut, fin, periode='jour', dimension=None, professionnel_id=None, cabinet_id=None, specialite_id=None):
+    """
+    Statistiques par période (et par professionnel, cabinet ou spécialité si `dimension`)
+    des rendez-vous entre debut et fin inclus. Lève ValueError sur des paramètres invalides.
+    """
+    if periode not in PERIODES:
+        raise ValueError(f"periode doit valoir {', '.join(PERIODES)}")
+    if dimension and dimension not in DIMENSIONS:
+        raise ValueError(f"par doit valoir {', '.join(DIMENSIONS)}")
+    if fin < debut or (fin - debut).days > DUREE_MAX_JOURS:
+        raise ValueError(f'Période invalide (fin avant début ou plus de {DUREE_MAX_JOURS} jours)')
+
+    filtres = {}
+    if professionnel_id:
+        filtres['professionnel_id'] = professionnel_id
+    if cabinet_id:
+        filtres['cabinet_id'] = cabinet_id
+    if specialite_id:
+        filtres['professionnel__specialite_id'] = specialite_id
+
+    jours = jours_par_periode(debut, fin, periode)
+    par_cle = capacites(dimension, filtres)
+    if len(jours) * max(len(par_cle), 1) > LIGNES_MAX:
+        raise ValueError('Trop de lignes : réduire la période, choisir une période plus longue ou filtrer')
+
+    cumuls = defaultdict(Cumul)
+    for cle, par_jour in par_cle.items():
+        for periode_debut, nombres in jours.items():
+            cumuls[(periode_debut, cle)].capacite = sum(par_jour[j] * n for j, n in nombres.items())
+    repere = RepereStatistiques.objects.first()
+    for periode_debut, cle, statut, mode, nombre, valeur in compter(debut, fin, periode, dimension, filtres, repere):
+        cumuls[(periode_debut, cle)].ajouter(statut, mode, nombre, valeur)
+
+    total = Cumul()
+    resultats = []
+    for (periode_debut, cle), cumul in sorted(cumuls.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        total.fusionner(cumul)
+        ligne = {'periode': periode_debut.isoformat()}
+        if dimension:
+            ligne[dimension] = cle
+        ligne.update(cumul.en_dict())
+        resultats.append(ligne)
+
+    reponse = {
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        'periode': periode,
+        'par': dimension,
+        'agrege_jusqu_au': repere.jusqu_au.isoformat() if repere else None,
+        'resultats': resultats,
+        'total': total.en_dict(),
+    }
+    if dimension:
+        cles = {cle for _, cle in cumuls if cle is not None}
+        reponse['libelles'] = {
+            cle: str(objet) for cle, objet in DIMENSIONS[dimension][1].in_bulk(cles).items()
+        }
+    return reponse
@@ -1,7 +1,125 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
 from rest_framework.authentication import SessionAuthentication
 
+from .models import Professionnel, User
+from . import cache as reference_cache
+
+
+SESSION_PROFESSIONNEL = 'professionnel_id'
+VERSION_COMPTES = 'comptes_professionnels'
+# Champs du compte mis en cache : ceux lus à chaque requête (permissions, liens au
+# compte). Ni le hachage du mot de passe ni les données personnelles du profil
+CHAMPS_UTILISATEUR_CACHE = {'id', 'username', 'email', 'type_compte', 'is_active', 'is_staff', 'is_superuser', 'is_admin'}
+
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
 
     def enforce_csrf(self, request):
-        return  
+        return
+
+
+def cle_utilisateur(user_id):
+    return f'utilisateur:{user_id}'
+
+
+def oublier_utilisateur(user_id):
+    """Retire le compte du cache (enregistrement, suppression, déconnexion)"""
+    cache.delete(cle_utilisateur(user_id))
+
+
+def compte_pour_cache(user):
+    """Ce qui est mis en cache d'un compte : CHAMPS_UTILISATEUR_CACHE et l'empreinte de session"""
+    return {
+        'champs': {champ: getattr(user, champ) for champ in CHAMPS_UTILISATEUR_CACHE},
+        'empreinte_session': user.get_session_auth_hash(),
+    }
+
+
+def compte_depuis_cache(donnees):
+    """User reconstruit depuis le cache, les autres champs différés (lus en base à la demande)"""
+    champs = [f.attname for f in User._meta.concrete_fields if f.attname in donnees['champs']]
+    user = User.from_db(router.db_for_read(User), champs, [donnees['champs'][champ] for champ in champs])
+    user.empreinte_session = donnees['empreinte_session']
+    return user
+
+
+def utilisateur_complet(user):
+    """Charge en une requête les champs différés d'un compte relu du cache (profil)"""
+    differes = user.get_deferred_fields()
+    if differes:
+        user.refresh_from_db(fields=differes)
+    return user
+
+
+class UtilisateurEnCacheBackend(ModelBackend):
+    """
+    ModelBackend dont get_user, appelé à chaque requête authentifiée pour l'utilisateur
+    de la session, lit le compte dans le cache partagé (UTILISATEUR_CACHE_TTL secondes) :
+    quelques champs et l'empreinte de session, pas le hachage du mot de passe.
+    Le compte caché est retiré à chaque enregistrement (signal post_save, donc aussi
+    au changement de mot de passe ou à la désactivation) et à la déconnexion.
+    CACHE_BACKEND=locmem, propre à chaque processus, est refusé par gunicorn.conf.py
+    avec plusieurs workers.
+    """
+
+    def get_user(self, user_id):
+        donnees = cache.get(cle_utilisateur(user_id))
+        if donnees is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(cle_utilisateur(user_id), compte_pour_cache(user), settings.UTILISATEUR_CACHE_TTL)
+        else:
+            user = compte_depuis_cache(donnees)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        donnees = await cache.aget(cle_utilisateur(user_id))
+        if donnees is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(cle_utilisateur(user_id), compte_pour_cache(user), settings.UTILISATEUR_CACHE_TTL)
+        else:
+            user = compte_depuis_cache(donnees)
+        return user if self.user_can_authenticate(user) else None
+
+
+def lier_professionnel(user):
+    """
+    Identifiant du professionnel lié au compte, ou None.
+    Un professionnel créé sans compte (admin, import) est relié par email au premier accès.
+    """
+    professionnel_id = Professionnel.objects.filter(user=user).values_list('id', flat=True).first()
+    if professionnel_id is None and user.email:
+        professionnel_id = Professionnel.objects.filter(
+            user__isnull=True, email__iexact=user.email
+        ).values_list('id', flat=True).first()
+        if professionnel_id is not None:
+            Professionnel.objects.filter(id=professionnel_id).update(user=user)
+    return professionnel_id
+
+
+def professionnel_connecte(request):
+    """
+    Identifiant du professionnel de l'utilisateur connecté, calculé une fois par session.
+    L'identifiant, ou l'absence de professionnel, est mémorisé avec la version
+    VERSION_COMPTES et recalculé quand un professionnel est créé, modifié ou supprimé.
+    """
+    if not request.user.is_authenticated:
+        return None
+    memo = request.session.get(SESSION_PROFESSIONNEL)
+    version = reference_cache.version(VERSION_COMPTES)
+    if memo and memo['version'] == version:
+        return memo['id']
+    professionnel_id = lier_professionnel(request.user)
+    request.session[SESSION_PROFESSIONNEL] = {'id': professionnel_id, 'version': version}
+    return professionnel_id
+
+
+def oublier_professionnel(request):
+    """Force le recalcul du professionnel de la session (profil modifié)"""
+    request.session.pop(SESSION_PROFESSIONNEL, None)
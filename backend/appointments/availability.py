@@ -0,0 +1,178 @@
+"""
+Calcul des créneaux libres d'un professionnel à partir de ses disponibilités
+horaires (DisponibiliteHoraire) et de ses rendez-vous déjà pris (RendezVous).
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+from .models import DisponibiliteHoraire, RendezVous
+
+
+STATUTS_NON_BLOQUANTS = ['annule']
+
+
+def en_minutes(heure):
+    """Convertit un objet time en minutes depuis minuit"""
+    return heure.hour * 60 + heure.minute
+
+
+def depuis_minutes(minutes):
+    """Convertit des minutes depuis minuit en objet time"""
+    return time(minutes // 60, minutes % 60)
+
+
+def format_minutes(minutes):
+    """Convertit des minutes depuis minuit en chaîne HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def decouper_regles(regles):
+    """
+    Découpe les règles (heure_debut, heure_fin, duree_creneau) en créneaux
+    (debut, fin) exprimés en minutes, triés et sans doublon de début.
+    """
+    creneaux = {}
+    for heure_debut, heure_fin, duree in regles:
+        debut = en_minutes(heure_debut)
+        fin = en_minutes(heure_fin)
+        while debut + duree <= fin:
+            creneaux.setdefault(debut, debut + duree)
+            debut += duree
+    return sorted(creneaux.items())
+
+
+def fusionner_intervalles(intervalles):
+    """Fusionne des intervalles (debut, fin) en minutes en intervalles disjoints triés"""
+    fusion = []
+    for debut, fin in sorted(intervalles):
+        if fusion and debut < fusion[-1][1]:
+            if fin > fusion[-1][1]:
+                fusion[-1][1] = fin
+        else:
+            fusion.append([debut, fin])
+    return fusion
+
+
+def est_occupe(occupes, debut, fin):
+    """Indique si (debut, fin) chevauche l'un des intervalles disjoints triés"""
+    i = bisect_right(occupes, [debut, float('inf')]) - 1
+    if i >= 0 and occupes[i][1] > debut:
+        return True
+    return i + 1 < len(occupes) and occupes[i + 1][0] < fin
+
+
+def soustraire_intervalles(creneaux, occupes):
+    """
+    Retire les créneaux qui chevauchent un intervalle occupé.
+    Les deux listes sont triées : un seul balayage suffit.
+    """
+    occupes = fusionner_intervalles(occupes)
+    libres = []
+    i = 0
+    for debut, fin in creneaux:
+        while i < len(occupes) and occupes[i][1] <= debut:
+            i += 1
+        if i < len(occupes) and occupes[i][0] < fin:
+            continue
+        libres.append((debut, fin))
+    return libres
+
+
+def calculer_creneaux_libres(regles, reservations, apres=None):
+    """
+    Calcule les créneaux libres d'une journée.
+    - regles : itérable de (heure_debut, heure_fin, duree_creneau)
+    - reservations : itérable de (heure_debut, heure_fin)
+    - apres : heure (time) avant laquelle les créneaux sont ignorés
+    """
+    creneaux = decouper_regles(regles)
+    occupes = [(en_minutes(debut), en_minutes(fin)) for debut, fin in reservations]
+    libres = soustraire_intervalles(creneaux, occupes)
+    if apres is not None:
+        limite = en_minutes(apres)
+        libres = [(debut, fin) for debut, fin in libres if debut >= limite]
+    return libres
+
+
+def calculer_creneaux_jour(professionnel_id, jour, cabinet_id=None):
+    """
+    Renvoie la liste des créneaux libres (HH:MM) d'un professionnel pour une date.
+    Coûte deux requêtes quel que soit le nombre de règles ou de rendez-vous.
+    """
+    maintenant = timezone.localtime()
+    if jour < maintenant.date():
+        return []
+    apres = maintenant.time() if jour == maintenant.date() else None
+
+    regles = DisponibiliteHoraire.objects.filter(
+        professionnel_id=professionnel_id,
+        jour_semaine=jour.weekday()
+    )
+    if cabinet_id:
+        regles = regles.filter(cabinet_id=cabinet_id)
+    regles = regles.values_list('heure_debut', 'heure_fin', 'duree_creneau')
+
+    reservations = RendezVous.objects.filter(
+        professionnel_id=professionnel_id,
+        date=jour
+    ).exclude(
+        statut__in=STATUTS_NON_BLOQUANTS
+    ).values_list('heure_debut', 'heure_fin')
+
+    libres = calculer_creneaux_libres(list(regles), list(reservations), apres=apres)
+    return [format_minutes(debut) for debut, fin in libres]
+
+
+def calculer_creneaux_periode(professionnel_ids, date_debut, date_fin, cabinet_id=None):
+    """
+    Calcule les créneaux libres de plusieurs professionnels sur une période
+    (bornes incluses). Deux requêtes au total : les règles et les rendez-vous
+    sont chargés en bloc puis le calcul se fait en mémoire.
+    Renvoie {professionnel_id: {date ISO: [HH:MM, ...]}} sans les jours vides.
+    """
+    maintenant = timezone.localtime()
+    date_debut = max(date_debut, maintenant.date())
+    resultat = {professionnel_id: {} for professionnel_id in professionnel_ids}
+    if date_debut > date_fin or not professionnel_ids:
+        return resultat
+
+    regles = DisponibiliteHoraire.objects.filter(professionnel_id__in=professionnel_ids)
+    if cabinet_id:
+        regles = regles.filter(cabinet_id=cabinet_id)
+    regles_par_jour = defaultdict(list)
+    for professionnel_id, jour_semaine, debut, fin, duree in regles.values_list(
+        'professionnel_id', 'jour_semaine', 'heure_debut', 'heure_fin', 'duree_creneau'
+    ):
+        regles_par_jour[(professionnel_id, jour_semaine)].append((debut, fin, duree))
+
+    # Un modèle de créneaux par (professionnel, jour de semaine), réutilisé pour chaque date
+    modeles = {cle: decouper_regles(valeurs) for cle, valeurs in regles_par_jour.items()}
+    if not modeles:
+        return resultat
+
+    reservations = defaultdict(list)
+    for professionnel_id, jour, debut, fin in RendezVous.objects.filter(
+        professionnel_id__in={cle[0] for cle in modeles},
+        date__range=(date_debut, date_fin)
+    ).exclude(
+        statut__in=STATUTS_NON_BLOQUANTS
+    ).values_list('professionnel_id', 'date', 'heure_debut', 'heure_fin'):
+        reservations[(professionnel_id, jour)].append((en_minutes(debut), en_minutes(fin)))
+
+    limite_aujourdhui = en_minutes(maintenant.time())
+    jour = date_debut
+    while jour <= date_fin:
+        for professionnel_id in professionnel_ids:
+            creneaux = modeles.get((professionnel_id, jour.weekday()))
+            if not creneaux:
+                continue
+            libres = soustraire_intervalles(creneaux, reservations.get((professionnel_id, jour), []))
+            if jour == maintenant.date():
+                libres = [(debut, fin) for debut, fin in libres if debut >= limite_aujourdhui]
+            if libres:
+                resultat[professionnel_id][jour.isoformat()] = [format_minutes(debut) for debut, fin in libres]
+        jour += timedelta(days=1)
+    return resultat
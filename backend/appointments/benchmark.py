@@ -0,0 +1,362 @@
+"""
+Banc d'essai des chemins critiques : recherche, proximité, disponibilités, réservation, listes, connexion.
+
+Un scénario est une requête HTTP construite à partir du contexte (patient,
+professionnel, dates, créneaux libres...) lu dans la base. Deux exécutants :
+- ExecutantClient : client de test Django dans le processus ; les requêtes SQL
+  sont comptées par profiling.Mesureur
+- ExecutantHttp : serveur réel (gunicorn...) via urllib, avec des sessions
+  ouvertes comme force_login ; les requêtes SQL sont lues dans l'en-tête
+  Server-Timing (PROFILAGE_ECHANTILLON=1 côté serveur)
+BUDGETS_REQUETES borne le nombre de requêtes SQL de chaque scénario : la
+commande benchmark et les tests échouent s'il est dépassé. mesurer_connexion()
+isole le coût d'ouverture des connexions selon CONN_MAX_AGE et le pool.
+"""
+import itertools
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+
+from . import hashers
+from .geo import RAYON_MAX_KM
+from .models import User, Professionnel, MotifConsultation, DisponibiliteHoraire, Creneau, RendezVous, Evenement
+from .pagination import encoder_curseur
+from .profiling import Mesureur, centile
+
+
+# Paramètres de generer_donnees par échelle (nombre approximatif de rendez-vous)
+ECHELLES = {
+    '1k': {'patients': 500, 'professionnels': 5, 'cabinets': 3, 'semaines': 8, 'graine': 1001},
+    '100k': {'patients': 20000, 'professionnels': 400, 'cabinets': 150, 'semaines': 10, 'graine': 100001},
+    '1m': {'patients': 100000, 'professionnels': 2000, 'cabinets': 800, 'semaines': 20, 'graine': 1000001},
+}
+
+PAGE = 50
+ORDRE_PATIENT = ['-date', '-heure_debut', '-id']
+# Mot de passe des comptes de generer_donnees
+MOT_DE_PASSE = 'password123'
+
+# Les ordres de transaction comptent : BEGIN hors tests, SAVEPOINT et RELEASE dans les tests
+BUDGETS_REQUETES = {
+    'professionnels_ville': 2,
+    'professionnels_recherche': 2,
+    # Rayon élargi de RAYON_INITIAL_KM à RAYON_MAX_KM (8 requêtes au plus), puis professionnels et cabinets
+    'professionnels_proximite': 10,
+    'disponibilites_jour': 3,
+    'disponibilites_periode': 3,
+    'rendez_vous_patient': 4,
+    'rendez_vous_patient_page_2': 4,
+    'admin_rendez_vous': 4,
+    'admin_clients': 3,
+    'create_rendez_vous': 16,
+    'connexion': 9,
+}
+
+
+def reservation(contexte, i):
+    creneau = contexte['creneaux'][i % len(contexte['creneaux'])]
+    return '/api/rendez-vous/create/', creneau
+
+
+# (nom, méthode, rôle de l'utilisateur connecté, construction (url, paramètres))
+SCENARIOS = [
+    ('professionnels_ville', 'GET', None, lambda c, i: ('/api/professionnels/', {'ville': c['ville']})),
+    ('professionnels_recherche', 'GET', None, lambda c, i: ('/api/professionnels/', {'q': c['recherche']})),
+    # Pire cas : rayon maximal sans k, limité aux PROXIMITE_K_MAX plus proches
+    ('professionnels_proximite', 'GET', None, lambda c, i: ('/api/professionnels/proximite/', {
+        **c['position'], 'rayon_km': RAYON_MAX_KM,
+    })),
+    ('disponibilites_jour', 'GET', None, lambda c, i: (
+        f"/api/professionnels/{c['professionnel_id']}/disponibilites/", {'date': c['jour'].isoformat()}
+    )),
+    ('disponibilites_periode', 'GET', None, lambda c, i: ('/api/professionnels/disponibilites/', {
+        'ids': ','.join(map(str, c['professionnel_ids'])),
+        'date_debut': c['jour'].isoformat(),
+        'date_fin': (c['jour'] + timedelta(days=6)).isoformat(),
+    })),
+    ('rendez_vous_patient', 'GET', 'patient', lambda c, i: ('/api/rendez-vous/', {'page_size': PAGE})),
+    ('rendez_vous_patient_page_2', 'GET', 'patient', lambda c, i: (
+        '/api/rendez-vous/', {'page_size': PAGE, 'cursor': c['curseur_patient']}
+    )),
+    ('admin_rendez_vous', 'GET', 'admin', lambda c, i: ('/api/admin/rendez-vous/', {'page_size': PAGE})),
+    ('admin_clients', 'GET', 'admin', lambda c, i: ('/api/admin/clients/', {'page_size': PAGE})),
+    ('create_rendez_vous', 'POST', 'patient', reservation),
+    ('connexion', 'POST', 'connexion', lambda c, i: (
+        '/api/login/', {'username': c['utilisateurs']['patient'].username, 'password': MOT_DE_PASSE}
+    )),
+]
+
+
+def preparer_contexte(reservations):
+    """
+    Contexte des scénarios, lu dans la base : patient ayant le plus de rendez-vous,
+    professionnel validé ayant des règles horaires, `reservations` créneaux libres à venir.
+    """
+    aujourdhui = timezone.localdate()
+    patient_id = (
+        RendezVous.objects.values('patient_id').annotate(n=Count('id')).order_by('-n')
+        .values_list('patient_id', flat=True).first()
+    )
+    regle = DisponibiliteHoraire.objects.filter(
+        professionnel__statut_validation='valide'
+    ).select_related('professionnel', 'professionnel__specialite', 'cabinet').order_by('id').first()
+    if patient_id is None or regle is None:
+        raise ValueError('Base vide : générer des données (generer_donnees ou --preparer)')
+
+    admin, _ = User.objects.get_or_create(username='benchmark-admin', defaults={'is_admin': True})
+    rendez_vous_patient = RendezVous.objects.filter(patient_id=patient_id).order_by(*ORDRE_PATIENT)
+    dernier = rendez_vous_patient.values_list('date', 'heure_debut', 'id')[PAGE - 1:PAGE].first()
+
+    motifs = {}
+    for motif_id, specialite_id in MotifConsultation.objects.order_by('-id').values_list('id', 'specialite_id'):
+        motifs[specialite_id] = motif_id
+    creneaux = [
+        {
+            'professionnel_id': professionnel_id, 'cabinet_id': cabinet_id,
+            'motif_consultation_id': motifs.get(specialite_id, next(iter(motifs.values()))),
+            'date': jour.isoformat(), 'heure_debut': heure_debut.strftime('%H:%M'),
+        }
+        for professionnel_id, cabinet_id, specialite_id, jour, heure_debut in Creneau.objects.filter(
+            statut='libre', date__gt=aujourdhui
+        ).order_by('date', 'heure_debut', 'id').values_list(
+            'professionnel_id', 'cabinet_id', 'professionnel__specialite_id', 'date', 'heure_debut'
+        )[:reservations]
+    ]
+
+    jour = aujourdhui + timedelta(days=(regle.jour_semaine - aujourdhui.weekday() - 1) % 7 + 1)
+    return {
+        'utilisateurs': {'patient': User.objects.get(id=patient_id), 'admin': admin},
+        'professionnel_id': regle.professionnel_id,
+        'professionnel_ids': list(
+            Professionnel.objects.filter(statut_validation='valide').order_by('id').values_list('id', flat=True)[:20]
+        ),
+        'ville': regle.cabinet.ville,
+        'position': {'lat': str(regle.cabinet.latitude or 0), 'lng': str(regle.cabinet.longitude or 0)},
+        'recherche': regle.professionnel.specialite.nom[:6],
+        'jour': jour,
+        'curseur_patient': encoder_curseur(list(dernier)) if dernier else '',
+        'creneaux': creneaux,
+    }
+
+
+def hote_autorise():
+    """Premier nom de ALLOWED_HOSTS utilisable comme Host (hors du lanceur de tests, 'testserver' est refusé)"""
+    for hote in settings.ALLOWED_HOSTS:
+        if hote and '*' not in hote and not hote.startswith('.'):
+            return hote
+    return 'localhost'
+
+
+class ExecutantClient:
+    """Client de test Django dans le processus : (statut, requêtes SQL, corps JSON)"""
+
+    concurrence_max = 1
+
+    def __init__(self, utilisateurs):
+        hote = hote_autorise()
+        # 'connexion' : client anonyme dédié, que le scénario de connexion authentifie
+        self.clients = {None: Client(SERVER_NAME=hote), 'connexion': Client(SERVER_NAME=hote)}
+        for role, utilisateur in utilisateurs.items():
+            self.clients[role] = Client(SERVER_NAME=hote)
+            self.clients[role].force_login(utilisateur)
+
+    def executer(self, role, methode, url, donnees):
+        client = self.clients[role]
+        mesureur = Mesureur()
+        with connection.execute_wrapper(mesureur):
+            if methode == 'GET':
+                response = client.get(url, donnees)
+            else:
+                response = client.post(url, json.dumps(donnees), content_type='application/json')
+        corps = response.json() if response.get('Content-Type', '').startswith('application/json') else None
+        return response.status_code, len(mesureur.requetes), corps
+
+
+class ExecutantHttp:
+    """Serveur HTTP réel ; les requêtes SQL viennent de Server-Timing (None si non échantillonnée)"""
+
+    concurrence_max = None
+    REQUETES = re.compile(r'db;desc="(\d+) requetes"')
+
+    def __init__(self, url_base, utilisateurs):
+        self.url_base = url_base.rstrip('/')
+        self.cookies = {None: '', 'connexion': ''}
+        for role, utilisateur in utilisateurs.items():
+            client = Client()
+            client.force_login(utilisateur)
+            self.cookies[role] = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def executer(self, role, methode, url, donnees):
+        if methode == 'GET':
+            requete = urllib.request.Request(f'{self.url_base}{url}?{urlencode(donnees)}')
+        else:
+            requete = urllib.request.Request(
+                f'{self.url_base}{url}', data=json.dumps(donnees).encode(),
+                headers={'Content-Type': 'application/json'}, method=methode
+            )
+        if self.cookies[role]:
+            requete.add_header('Cookie', self.cookies[role])
+        try:
+            with urllib.request.urlopen(requete, timeout=60) as response:
+                statut, entetes, brut = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            statut, entetes, brut = e.code, e.headers, e.read()
+        trouve = self.REQUETES.search(entetes.get('Server-Timing', ''))
+        corps = json.loads(brut) if entetes.get('Content-Type', '').startswith('application/json') else None
+        return statut, int(trouve.group(1)) if trouve else None, corps
+
+
+def mesurer(executant, scenario, contexte, iterations, echauffement=3, concurrence=1):
+    """
+    Exécute un scénario ; renvoie ses statistiques (débit, latences en ms, requêtes SQL
+    au maximum, erreurs) et les ids des rendez-vous créés, à passer à nettoyer().
+    """
+    nom, methode, role, construire = scenario
+    indices = itertools.count()
+    crees = []
+
+    def une_requete():
+        url, donnees = construire(contexte, next(indices))
+        debut = time.perf_counter()
+        statut, requetes, corps = executant.executer(role, methode, url, donnees)
+        duree = time.perf_counter() - debut
+        if methode == 'POST' and statut == 201:
+            crees.append(corps['id'])
+        return duree, statut, requetes
+
+    for _ in range(echauffement):
+        une_requete()
+    if executant.concurrence_max is not None:
+        concurrence = min(concurrence, executant.concurrence_max)
+
+    debut = time.perf_counter()
+    if concurrence > 1:
+        with ThreadPoolExecutor(concurrence) as pool:
+            resultats = list(pool.map(lambda _: une_requete(), range(iterations)))
+    else:
+        resultats = [une_requete() for _ in range(iterations)]
+    duree = time.perf_counter() - debut
+
+    latences = sorted(latence * 1000 for latence, _, _ in resultats)
+    requetes = [n for _, _, n in resultats if n is not None]
+    return {
+        'iterations': iterations,
+        'concurrence': concurrence,
+        'erreurs': sum(1 for _, statut, _ in resultats if statut >= 400),
+        'debit_rps': round(iterations / duree, 1),
+        'latence_ms': {
+            **{f'p{p}': round(centile(latences, p), 2) for p in (50, 95, 99)},
+            'max': round(latences[-1], 2),
+        },
+        'requetes': max(requetes) if requetes else None,
+        'budget_requetes': BUDGETS_REQUETES.get(nom),
+    }, crees
+
+
+def nettoyer(rendez_vous_ids):
+    """Supprime les rendez-vous créés par le banc d'essai et leurs événements d'outbox"""
+    Evenement.objects.filter(type='rendez_vous_cree', donnees__rendez_vous_id__in=rendez_vous_ids).delete()
+    for rdv in RendezVous.objects.filter(id__in=rendez_vous_ids):
+        rdv.delete()
+
+
+def mesurer_connexion(iterations):
+    """
+    Coût de l'accès à la base par requête HTTP avec la configuration courante
+    (CONN_MAX_AGE, pool) : chaque itération rejoue le cycle de Django, dont les
+    signaux request_started / request_finished ferment, conservent ou rendent au
+    pool la connexion, autour d'un SELECT 1. Renvoie latences (ms) et nombre de
+    connexions obtenues : ouvertes, ou reprises du pool (connection_created).
+    """
+    obtenues = []
+
+    def compter(sender, connection, **kwargs):
+        obtenues.append(connection.alias)
+
+    latences = []
+    connection_created.connect(compter)
+    try:
+        for _ in range(iterations):
+            request_started.send(sender=None)
+            debut = time.perf_counter()
+            with connection.cursor() as curseur:
+                curseur.execute('SELECT 1')
+            latences.append((time.perf_counter() - debut) * 1000)
+            request_finished.send(sender=None)
+    finally:
+        connection_created.disconnect(compter)
+
+    latences.sort()
+    return {
+        'iterations': iterations,
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+        'pool': bool(connection.settings_dict['OPTIONS'].get('pool')),
+        'connexions_obtenues': len(obtenues),
+        'latence_ms': {f'p{p}': round(centile(latences, p), 2) for p in (50, 95, 99)},
+    }
+
+
+def mesurer_hachage(iterations, processus):
+    """
+    Débit de vérification des mots de passe avec l'algorithme et le coût courants, par
+    un pool de `processus` processus comme celui de la connexion : connexions/s au
+    total et par cœur occupé (un processus par cœur au plus).
+    """
+    coeurs = min(processus, len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count())
+    encode = make_password(MOT_DE_PASSE)
+    with hashers.creer_pool(processus) as pool:
+        list(pool.map(hashers.verifier, [MOT_DE_PASSE] * processus, [encode] * processus))
+        debut = time.perf_counter()
+        valides = [valide for valide, _ in pool.map(
+            hashers.verifier, [MOT_DE_PASSE] * iterations, [encode] * iterations
+        )]
+        duree = time.perf_counter() - debut
+    if not all(valides):
+        raise ValueError('Vérification du mot de passe en échec')
+    return {
+        'algorithme': identify_hasher(encode).algorithm,
+        'processus': processus,
+        'iterations': iterations,
+        'connexions_s': round(iterations / duree, 1),
+        'connexions_s_par_coeur': round(iterations / duree / coeurs, 1),
+        'ms_par_verification': round(duree * 1000 * coeurs / iterations, 1),
+    }
+
+
+def depassements(resultats):
+    """Scénarios dont le nombre de requêtes SQL dépasse le budget"""
+    return [
+        f"{nom} : {r['requetes']} requêtes (budget {r['budget_requetes']})"
+        for nom, r in resultats.items()
+        if r['requetes'] is not None and r['budget_requetes'] is not None and r['requetes'] > r['budget_requetes']
+    ]
+
+
+def regressions(resultats, reference, tolerance):
+    """Scénarios plus lents (p95) que la référence au-delà de la tolérance, ou plus bavards"""
+    trouvees = []
+    for nom, r in resultats.items():
+        ancien = reference.get(nom)
+        if not ancien:
+            continue
+        if r['latence_ms']['p95'] > ancien['latence_ms']['p95'] * (1 + tolerance):
+            trouvees.append(f"{nom} : p95 {r['latence_ms']['p95']} ms (référence {ancien['latence_ms']['p95']} ms)")
+        if r['requetes'] is not None and ancien.get('requetes') is not None and r['requetes'] > ancien['requetes']:
+            trouvees.append(f"{nom} : {r['requetes']} requêtes (référence {ancien['requetes']})")
+    return trouvees
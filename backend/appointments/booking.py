@@ -0,0 +1,111 @@
+"""
+Réservation d'un créneau sans double réservation.
+
+Les réservations d'un même professionnel pour une même date sont sérialisées :
+- PostgreSQL : verrou consultatif de transaction sur (professionnel, date)
+- autres bases : verrou de ligne sur le professionnel (select_for_update) ;
+  SQLite verrouille déjà toute la base en écriture (transaction_mode IMMEDIATE)
+La contrainte en base reste le dernier rempart en cas de chemin concurrent.
+"""
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction, IntegrityError
+
+from .availability import STATUTS_NON_BLOQUANTS
+from .models import Professionnel, DisponibiliteHoraire, RendezVous
+from .outbox import publier
+
+
+class CreneauIndisponible(Exception):
+    """Le créneau demandé chevauche un rendez-vous existant"""
+
+
+def calculer_heure_fin(professionnel, cabinet, jour, heure_debut, motif_consultation=None):
+    """
+    Déduit l'heure de fin d'un rendez-vous : durée du créneau de la règle
+    horaire qui contient heure_debut, sinon durée estimée du motif.
+    """
+    regle = DisponibiliteHoraire.objects.filter(
+        professionnel=professionnel,
+        cabinet=cabinet,
+        jour_semaine=jour.weekday(),
+        heure_debut__lte=heure_debut,
+        heure_fin__gt=heure_debut
+    ).only('duree_creneau').first()
+    if regle:
+        duree = regle.duree_creneau
+    elif motif_consultation:
+        duree = motif_consultation.duree_estimee
+    else:
+        raise ValueError('Durée du rendez-vous inconnue')
+
+    fin = datetime.combine(jour, heure_debut) + timedelta(minutes=duree)
+    if fin.date() != jour:
+        raise ValueError('Le rendez-vous dépasse minuit')
+    return fin.time()
+
+
+def verrouiller_agenda(professionnel_id, jour):
+    """Pose un verrou sur l'agenda du professionnel pour la date, jusqu'à la fin de la transaction"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)',
+                [professionnel_id, jour.toordinal()]
+            )
+    else:
+        Professionnel.objects.select_for_update().filter(id=professionnel_id).exists()
+
+
+def chevauchements(professionnel_id, jour, heure_debut, heure_fin):
+    """Rendez-vous non annulés qui chevauchent l'intervalle demandé"""
+    return RendezVous.objects.filter(
+        professionnel_id=professionnel_id,
+        date=jour,
+        heure_debut__lt=heure_fin,
+        heure_fin__gt=heure_debut
+    ).exclude(statut__in=STATUTS_NON_BLOQUANTS)
+
+
+def reserver_creneau(**donnees):
+    """
+    Crée un rendez-vous confirmé si le créneau est libre, avec son événement d'outbox.
+    Lève CreneauIndisponible en cas de conflit.
+    """
+    professionnel_id = donnees['professionnel'].id
+    jour = donnees['date']
+    try:
+        with transaction.atomic():
+            verrouiller_agenda(professionnel_id, jour)
+            if chevauchements(professionnel_id, jour, donnees['heure_debut'], donnees['heure_fin']).exists():
+                raise CreneauIndisponible()
+            rdv = RendezVous.objects.create(statut='confirme', **donnees)
+            publier('rendez_vous_cree', rendez_vous_id=rdv.id)
+            return rdv
+    except IntegrityError as e:
+        if chevauchements(professionnel_id, jour, donnees['heure_debut'], donnees['heure_fin']).exists():
+            raise CreneauIndisponible() from e
+        raise
+
+
+def changer_statut(rdv, statut, par):
+    """
+    Change le statut d'un rendez-vous avec son événement d'outbox. Un rendez-vous annulé
+    qui redevient bloquant (confirme, ...) repasse par le verrou d'agenda et le contrôle
+    de chevauchement ; lève CreneauIndisponible si le créneau a été repris entre-temps.
+    """
+    reprise = rdv.statut in STATUTS_NON_BLOQUANTS and statut not in STATUTS_NON_BLOQUANTS
+    rdv.statut = statut
+    try:
+        with transaction.atomic():
+            if reprise:
+                verrouiller_agenda(rdv.professionnel_id, rdv.date)
+                if chevauchements(rdv.professionnel_id, rdv.date, rdv.heure_debut, rdv.heure_fin).exclude(id=rdv.id).exists():
+                    raise CreneauIndisponible()
+            rdv.save()
+            publier('rendez_vous_statut', rendez_vous_id=rdv.id, statut=statut, par=par)
+    except IntegrityError as e:
+        if reprise:
+            raise CreneauIndisponible() from e
+        raise
+    return rdv
@@ -0,0 +1,126 @@
+"""
+Insertion en masse de lignes sans instancier de modèles.
+
+Pour des millions de lignes, bulk_create passe l'essentiel de son temps à
+construire les instances et à compiler chaque valeur. Ici les lignes sont des
+tuples dans l'ordre des champs donnés :
+- PostgreSQL : COPY FROM STDIN (psycopg 3 ou psycopg2)
+- autres bases : INSERT préparé exécuté par executemany, par lots
+Aucun signal n'est envoyé : à l'appelant de mettre à jour ce qui en dépend.
+
+index_suspendus() retire les index secondaires d'une table le temps d'un gros
+chargement : les reconstruire en une passe triée est bien plus rapide que de
+les maintenir ligne à ligne.
+"""
+import io
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+
+from django.db import connection, models
+
+
+TAILLE_LOT = 20000
+
+
+def preparateur(champ):
+    """Conversion Python -> base d'une colonne, mémorisée pour les types à peu de valeurs distinctes"""
+    if isinstance(champ, (models.DateField, models.TimeField, models.DecimalField)):
+        return lru_cache(maxsize=4096)(lambda valeur: champ.get_db_prep_save(valeur, connection))
+    return None
+
+
+def texte_copy(valeur):
+    """Valeur au format texte de COPY"""
+    if valeur is None:
+        return '\\N'
+    return str(valeur).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copier(cursor, table, colonnes, lot):
+    requete = f"COPY {table} ({', '.join(colonnes)}) FROM STDIN"
+    brut = cursor.cursor
+    if hasattr(brut, 'copy'):
+        with brut.copy(requete) as copie:
+            for ligne in lot:
+                copie.write_row(ligne)
+    else:
+        tampon = io.StringIO()
+        for ligne in lot:
+            tampon.write('\t'.join(texte_copy(valeur) for valeur in ligne))
+            tampon.write('\n')
+        tampon.seek(0)
+        brut.copy_expert(requete, tampon)
+
+
+def inserer_en_masse(modele, champs, lignes, taille_lot=TAILLE_LOT):
+    """
+    Insère les lignes (itérable de tuples, valeurs dans l'ordre de `champs`).
+    Les lignes sont consommées par lots : un générateur garde la mémoire constante.
+    Renvoie le nombre de lignes insérées.
+    """
+    champs_modele = [modele._meta.get_field(nom) for nom in champs]
+    table = connection.ops.quote_name(modele._meta.db_table)
+    colonnes = [connection.ops.quote_name(champ.column) for champ in champs_modele]
+    preparateurs = [(i, preparer) for i, preparer in enumerate(map(preparateur, champs_modele)) if preparer]
+    insertion = f"INSERT INTO {table} ({', '.join(colonnes)}) VALUES ({', '.join(['%s'] * len(colonnes))})"
+
+    total = 0
+    lignes = iter(lignes)
+    with connection.cursor() as cursor:
+        while True:
+            lot = list(islice(lignes, taille_lot))
+            if not lot:
+                break
+            if preparateurs:
+                lot = [list(ligne) for ligne in lot]
+                for ligne in lot:
+                    for i, preparer in preparateurs:
+                        ligne[i] = preparer(ligne[i])
+            if connection.vendor == 'postgresql':
+                copier(cursor, table, colonnes, lot)
+            else:
+                cursor.executemany(insertion, lot)
+            total += len(lot)
+    return total
+
+
+def definitions_index(table):
+    """Ordres CREATE INDEX des index secondaires (hors clé primaire et contraintes) de la table"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN '
+                '(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)',
+                [table, table]
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [table]
+            )
+        else:
+            return []
+        return cursor.fetchall()
+
+
+@contextmanager
+def index_suspendus(modele):
+    """
+    Supprime les index secondaires de la table du modèle, puis les recrée en sortie.
+    À utiliser dans une transaction : les index uniques ne sont vérifiés qu'à la recréation.
+    """
+    index = definitions_index(modele._meta.db_table)
+    with connection.cursor() as cursor:
+        for nom, _ in index:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(nom)}')
+    yield
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Les clés étrangères sont DEFERRABLE : leurs vérifications en attente
+            # interdiraient CREATE INDEX sur la table dans la même transaction
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for _, definition in index:
+            cursor.execute(definition)
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
@@ -0,0 +1,111 @@
+"""
+Cache des données de référence (spécialités, cabinets, motifs).
+
+Deux niveaux :
+- local au processus, valable REFERENCE_CACHE_TTL_LOCAL secondes sans aucun accès externe
+- partagé (CACHES['default'] : fichier ou base selon CACHE_BACKEND ; locmem ne
+  convient qu'à un seul processus, les versions n'y seraient pas partagées)
+Chaque jeu de données a un compteur de version dans le cache partagé, incrémenté
+par les signaux post_save/post_delete. L'ETag est une empreinte du contenu :
+un If-None-Match valide renvoie 304 sans requête en base.
+Les vues sont asynchrones : l'entrée locale est servie sans quitter la boucle
+d'événements, le cache partagé et la base passent par un thread.
+"""
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotModified, JsonResponse
+
+
+_local = {}
+
+
+def cle_version(nom):
+    return f'reference:{nom}:version'
+
+
+def version(nom):
+    """Version courante du jeu de données (créée à 1 si absente)"""
+    valeur = cache.get(cle_version(nom))
+    if valeur is None:
+        cache.add(cle_version(nom), 1, timeout=None)
+        valeur = cache.get(cle_version(nom), 1)
+    return valeur
+
+
+def invalider(nom):
+    """Incrémente la version du jeu de données : tous les processus rechargeront"""
+    _local.pop(nom, None)
+    try:
+        cache.incr(cle_version(nom))
+    except ValueError:
+        cache.add(cle_version(nom), 2, timeout=None)
+
+
+def calculer_etag(contenu):
+    return '"%s"' % hashlib.sha256(contenu).hexdigest()[:32]
+
+
+def obtenir(nom, charger):
+    """
+    Renvoie (etag, données) du jeu de données `nom`.
+    `charger` n'est appelé (et la base interrogée) qu'en l'absence d'entrée valide.
+    """
+    maintenant = time.monotonic()
+    entree = _local.get(nom)
+    if entree and entree['expire'] > maintenant:
+        return entree['etag'], entree['donnees']
+
+    v = version(nom)
+    if entree and entree['version'] == v:
+        entree['expire'] = maintenant + settings.REFERENCE_CACHE_TTL_LOCAL
+        return entree['etag'], entree['donnees']
+
+    cle = f'reference:{nom}:{v}'
+    partage = cache.get(cle)
+    if partage is None:
+        # Passage par JSON : types simples, sérialisables par tous les backends de cache
+        contenu = json.dumps(charger(), sort_keys=True, cls=DjangoJSONEncoder).encode()
+        partage = (calculer_etag(contenu), json.loads(contenu))
+        cache.set(cle, partage, timeout=settings.REFERENCE_CACHE_TTL)
+
+    _local[nom] = {
+        'expire': maintenant + settings.REFERENCE_CACHE_TTL_LOCAL,
+        'version': v,
+        'etag': partage[0],
+        'donnees': partage[1],
+    }
+    return partage
+
+
+def etag_correspond(request, etag):
+    """Vrai si l'en-tête If-None-Match de la requête contient l'ETag"""
+    entete = request.META.get('HTTP_IF_NONE_MATCH')
+    if not entete:
+        return False
+    valeurs = [v.strip() for v in entete.split(',')]
+    return '*' in valeurs or etag in valeurs or f'W/{etag}' in valeurs
+
+
+async def aobtenir(nom, charger):
+    """obtenir() pour les vues asynchrones : seuls le cache partagé et `charger` passent par un thread"""
+    entree = _local.get(nom)
+    if entree and entree['expire'] > time.monotonic():
+        return entree['etag'], entree['donnees']
+    return await sync_to_async(obtenir)(nom, charger)
+
+
+async def areponse_reference(request, nom, charger, filtre=None):
+    """Réponse JSON d'un jeu de données de référence, avec ETag et 304 conditionnel"""
+    etag, donnees = await aobtenir(nom, charger)
+    entetes = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_correspond(request, etag):
+        return HttpResponseNotModified(headers=entetes)
+    if filtre:
+        donnees = [element for element in donnees if filtre(element)]
+    return JsonResponse(donnees, safe=False, headers=entetes)
@@ -0,0 +1,201 @@
+"""
+Exports en flux (CSV ou NDJSON) pour les administrateurs.
+
+Les lignes sont lues par values_list() et iterator(chunk_size) : curseur côté
+serveur sur PostgreSQL, lecture par paquets sur SQLite. Aucun modèle ni
+serializer n'est instancié et la mémoire reste constante quel que soit le
+nombre de lignes. L'en-tête est envoyé avant l'exécution de la requête.
+Servi en ASGI, le flux est asynchrone et lit les lignes par paquets keyset.
+"""
+import csv
+import io
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import RendezVous, User
+from .pagination import filtre_apres
+
+
+TAILLE_PAQUET = 2000
+SORTIES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLONNES_RENDEZ_VOUS = [
+    ('id', 'id'),
+    ('date', 'date'),
+    ('heure_debut', 'heure_debut'),
+    ('heure_fin', 'heure_fin'),
+    ('statut', 'statut'),
+    ('mode', 'mode'),
+    ('patient_id', 'patient_id'),
+    ('patient_nom', 'patient__last_name'),
+    ('patient_prenom', 'patient__first_name'),
+    ('patient_email', 'patient__email'),
+    ('professionnel_id', 'professionnel_id'),
+    ('professionnel_nom', 'professionnel__nom'),
+    ('professionnel_prenom', 'professionnel__prenom'),
+    ('cabinet', 'cabinet__nom'),
+    ('ville', 'cabinet__ville'),
+    ('motif', 'motif_consultation__libelle'),
+    ('date_creation', 'date_creation'),
+]
+
+COLONNES_CLIENTS = [
+    ('id', 'id'),
+    ('username', 'username'),
+    ('email', 'email'),
+    ('nom', 'last_name'),
+    ('prenom', 'first_name'),
+    ('telephone', 'telephone'),
+    ('ville', 'ville'),
+    ('code_postal', 'code_postal'),
+    ('statut', 'statut'),
+    ('date_inscription', 'date_joined'),
+]
+
+
+def lire_date(valeur):
+    """Date AAAA-MM-JJ ou None ; lève ValueError si invalide"""
+    return datetime.strptime(valeur, '%Y-%m-%d').date() if valeur else None
+
+
+def lire_statuts(valeur, choix):
+    """Liste de statuts séparés par des virgules ; lève ValueError si l'un est inconnu"""
+    if not valeur:
+        return []
+    statuts = [statut.strip() for statut in valeur.split(',') if statut.strip()]
+    connus = {code for code, _ in choix}
+    if not set(statuts) <= connus:
+        raise ValueError('Statut invalide')
+    return statuts
+
+
+def filtrer_rendez_vous(params):
+    """
+    Rendez-vous filtrés selon les paramètres de requête :
+    - date_debut, date_fin : bornes incluses (AAAA-MM-JJ)
+    - statut : un ou plusieurs statuts séparés par des virgules
+    - professionnel_id
+    Lève ValueError si un paramètre est invalide.
+    """
+    rendez_vous = RendezVous.objects.all()
+    date_debut, date_fin = lire_date(params.get('date_debut')), lire_date(params.get('date_fin'))
+    if date_debut:
+        rendez_vous = rendez_vous.filter(date__gte=date_debut)
+    if date_fin:
+        rendez_vous = rendez_vous.filter(date__lte=date_fin)
+    statuts = lire_statuts(params.get('statut'), RendezVous.STATUT_CHOICES)
+    if statuts:
+        rendez_vous = rendez_vous.filter(statut__in=statuts)
+    if params.get('professionnel_id'):
+        rendez_vous = rendez_vous.filter(professionnel_id=int(params['professionnel_id']))
+    return rendez_vous.order_by('date', 'heure_debut', 'id')
+
+
+def filtrer_clients(params):
+    """
+    Clients filtrés selon les paramètres de requête :
+    - date_debut, date_fin : date d'inscription, bornes incluses
+    - statut : statut du compte (actif, inactif, suspendu)
+    - professionnel_id : clients ayant au moins un rendez-vous avec ce professionnel
+    Lève ValueError si un paramètre est invalide.
+    """
+    clients = User.objects.filter(type_compte='client')
+    date_debut, date_fin = lire_date(params.get('date_debut')), lire_date(params.get('date_fin'))
+    if date_debut:
+        clients = clients.filter(date_joined__date__gte=date_debut)
+    if date_fin:
+        clients = clients.filter(date_joined__date__lte=date_fin)
+    statuts = lire_statuts(params.get('statut'), User.STATUT_CHOICES)
+    if statuts:
+        clients = clients.filter(statut__in=statuts)
+    if params.get('professionnel_id'):
+        clients = clients.filter(id__in=RendezVous.objects.filter(
+            professionnel_id=int(params['professionnel_id'])
+        ).values('patient_id'))
+    return clients.order_by('id')
+
+
+def formateur(sortie, entetes):
+    """(début du fichier, fonction paquet de lignes -> texte) pour le format demandé"""
+    if sortie == 'csv':
+        tampon = io.StringIO()
+        writer = csv.writer(tampon)
+
+        def ecrire(lignes):
+            tampon.seek(0)
+            tampon.truncate()
+            writer.writerows(lignes)
+            return tampon.getvalue()
+        return ecrire([entetes]), ecrire
+
+    encodeur = DjangoJSONEncoder(ensure_ascii=False)
+    return '', lambda lignes: ''.join(encodeur.encode(dict(zip(entetes, ligne))) + '\n' for ligne in lignes)
+
+
+def flux(debut, ecrire, lignes):
+    yield debut
+    for paquet in paquets(lignes):
+        yield ecrire(paquet)
+
+
+async def flux_async(debut, ecrire, queryset, champs):
+    """
+    Version ASGI : un itérateur synchrone y serait lu en entier avant le premier octet.
+    Chaque paquet est une requête keyset complète exécutée par sync_to_async : aucun
+    curseur ne reste ouvert entre deux envois. La borne sur le premier champ de tri,
+    redondante avec filtre_apres, permet à SQLite de descendre l'index au lieu de
+    le reparcourir depuis le début à chaque paquet.
+    """
+    yield debut
+    ordre = list(queryset.query.order_by)
+    positions = [champs.index(champ) for champ in ordre]
+    apres = None
+    while True:
+        lot = queryset
+        if apres is not None:
+            lot = lot.filter(filtre_apres(ordre, apres), **{f'{ordre[0]}__gte': apres[0]})
+        paquet = await sync_to_async(list)(lot[:TAILLE_PAQUET])
+        if paquet:
+            yield ecrire(paquet)
+        if len(paquet) < TAILLE_PAQUET:
+            return
+        apres = [paquet[-1][i] for i in positions]
+
+
+def paquets(lignes):
+    """Regroupe les lignes par TAILLE_PAQUET pour limiter le nombre d'écritures réseau"""
+    paquet = []
+    for ligne in lignes:
+        paquet.append(ligne)
+        if len(paquet) >= TAILLE_PAQUET:
+            yield paquet
+            paquet = []
+    if paquet:
+        yield paquet
+
+
+def reponse_export(queryset, colonnes, nom, sortie, asynchrone=False):
+    """
+    StreamingHttpResponse CSV ou NDJSON des colonnes [(en-tête, champ), ...] du queryset,
+    trié sur des champs exportés. `asynchrone` : requête servie en ASGI.
+    """
+    entetes = [entete for entete, _ in colonnes]
+    champs = [champ for _, champ in colonnes]
+    debut, ecrire = formateur(sortie, entetes)
+    if asynchrone:
+        contenu = flux_async(debut, ecrire, queryset.values_list(*champs), champs)
+    else:
+        contenu = flux(debut, ecrire, queryset.values_list(*champs).iterator(chunk_size=TAILLE_PAQUET))
+    response = StreamingHttpResponse(contenu, content_type=SORTIES[sortie])
+    fichier = f'{nom}-{timezone.localdate():%Y%m%d}.{sortie}'
+    response['Content-Disposition'] = f'attachment; filename="{fichier}"'
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,65 @@
+"""
+Recherche géographique des professionnels autour d'un point.
+
+Les cabinets candidats sont présélectionnés par une boîte englobante sur les
+colonnes indexées (latitude, longitude), puis la distance exacte est calculée
+par la formule de haversine. Fonctionne sur toute base, sans PostGIS.
+"""
+from math import asin, cos, radians, sin, sqrt
+
+from .models import ProfessionnelCabinet
+
+
+RAYON_TERRE_KM = 6371.0088
+KM_PAR_DEGRE_LATITUDE = 111.32
+RAYON_INITIAL_KM = 5
+RAYON_MAX_KM = 500
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Distance en km entre deux points (degrés décimaux)"""
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * asin(sqrt(a))
+
+
+def boite_englobante(lat, lng, rayon_km):
+    """(lat_min, lat_max, lng_min, lng_max) contenant le cercle de rayon donné"""
+    delta_lat = rayon_km / KM_PAR_DEGRE_LATITUDE
+    cos_lat = max(cos(radians(lat)), 0.01)
+    delta_lng = min(rayon_km / (KM_PAR_DEGRE_LATITUDE * cos_lat), 180)
+    return lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng
+
+
+def professionnels_proches(professionnels, lat, lng, rayon_km=None, k=None):
+    """
+    Professionnels (queryset filtré) ayant un cabinet proche du point.
+    - rayon_km seul : tous ceux à moins de rayon_km
+    - k : les k plus proches, en élargissant le rayon (jusqu'à rayon_km ou RAYON_MAX_KM)
+    rayon_km est ramené à RAYON_MAX_KM au plus.
+    Renvoie [(professionnel_id, distance_km, cabinet_id), ...] trié par distance.
+    """
+    rayon_max = min(rayon_km or RAYON_MAX_KM, RAYON_MAX_KM)
+    rayon = rayon_max if k is None else min(RAYON_INITIAL_KM, rayon_max)
+    while True:
+        lat_min, lat_max, lng_min, lng_max = boite_englobante(lat, lng, rayon)
+        liens = ProfessionnelCabinet.objects.filter(
+            professionnel__in=professionnels,
+            cabinet__latitude__range=(lat_min, lat_max),
+            cabinet__longitude__range=(lng_min, lng_max)
+        ).values_list('professionnel_id', 'cabinet_id', 'cabinet__latitude', 'cabinet__longitude')
+
+        plus_proche = {}
+        for professionnel_id, cabinet_id, cabinet_lat, cabinet_lng in liens:
+            distance = haversine(lat, lng, float(cabinet_lat), float(cabinet_lng))
+            if distance > rayon:
+                continue
+            if professionnel_id not in plus_proche or distance < plus_proche[professionnel_id][1]:
+                plus_proche[professionnel_id] = (professionnel_id, distance, cabinet_id)
+
+        if k is None or len(plus_proche) >= k or rayon >= rayon_max:
+            break
+        rayon = min(rayon * 2, rayon_max)
+
+    resultats = sorted(plus_proche.values(), key=lambda r: (r[1], r[0]))
+    return resultats[:k] if k else resultats
@@ -0,0 +1,110 @@
+"""
+Hachage des mots de passe.
+
+PASSWORD_HASHER choisit l'algorithme des nouveaux hachages (pbkdf2, argon2, bcrypt,
+scrypt) et les réglages PASSWORD_<ALGORITHME>_* son coût ; les autres algorithmes restent
+déclarés pour vérifier les hachages existants. À la connexion, un hachage d'un autre
+algorithme ou d'un autre coût est réécrit avec les réglages courants.
+
+La vérification, coûteuse en CPU par construction, passe par un pool de
+LOGIN_HACHAGE_PROCESSUS processus par worker : une vague de connexions occupe au
+plus ces processus, et la vue de connexion (asynchrone) attend leur résultat sans
+bloquer les autres requêtes du worker. Avec 0, le hachage se fait dans un thread du worker.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher,
+    check_password, make_password,
+)
+
+
+class PBKDF2Hasher(PBKDF2PasswordHasher):
+    """PASSWORD_PBKDF2_ITERATIONS itérations (défaut de Django si vide)"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS or PBKDF2PasswordHasher.iterations
+
+
+class Argon2Hasher(Argon2PasswordHasher):
+    """PASSWORD_ARGON2_TIME_COST passes sur PASSWORD_ARGON2_MEMORY_COST Kio"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST or Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST or Argon2PasswordHasher.memory_cost
+
+
+class BCryptHasher(BCryptSHA256PasswordHasher):
+    """2 ** PASSWORD_BCRYPT_ROUNDS tours ; nécessite le paquet bcrypt"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS or BCryptSHA256PasswordHasher.rounds
+
+
+class ScryptHasher(ScryptPasswordHasher):
+    """Facteur de travail PASSWORD_SCRYPT_WORK_FACTOR (puissance de 2)"""
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR or ScryptPasswordHasher.work_factor
+
+
+_pool = None
+_pool_pid = None
+
+
+def creer_pool(processus):
+    """
+    Pool de `processus` processus partant d'un serveur forkserver et non du worker, qui
+    a des threads ; ils lisent les réglages depuis l'environnement, pas ceux modifiés après coup.
+    """
+    methode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(
+        max_workers=processus, mp_context=multiprocessing.get_context(methode), initializer=initialiser
+    )
+
+
+def pool():
+    """Pool du processus courant, créé au premier usage (jamais hérité d'un fork)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = creer_pool(settings.LOGIN_HACHAGE_PROCESSUS)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def initialiser():
+    import django
+    django.setup()
+
+
+def verifier(mot_de_passe, encode):
+    """
+    Vérifie un mot de passe ; renvoie (valide, nouveau hachage ou None).
+    Le nouveau hachage est fourni quand l'algorithme ou le coût ont changé.
+    """
+    nouveau = []
+    valide = check_password(mot_de_passe, encode, setter=lambda brut: nouveau.append(make_password(brut)))
+    return valide, (nouveau[0] if nouveau else None)
+
+
+def hacher(mot_de_passe):
+    return make_password(mot_de_passe)
+
+
+async def executer(fonction, *args):
+    """Exécute fonction(*args) dans le pool (ou dans un thread si LOGIN_HACHAGE_PROCESSUS=0)"""
+    if not settings.LOGIN_HACHAGE_PROCESSUS:
+        return await sync_to_async(fonction, thread_sensitive=False)(*args)
+    return await asyncio.wrap_future(pool().submit(fonction, *args))
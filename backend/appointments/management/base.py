@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class CommandePeriodique(BaseCommand):
+    """
+    Commande de maintenance lancée une fois, ou en continu avec --boucle (services
+    de docker-compose) : passage() est rappelé toutes les --intervalle secondes.
+
+    passage(options) renvoie (nombre traité, bilan) ; le bilan est affiché avec la
+    durée du passage, en mode --boucle seulement si quelque chose a été traité.
+    """
+    intervalle = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true', help='Tourne en continu (worker)')
+        parser.add_argument(
+            '--intervalle', type=float, default=self.intervalle,
+            help=f'Secondes entre deux passages en mode --boucle (défaut : {self.intervalle})'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Hors cycle HTTP : fermeture des connexions expirées (CONN_MAX_AGE) ou cassées
+            close_old_connections()
+            debut = time.perf_counter()
+            traites, bilan = self.passage(options)
+            duree = time.perf_counter() - debut
+            if traites or not options['boucle']:
+                self.stdout.write(self.style.SUCCESS(f'✓ {bilan} en {duree:.1f}s'))
+            if not options['boucle']:
+                return
+            time.sleep(options['intervalle'])
+
+    def passage(self, options):
+        raise NotImplementedError('Les sous-classes de CommandePeriodique doivent définir passage()')
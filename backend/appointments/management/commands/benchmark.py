@@ -0,0 +1,189 @@
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from appointments import benchmark
+from appointments.models import User, Professionnel, RendezVous
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure débit et latences des chemins critiques (recherche, disponibilités, réservation, listes, connexion) '
+        'et vérifie les budgets de requêtes SQL. À lancer sur une base dédiée.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--echelle', choices=benchmark.ECHELLES, default='1k',
+            help='Volume de données (~1k, 100k ou 1M rendez-vous), graine fixe par échelle'
+        )
+        parser.add_argument('--preparer', action='store_true', help="Génère les données de l'échelle si elles manquent")
+        parser.add_argument('--iterations', type=int, default=50, help='Requêtes mesurées par scénario (défaut : 50)')
+        parser.add_argument('--echauffement', type=int, default=3, help='Requêtes non mesurées avant chaque scénario')
+        parser.add_argument('--scenarios', help='Scénarios à lancer, séparés par des virgules (défaut : tous)')
+        parser.add_argument('--url', help='Serveur HTTP déjà lancé sur la même base (ex. http://127.0.0.1:8000)')
+        parser.add_argument('--gunicorn', action='store_true', help='Lance un serveur gunicorn local le temps des mesures')
+        parser.add_argument('--workers', type=int, default=2, help='Workers gunicorn (défaut : 2)')
+        parser.add_argument('--asgi', action='store_true', help='Avec --gunicorn : workers uvicorn sur backend.asgi')
+        parser.add_argument('--concurrence', type=int, default=1, help='Requêtes simultanées en mode HTTP (défaut : 1)')
+        parser.add_argument(
+            '--connexion', type=int, default=200,
+            help='Cycles de requête mesurés pour le coût de connexion à la base (0 : aucun)'
+        )
+        parser.add_argument(
+            '--hachage', type=int, default=0,
+            help='Vérifications de mot de passe mesurées hors HTTP : connexions/s par cœur (0 : aucune)'
+        )
+        parser.add_argument('--hachage-processus', type=int, default=1, help='Processus du pool de hachage mesuré')
+        parser.add_argument('--sortie', help='Fichier JSON des résultats')
+        parser.add_argument('--comparer', help='Résultats JSON de référence : échoue en cas de régression')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Hausse de p95 tolérée avant régression (défaut : 0.25)')
+
+    def handle(self, *args, **options):
+        scenarios = benchmark.SCENARIOS
+        if options['scenarios']:
+            noms = set(options['scenarios'].split(','))
+            inconnus = noms - {scenario[0] for scenario in scenarios}
+            if inconnus:
+                raise CommandError(f"Scénarios inconnus : {', '.join(sorted(inconnus))}")
+            scenarios = [scenario for scenario in scenarios if scenario[0] in noms]
+        if options['url'] and options['gunicorn']:
+            raise CommandError('--url et --gunicorn sont exclusifs')
+
+        if options['preparer']:
+            self.preparer(options['echelle'])
+        try:
+            contexte = benchmark.preparer_contexte(options['echauffement'] + options['iterations'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        serveur = None
+        try:
+            if options['gunicorn']:
+                serveur, options['url'] = self.lancer_gunicorn(options['workers'], options['asgi'])
+            if options['url']:
+                executant = benchmark.ExecutantHttp(options['url'], contexte['utilisateurs'])
+            else:
+                executant = benchmark.ExecutantClient(contexte['utilisateurs'])
+
+            resultats = {}
+            for scenario in scenarios:
+                resultats[scenario[0]], crees = benchmark.mesurer(
+                    executant, scenario, contexte, options['iterations'],
+                    echauffement=options['echauffement'], concurrence=options['concurrence']
+                )
+                benchmark.nettoyer(crees)
+                self.afficher(scenario[0], resultats[scenario[0]])
+        finally:
+            if serveur:
+                serveur.terminate()
+                serveur.wait(timeout=30)
+
+        connexion = None
+        if options['connexion']:
+            connexion = benchmark.mesurer_connexion(options['connexion'])
+            latence = connexion['latence_ms']
+            self.stdout.write(
+                f"  {'connexion (SELECT 1)':<28} {connexion['connexions_obtenues']:>4} connexions obtenues / "
+                f"{connexion['iterations']}  p50 {latence['p50']:>7.2f} ms  p95 {latence['p95']:>7.2f} ms  "
+                f"(CONN_MAX_AGE={connexion['conn_max_age']}, pool={'oui' if connexion['pool'] else 'non'})"
+            )
+
+        hachage = None
+        if options['hachage']:
+            hachage = benchmark.mesurer_hachage(options['hachage'], options['hachage_processus'])
+            self.stdout.write(
+                f"  {'hachage (' + hachage['algorithme'] + ')':<28} {hachage['connexions_s']:>8.1f} connexions/s  "
+                f"{hachage['connexions_s_par_coeur']:.1f} par cœur ({hachage['processus']} processus, "
+                f"{hachage['ms_par_verification']} ms par vérification)"
+            )
+
+        mode = 'client'
+        if options['gunicorn']:
+            mode = 'gunicorn-asgi' if options['asgi'] else 'gunicorn'
+        elif options['url']:
+            mode = 'http'
+        rapport = {
+            'date': timezone.now().isoformat(),
+            'echelle': options['echelle'],
+            'mode': mode,
+            'base': connection.vendor,
+            'python': platform.python_version(),
+            'volumes': {
+                'rendez_vous': RendezVous.objects.count(),
+                'patients': User.objects.filter(type_compte='client').count(),
+                'professionnels': Professionnel.objects.count(),
+            },
+            'scenarios': resultats,
+            'connexion': connexion,
+            'hachage': hachage,
+        }
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+                json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+            self.stdout.write(f"  résultats écrits dans {options['sortie']}")
+
+        echecs = benchmark.depassements(resultats)
+        erreurs = [f"{nom} : {r['erreurs']} réponses en erreur" for nom, r in resultats.items() if r['erreurs']]
+        if options['comparer']:
+            with open(options['comparer'], encoding='utf-8') as fichier:
+                reference = json.load(fichier)['scenarios']
+            echecs += benchmark.regressions(resultats, reference, options['tolerance'])
+        if echecs or erreurs:
+            raise CommandError('Banc d\'essai en échec :\n' + '\n'.join(echecs + erreurs))
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(resultats)} scénarios mesurés, budgets respectés'))
+
+    def preparer(self, echelle):
+        parametres = dict(benchmark.ECHELLES[echelle])
+        if User.objects.filter(username=f"patient-{parametres['graine']}-0").exists():
+            self.stdout.write(f'  données de l\'échelle {echelle} déjà présentes')
+            return
+        call_command('generer_donnees', stdout=self.stdout, **parametres)
+
+    def lancer_gunicorn(self, workers, asgi):
+        """Démarre gunicorn (gunicorn.conf.py) sur un port libre, profilage de chaque requête ; renvoie (processus, url)"""
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        serveur = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                'PROFILAGE_ECHANTILLON': '1',
+                'GUNICORN_WORKER_CLASS': 'uvicorn_worker.UvicornWorker' if asgi else 'sync',
+                'GUNICORN_WORKERS': str(workers),
+                'GUNICORN_BIND': f'127.0.0.1:{port}',
+                'GUNICORN_LOG_LEVEL': 'warning',
+            }
+        )
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if serveur.poll() is not None:
+                raise CommandError('gunicorn s\'est arrêté au démarrage')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return serveur, f'http://127.0.0.1:{port}'
+            except OSError:
+                time.sleep(0.2)
+        serveur.terminate()
+        raise CommandError('gunicorn ne répond pas')
+
+    def afficher(self, nom, resultat):
+        latence = resultat['latence_ms']
+        requetes = '?' if resultat['requetes'] is None else resultat['requetes']
+        self.stdout.write(
+            f"  {nom:<28} {resultat['debit_rps']:>8.1f} req/s  p50 {latence['p50']:>7.1f} ms  "
+            f"p95 {latence['p95']:>7.1f} ms  p99 {latence['p99']:>7.1f} ms  "
+            f"{requetes} requêtes SQL (budget {resultat['budget_requetes']})"
+        )
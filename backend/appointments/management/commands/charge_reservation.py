@@ -0,0 +1,86 @@
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from appointments.models import User, DisponibiliteHoraire, RendezVous
+from appointments.views import create_rendez_vous
+
+
+class Command(BaseCommand):
+    help = 'Test de charge : réservations concurrentes sur un même créneau'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--disponibilite', type=int, help='ID de la disponibilité horaire visée (première trouvée par défaut)')
+        parser.add_argument('--date', required=True, help='Date du créneau (AAAA-MM-JJ), doit tomber le jour de la disponibilité')
+        parser.add_argument('--concurrence', type=int, default=200, help='Nombre de réservations simultanées')
+
+    def handle(self, *args, **options):
+        dispo = DisponibiliteHoraire.objects.select_related('professionnel', 'cabinet')
+        dispo = dispo.filter(id=options['disponibilite']).first() if options['disponibilite'] else dispo.first()
+        if dispo is None:
+            raise CommandError('Aucune disponibilité horaire trouvée')
+        jour = datetime.strptime(options['date'], '%Y-%m-%d').date()
+        if jour.weekday() != dispo.jour_semaine:
+            raise CommandError(f'La date doit tomber un {dispo.get_jour_semaine_display()}')
+
+        motif = dispo.professionnel.specialite.motifs_consultation.first()
+        if motif is None:
+            raise CommandError('Aucun motif de consultation pour cette spécialité')
+
+        n = options['concurrence']
+        prefixe = f'charge-{uuid.uuid4().hex[:8]}'
+        patients = User.objects.bulk_create([
+            User(username=f'{prefixe}-{i}', email=f'{prefixe}-{i}@test.local', password='!')
+            for i in range(n)
+        ])
+        patients = list(User.objects.filter(username__startswith=prefixe))
+
+        factory = APIRequestFactory()
+        depart = threading.Barrier(n)
+        codes = Counter()
+        verrou = threading.Lock()
+
+        def reserver(patient):
+            request = factory.post('/api/rendez-vous/create/', {
+                'professionnel_id': dispo.professionnel_id,
+                'cabinet_id': dispo.cabinet_id,
+                'motif_consultation_id': motif.id,
+                'date': jour.isoformat(),
+                'heure_debut': dispo.heure_debut.strftime('%H:%M'),
+            }, format='json')
+            force_authenticate(request, user=patient)
+            try:
+                depart.wait()
+                code = create_rendez_vous(request).status_code
+            finally:
+                connection.close()
+            with verrou:
+                codes[code] += 1
+
+        self.stdout.write(f'{n} réservations simultanées sur {dispo} le {jour}...')
+        debut = time.perf_counter()
+        threads = [threading.Thread(target=reserver, args=(patient,)) for patient in patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+
+        confirmes = RendezVous.objects.filter(
+            patient__username__startswith=prefixe, statut='confirme'
+        ).count()
+        User.objects.filter(username__startswith=prefixe).delete()
+
+        self.stdout.write(f'Durée : {duree:.2f}s ({n / duree:.0f} req/s)')
+        for code, nombre in sorted(codes.items()):
+            self.stdout.write(f'  HTTP {code} : {nombre}')
+        if confirmes == 1 and codes[201] == 1:
+            self.stdout.write(self.style.SUCCESS('✓ Un seul rendez-vous confirmé'))
+        else:
+            raise CommandError(f'{confirmes} rendez-vous confirmés pour un même créneau')
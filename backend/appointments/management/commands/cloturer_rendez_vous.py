@@ -0,0 +1,31 @@
+from django.conf import settings
+
+from appointments import sweeper
+from appointments.management.base import CommandePeriodique
+
+
+class Command(CommandePeriodique):
+    help = "Passe à 'termine' les rendez-vous confirmés finis depuis le délai de clôture (à lancer périodiquement)"
+    intervalle = 900
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--heures', type=int, default=None,
+            help=f'Délai après la fin du rendez-vous (défaut : CLOTURE_DELAI_HEURES={settings.CLOTURE_DELAI_HEURES})'
+        )
+        parser.add_argument(
+            '--revue', action='store_true',
+            help='Marque les rendez-vous clôturés absence_a_verifier pour revue par le professionnel'
+        )
+        parser.add_argument('--lot', type=int, default=sweeper.TAILLE_LOT, help='Rendez-vous par lot (une transaction)')
+
+    def passage(self, options):
+        clotures = sweeper.cloturer(
+            heures=options['heures'], taille_lot=options['lot'], revue=options['revue'],
+            progression=self.progression
+        )
+        return clotures, f'{clotures} rendez-vous clôturés'
+
+    def progression(self, clotures, jour):
+        self.stdout.write(f'  {clotures} rendez-vous clôturés (jusqu\'au {jour:%d/%m/%Y})')
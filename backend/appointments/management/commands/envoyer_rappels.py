@@ -0,0 +1,21 @@
+from django.conf import settings
+
+from appointments import reminders
+from appointments.management.base import CommandePeriodique
+
+
+class Command(CommandePeriodique):
+    help = 'Envoie les rappels des rendez-vous confirmés commençant bientôt (à lancer périodiquement)'
+    intervalle = 60
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--heures', type=int, default=None,
+            help=f'Fenêtre en heures (défaut : RAPPELS_DELAI_HEURES={settings.RAPPELS_DELAI_HEURES})'
+        )
+        parser.add_argument('--lot', type=int, default=reminders.TAILLE_LOT, help='Rendez-vous par lot')
+
+    def passage(self, options):
+        traites, envoyes = reminders.envoyer_rappels(heures=options['heures'], taille_lot=options['lot'])
+        return traites, f'{traites} rendez-vous rappelés ({envoyes} messages)'
@@ -0,0 +1,25 @@
+from django.conf import settings
+
+from appointments import slots
+from appointments.management.base import CommandePeriodique
+
+
+class Command(CommandePeriodique):
+    help = (
+        'Génère les créneaux matérialisés sur l\'horizon de réservation et purge les créneaux passés '
+        '(une fois par jour : --boucle fait avancer l\'horizon)'
+    )
+    intervalle = 24 * 3600
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--semaines', type=int, default=None,
+            help=f'Horizon en semaines (défaut : CRENEAUX_HORIZON_SEMAINES={settings.CRENEAUX_HORIZON_SEMAINES})'
+        )
+
+    def passage(self, options):
+        date_debut, date_fin = slots.horizon(options['semaines'])
+        self.stdout.write(f'Génération des créneaux du {date_debut} au {date_fin}...')
+        total = slots.regenerer_tout(semaines=options['semaines'])
+        return True, f'{total} créneaux générés'
@@ -0,0 +1,307 @@
+import random
+import time
+from datetime import timedelta, time as datetime_time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from appointments import search, slots
+from appointments import cache as reference_cache
+from appointments.authentication import VERSION_COMPTES
+from appointments.bulk import inserer_en_masse, index_suspendus
+from appointments.models import (
+    User, Specialite, Cabinet, Professionnel, ProfessionnelCabinet,
+    MotifConsultation, DisponibiliteHoraire, RendezVous, Creneau
+)
+
+
+# (ville, code postal, latitude, longitude, poids ~ population)
+VILLES = [
+    ('Paris', '75011', 48.8566, 2.3522, 21),
+    ('Marseille', '13001', 43.2965, 5.3698, 9),
+    ('Lyon', '69002', 45.7640, 4.8357, 8),
+    ('Toulouse', '31000', 43.6047, 1.4442, 5),
+    ('Nice', '06000', 43.7102, 7.2620, 3),
+    ('Nantes', '44000', 47.2184, -1.5536, 3),
+    ('Strasbourg', '67000', 48.5734, 7.7521, 3),
+    ('Montpellier', '34000', 43.6108, 3.8767, 3),
+    ('Bordeaux', '33000', 44.8378, -0.5792, 3),
+    ('Lille', '59000', 50.6292, 3.0573, 3),
+    ('Rennes', '35000', 48.1173, -1.6778, 2),
+    ('Grenoble', '38000', 45.1885, 5.7245, 2),
+]
+
+# (nom, poids, tarif, durées de créneau possibles, motif par défaut)
+SPECIALITES = [
+    ('Médecine générale', 55, Decimal('30.00'), [15, 20], ('Consultation générale', 20)),
+    ('Dentiste', 20, Decimal('50.00'), [30], ('Détartrage', 30)),
+    ('Cardiologue', 8, Decimal('60.00'), [30], ('Consultation cardiologique', 30)),
+    ('Dermatologue', 8, Decimal('50.00'), [20], ('Consultation dermatologique', 20)),
+    ('Pédiatre', 9, Decimal('40.00'), [20], ('Consultation pédiatrique', 20)),
+]
+
+NOMS = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau',
+        'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier',
+        'Morel', 'Girard', 'André', 'Mercier', 'Dupont', 'Lambert', 'Bonnet', 'François', 'Martinez', 'Legrand']
+PRENOMS = ['Sophie', 'Jean', 'Marie', 'Pierre', 'Julie', 'Laurent', 'Isabelle', 'Christophe', 'Nathalie', 'Philippe',
+           'Émilie', 'Marc', 'Catherine', 'Nicolas', 'Sandrine', 'David', 'Valérie', 'Olivier', 'Stéphanie', 'Thomas',
+           'Caroline', 'François', 'Aurélie', 'Sébastien', 'Céline', 'Julien', 'Anne', 'Benoît', 'Martine', 'Patrick']
+RUES = ['rue de la République', 'avenue Jean Jaurès', 'place de la Mairie', 'rue Victor Hugo', 'boulevard Pasteur',
+        'rue des Écoles', 'avenue de la Gare', 'rue du Général de Gaulle', 'place du Marché', 'rue Nationale']
+
+CHAMPS_PATIENTS = [
+    'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+    'date_joined', 'type_compte', 'is_admin', 'telephone', 'telephone_urgence', 'adresse_complete',
+    'ville', 'code_postal', 'pays', 'statut', 'preference_notification',
+]
+
+CHAMPS_RENDEZ_VOUS = [
+    'patient', 'professionnel', 'cabinet', 'motif_consultation', 'date', 'heure_debut', 'heure_fin',
+    'statut', 'mode', 'notes_patient', 'notes_professionnel', 'date_creation', 'date_modification',
+    'date_annulation', 'rappel_envoye', 'absence_a_verifier',
+]
+
+
+def ponderer(elements, poids):
+    """Liste de tirage : chaque élément répété selon son poids"""
+    return [element for element, p in zip(elements, poids) for _ in range(p)]
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données synthétique et reproductible pour les tests de charge'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=10000, help='Nombre de patients (défaut : 10000)')
+        parser.add_argument('--professionnels', type=int, default=1000, help='Nombre de professionnels (défaut : 1000)')
+        parser.add_argument('--cabinets', type=int, default=400, help='Nombre de cabinets (défaut : 400)')
+        parser.add_argument(
+            '--semaines', '--weeks', dest='semaines', type=int, default=12,
+            help='Semaines de rendez-vous, moitié passées et moitié à venir (défaut : 12)'
+        )
+        parser.add_argument('--graine', '--seed', dest='graine', type=int, default=42, help='Graine aléatoire (défaut : 42)')
+        parser.add_argument('--sans-creneaux', action='store_true', help='Ne pas régénérer les créneaux matérialisés')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['graine'])
+        self.graine = options['graine']
+        self.maintenant = timezone.now()
+        if User.objects.filter(username=f'patient-{self.graine}-0').exists():
+            raise CommandError(f'Données déjà générées avec la graine {self.graine} : changer --graine')
+        if options['professionnels'] > 0 and options['cabinets'] < 1:
+            raise CommandError('Il faut au moins un cabinet')
+
+        debut = time.perf_counter()
+        with transaction.atomic():
+            specialites, motifs = self.referentiel()
+            self.etape('patients', lambda: self.patients(options['patients']))
+            cabinets = self.etape('cabinets', lambda: self.cabinets(options['cabinets']))
+            professionnels = self.etape(
+                'professionnels', lambda: self.professionnels(options['professionnels'], specialites, cabinets)
+            )
+            regles = self.etape('disponibilités', lambda: self.disponibilites(professionnels))
+            self.etape('rendez-vous', lambda: self.rendez_vous(regles, professionnels, motifs, options['semaines']))
+            self.etape('index de recherche', lambda: search.indexer_professionnels(
+                Professionnel.objects.filter(id__in=[p['id'] for p in professionnels])
+            ))
+
+        for nom in ('specialites', 'motifs', 'cabinets', VERSION_COMPTES):
+            reference_cache.invalider(nom)
+        if not options['sans_creneaux']:
+            self.etape('créneaux', self.creneaux)
+        self.stdout.write(self.style.SUCCESS(f'✓ Données générées en {time.perf_counter() - debut:.1f}s'))
+
+    def etape(self, nom, fonction):
+        debut = time.perf_counter()
+        resultat = fonction()
+        total = resultat if isinstance(resultat, int) else len(resultat)
+        self.stdout.write(f'  {nom} : {total} en {time.perf_counter() - debut:.1f}s')
+        return resultat
+
+    def referentiel(self):
+        """Spécialités et motifs (créés s'ils manquent) : {nom: id}, {specialite_id: [(motif_id, durée)]}"""
+        specialites = {}
+        for nom, _, _, _, (libelle, duree) in SPECIALITES:
+            specialite, _ = Specialite.objects.get_or_create(nom=nom)
+            specialites[nom] = specialite.id
+            if not MotifConsultation.objects.filter(specialite=specialite).exists():
+                MotifConsultation.objects.create(
+                    specialite=specialite, libelle=libelle, duree_estimee=duree, tarif=Decimal('25.00')
+                )
+        motifs = {}
+        for motif_id, specialite_id, duree in MotifConsultation.objects.filter(
+            specialite_id__in=specialites.values()
+        ).values_list('id', 'specialite_id', 'duree_estimee'):
+            motifs.setdefault(specialite_id, []).append((motif_id, duree))
+        return specialites, motifs
+
+    def patients(self, nombre):
+        mot_de_passe = make_password('password123')
+        inserer_en_masse(User, CHAMPS_PATIENTS, (
+            (
+                mot_de_passe, False, f'patient-{self.graine}-{i}', self.rng.choice(PRENOMS), self.rng.choice(NOMS),
+                f'patient-{self.graine}-{i}@patients.medi4ll.test', False, True,
+                self.maintenant - timedelta(days=self.rng.randrange(1, 1000)), 'client', False,
+                '', '', '', '', '', 'France', 'actif', 'email',
+            )
+            for i in range(nombre)
+        ))
+        self.patient_ids = list(User.objects.filter(
+            username__startswith=f'patient-{self.graine}-'
+        ).order_by('id').values_list('id', flat=True))
+        return self.patient_ids
+
+    def cabinets(self, nombre):
+        tirage = ponderer(VILLES, [ville[4] for ville in VILLES])
+        cabinets = []
+        for i in range(nombre):
+            ville, code_postal, lat, lng, _ = self.rng.choice(tirage)
+            rue = self.rng.choice(RUES)
+            cabinets.append(Cabinet(
+                nom=f'Cabinet {rue.split(" ", 1)[1].title()} {i}',
+                adresse=f'{self.rng.randint(1, 150)} {rue}',
+                ville=ville,
+                code_postal=code_postal,
+                telephone=f'0{self.rng.randint(1, 5)}{self.rng.randint(10000000, 99999999)}',
+                latitude=Decimal(f'{lat + self.rng.gauss(0, 0.03):.6f}'),
+                longitude=Decimal(f'{lng + self.rng.gauss(0, 0.04):.6f}'),
+            ))
+        return Cabinet.objects.bulk_create(cabinets, batch_size=5000)
+
+    def professionnels(self, nombre, specialites, cabinets):
+        tirage_specialites = ponderer(SPECIALITES, [specialite[1] for specialite in SPECIALITES])
+        par_ville = {}
+        for cabinet in cabinets:
+            par_ville.setdefault(cabinet.ville, []).append(cabinet.id)
+        cabinets = par_ville
+        villes = list(cabinets)
+        tirage_villes = ponderer(villes, [len(cabinets[ville]) for ville in villes])
+        professionnels = []
+        for i in range(nombre):
+            nom_specialite, _, tarif, durees, _ = self.rng.choice(tirage_specialites)
+            nom, prenom = self.rng.choice(NOMS), self.rng.choice(PRENOMS)
+            ville = self.rng.choice(tirage_villes)
+            nombre_cabinets = 2 if self.rng.random() < 0.2 and len(cabinets[ville]) > 1 else 1
+            professionnels.append({
+                'objet': Professionnel(
+                    nom=nom,
+                    prenom=prenom,
+                    email=f'pro-{self.graine}-{i}@professionnels.medi4ll.test',
+                    numero_rpps=f'9{self.graine % 100:02d}{i:08d}',
+                    specialite_id=specialites[nom_specialite],
+                    tarif_consultation=tarif,
+                    accepte_teleconsultation=self.rng.random() < 0.3,
+                    statut_validation='valide' if self.rng.random() < 0.95 else 'en_attente',
+                ),
+                'durees': durees,
+                'cabinets': self.rng.sample(cabinets[ville], nombre_cabinets),
+            })
+        Professionnel.objects.bulk_create([p['objet'] for p in professionnels], batch_size=5000)
+        for professionnel in professionnels:
+            professionnel['id'] = professionnel['objet'].id
+            professionnel['specialite_id'] = professionnel['objet'].specialite_id
+            professionnel['teleconsultation'] = professionnel['objet'].accepte_teleconsultation
+            del professionnel['objet']
+        ProfessionnelCabinet.objects.bulk_create([
+            ProfessionnelCabinet(professionnel_id=p['id'], cabinet_id=cabinet_id, est_principal=rang == 0)
+            for p in professionnels
+            for rang, cabinet_id in enumerate(p['cabinets'])
+        ], batch_size=5000)
+        return professionnels
+
+    def disponibilites(self, professionnels):
+        """Matinées et après-midis sur 4 à 5 jours ouvrés, samedi matin pour certains"""
+        regles = []
+        for professionnel in professionnels:
+            jours = sorted(self.rng.sample(range(5), self.rng.choice([4, 5, 5])))
+            if self.rng.random() < 0.2:
+                jours.append(5)
+            duree = self.rng.choice(professionnel['durees'])
+            for jour in jours:
+                cabinet_id = self.rng.choice(professionnel['cabinets'])
+                plages = [(datetime_time(self.rng.choice([8, 9])), datetime_time(12))]
+                if jour != 5:
+                    plages.append((datetime_time(14), datetime_time(self.rng.choice([17, 18, 19]))))
+                for heure_debut, heure_fin in plages:
+                    regles.append(DisponibiliteHoraire(
+                        professionnel_id=professionnel['id'], cabinet_id=cabinet_id, jour_semaine=jour,
+                        heure_debut=heure_debut, heure_fin=heure_fin, duree_creneau=duree
+                    ))
+        return DisponibiliteHoraire.objects.bulk_create(regles, batch_size=5000)
+
+    def creneaux(self):
+        """
+        Chargement initial d'une base hors service : une seule transaction, index suspendus.
+        En production, generer_creneaux régénère professionnel par professionnel (slots.regenerer_tout).
+        """
+        date_debut, date_fin = slots.horizon()
+        regles = list(DisponibiliteHoraire.objects.all())
+        with transaction.atomic():
+            Creneau.objects.all().delete()
+            with index_suspendus(Creneau):
+                return inserer_en_masse(
+                    Creneau, slots.CHAMPS_CRENEAU, slots.construire_creneaux(regles, date_debut, date_fin)
+                )
+
+    def rendez_vous(self, regles, professionnels, motifs, semaines):
+        if not regles or not self.patient_ids:
+            return 0
+        with index_suspendus(RendezVous):
+            return inserer_en_masse(
+                RendezVous, CHAMPS_RENDEZ_VOUS, self.lignes_rendez_vous(regles, professionnels, motifs, semaines)
+            )
+
+    def lignes_rendez_vous(self, regles, professionnels, motifs, semaines):
+        """
+        Remplissage décroissant avec l'éloignement : ~75 % des créneaux passés,
+        90 % la semaine prochaine puis 10 points de moins par semaine (20 % au plus bas).
+        Quelques patients fréquents concentrent une bonne part des rendez-vous.
+        """
+        infos = {p['id']: p for p in professionnels}
+        par_jour = {}
+        for regle in regles:
+            par_jour.setdefault(regle.jour_semaine, []).append(regle)
+        patients = self.patient_ids
+        aujourdhui = timezone.localdate()
+        jour = aujourdhui - timedelta(weeks=semaines // 2)
+        fin = jour + timedelta(weeks=semaines)
+        rng = self.rng
+
+        while jour < fin:
+            ecart = (jour - aujourdhui).days
+            passe = ecart < 0
+            taux = 0.75 if passe else max(0.2, 0.9 - 0.1 * (ecart // 7))
+            for regle in par_jour.get(jour.weekday(), []):
+                info = infos[regle.professionnel_id]
+                motif_id = motifs[info['specialite_id']][0][0]
+                debut = regle.heure_debut.hour * 60 + regle.heure_debut.minute
+                limite = regle.heure_fin.hour * 60 + regle.heure_fin.minute
+                while debut + regle.duree_creneau <= limite:
+                    if rng.random() < taux:
+                        tirage = rng.random()
+                        if passe:
+                            statut = 'termine' if tirage < 0.85 else 'annule' if tirage < 0.95 else 'no_show'
+                        else:
+                            statut = 'confirme' if tirage < 0.93 else 'annule'
+                        yield (
+                            patients[int(len(patients) * rng.random() ** 2)],
+                            regle.professionnel_id,
+                            regle.cabinet_id,
+                            motif_id,
+                            jour,
+                            datetime_time(debut // 60, debut % 60),
+                            datetime_time((debut + regle.duree_creneau) // 60, (debut + regle.duree_creneau) % 60),
+                            statut,
+                            'teleconsultation' if info['teleconsultation'] and rng.random() < 0.1 else 'presentiel',
+                            '',
+                            '',
+                            self.maintenant,
+                            self.maintenant,
+                            self.maintenant if statut == 'annule' else None,
+                            passe,
+                            False,
+                        )
+                    debut += regle.duree_creneau
+            jour += timedelta(days=1)
@@ -0,0 +1,236 @@
+import csv
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from appointments import search
+from appointments import cache as reference_cache
+from appointments.authentication import VERSION_COMPTES
+from appointments.models import Specialite, Cabinet, Professionnel, ProfessionnelCabinet
+
+
+# En-têtes reconnus : noms du modèle et libellés de l'extraction RPPS (annuaire santé)
+COLONNES = {
+    'numero_rpps': ['numero_rpps', 'rpps', 'identification nationale pp'],
+    'nom': ['nom', "nom d'exercice"],
+    'prenom': ['prenom', 'prénom', "prénom d'exercice"],
+    'email': ['email', 'adresse e-mail (coord. structure)'],
+    'telephone': ['telephone', 'téléphone', 'téléphone (coord. structure)'],
+    'specialite': ['specialite', 'spécialité', 'libellé savoir-faire', 'libellé profession'],
+    'tarif_consultation': ['tarif_consultation', 'tarif'],
+    'accepte_teleconsultation': ['accepte_teleconsultation', 'teleconsultation'],
+    'cabinet_nom': ['cabinet_nom', 'cabinet', 'raison sociale site'],
+    'cabinet_adresse': ['cabinet_adresse', 'adresse', 'libellé voie (coord. structure)'],
+    'cabinet_ville': ['cabinet_ville', 'ville', 'libellé commune (coord. structure)'],
+    'cabinet_code_postal': ['cabinet_code_postal', 'code_postal', 'code postal (coord. structure)'],
+    'cabinet_telephone': ['cabinet_telephone'],
+    'latitude': ['latitude'],
+    'longitude': ['longitude'],
+}
+
+CHAMPS_MIS_A_JOUR = [
+    'nom', 'prenom', 'email', 'telephone', 'specialite', 'tarif_consultation', 'accepte_teleconsultation'
+]
+
+
+def cle_cabinet(nom, adresse, code_postal):
+    return (nom.strip().lower(), adresse.strip().lower(), code_postal.strip())
+
+
+def decimal_ou_none(valeur):
+    try:
+        return Decimal(valeur) if valeur else None
+    except InvalidOperation:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Importe des professionnels depuis un CSV (format RPPS) par lots, avec mise à jour sur numero_rpps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help='Chemin du CSV ("-" pour l\'entrée standard)')
+        parser.add_argument('--lot', type=int, default=5000, help='Nombre de lignes par lot (défaut : 5000)')
+        parser.add_argument('--delimiteur', default=',', help='Séparateur de colonnes (défaut : ",", "|" pour l\'extraction RPPS)')
+        parser.add_argument('--encodage', default='utf-8-sig', help='Encodage du fichier (défaut : utf-8-sig)')
+        parser.add_argument('--tarif-defaut', type=Decimal, default=Decimal('25.00'), help='Tarif si la colonne est absente ou vide')
+        parser.add_argument(
+            '--statut', choices=['en_attente', 'valide'], default='valide',
+            help='Statut de validation des nouveaux professionnels (défaut : valide, le RPPS fait foi)'
+        )
+        parser.add_argument('--creer-specialites', action='store_true', help='Crée les spécialités inconnues au lieu de rejeter la ligne')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.specialites = {nom.lower(): id for id, nom in Specialite.objects.values_list('id', 'nom')}
+        self.cabinets = {
+            cle_cabinet(nom, adresse, code_postal): id
+            for id, nom, adresse, code_postal in Cabinet.objects.values_list('id', 'nom', 'adresse', 'code_postal')
+        }
+        self.emails_vus = {}
+        self.stats = {'lues': 0, 'crees': 0, 'mis_a_jour': 0, 'rejetees': 0, 'cabinets': 0, 'specialites': 0}
+
+        fichier = sys.stdin if options['fichier'] == '-' else open(
+            options['fichier'], newline='', encoding=options['encodage']
+        )
+        debut = time.perf_counter()
+        try:
+            reader = csv.DictReader(fichier, delimiter=options['delimiteur'])
+            colonnes = self.resoudre_colonnes(reader.fieldnames or [])
+            lot = {}
+            for ligne in reader:
+                self.stats['lues'] += 1
+                donnees = self.lire_ligne(ligne, colonnes)
+                if donnees is None:
+                    self.stats['rejetees'] += 1
+                    continue
+                lot[donnees['numero_rpps']] = donnees
+                if len(lot) >= options['lot']:
+                    self.importer_lot(lot)
+                    self.afficher_progression(debut)
+                    lot = {}
+            if lot:
+                self.importer_lot(lot)
+        finally:
+            if fichier is not sys.stdin:
+                fichier.close()
+
+        reference_cache.invalider(VERSION_COMPTES)
+        if self.stats['cabinets']:
+            reference_cache.invalider('cabinets')
+        if self.stats['specialites']:
+            reference_cache.invalider('specialites')
+            reference_cache.invalider('motifs')
+
+        duree = time.perf_counter() - debut
+        s = self.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {s['lues']} lignes en {duree:.1f}s ({s['lues'] / max(duree, 1e-9):.0f} lignes/s) : "
+            f"{s['crees']} créés, {s['mis_a_jour']} mis à jour, {s['rejetees']} rejetées, "
+            f"{s['cabinets']} cabinets et {s['specialites']} spécialités créés"
+        ))
+
+    def resoudre_colonnes(self, entetes):
+        """Associe chaque champ à l'en-tête du fichier qui le porte"""
+        index = {entete.strip().lower(): entete for entete in entetes}
+        colonnes = {}
+        for champ, alias in COLONNES.items():
+            for nom in alias:
+                if nom in index:
+                    colonnes[champ] = index[nom]
+                    break
+        manquantes = {'numero_rpps', 'nom', 'prenom', 'email', 'specialite'} - colonnes.keys()
+        if manquantes:
+            raise CommandError(f"Colonnes obligatoires absentes : {', '.join(sorted(manquantes))}")
+        return colonnes
+
+    def lire_ligne(self, ligne, colonnes):
+        """Ligne normalisée, ou None si elle est incomplète ou en doublon d'email"""
+        valeurs = {champ: (ligne.get(entete) or '').strip() for champ, entete in colonnes.items()}
+        rpps = valeurs['numero_rpps']
+        email = valeurs['email'].lower()
+        if not rpps or len(rpps) > 11 or not email or not valeurs['nom']:
+            return None
+        if self.emails_vus.setdefault(email, rpps) != rpps:
+            return None
+
+        specialite_id = self.specialites.get(valeurs['specialite'].lower())
+        if specialite_id is None:
+            if not self.options['creer_specialites'] or not valeurs['specialite']:
+                return None
+            specialite_id = Specialite.objects.create(nom=valeurs['specialite']).id
+            self.specialites[valeurs['specialite'].lower()] = specialite_id
+            self.stats['specialites'] += 1
+
+        return {
+            'numero_rpps': rpps,
+            'nom': valeurs['nom'],
+            'prenom': valeurs['prenom'],
+            'email': email,
+            'telephone': valeurs.get('telephone', ''),
+            'specialite_id': specialite_id,
+            'tarif_consultation': decimal_ou_none(valeurs.get('tarif_consultation')) or self.options['tarif_defaut'],
+            'accepte_teleconsultation': valeurs.get('accepte_teleconsultation', '').lower() in ('1', 'oui', 'true', 'o'),
+            'cabinet': {
+                'nom': valeurs.get('cabinet_nom', ''),
+                'adresse': valeurs.get('cabinet_adresse', ''),
+                'ville': valeurs.get('cabinet_ville', ''),
+                'code_postal': valeurs.get('cabinet_code_postal', ''),
+                'telephone': valeurs.get('cabinet_telephone', ''),
+                'latitude': decimal_ou_none(valeurs.get('latitude')),
+                'longitude': decimal_ou_none(valeurs.get('longitude')),
+            },
+        }
+
+    @transaction.atomic
+    def importer_lot(self, lot):
+        """Upsert d'un lot {numero_rpps: données} : cabinets, professionnels puis liens"""
+        existants, titulaires = {}, {}
+        for professionnel_id, rpps, email in Professionnel.objects.filter(
+            Q(numero_rpps__in=lot.keys()) | Q(email__in=[donnees['email'] for donnees in lot.values()])
+        ).values_list('id', 'numero_rpps', 'email'):
+            if rpps in lot:
+                existants[rpps] = professionnel_id
+            titulaires[email] = (rpps, professionnel_id)
+
+        adoptes = []
+        for rpps, donnees in list(lot.items()):
+            titulaire, professionnel_id = titulaires.get(donnees['email'], (rpps, None))
+            if titulaire == rpps:
+                continue
+            if rpps not in existants and (titulaire is None or titulaire.startswith('TEMP')):
+                # Compte inscrit en ligne sans RPPS : il reçoit le numéro importé
+                adoptes.append(Professionnel(id=professionnel_id, numero_rpps=rpps))
+                existants[rpps] = professionnel_id
+            else:
+                del lot[rpps]
+                self.stats['rejetees'] += 1
+        Professionnel.objects.bulk_update(adoptes, ['numero_rpps'])
+
+        nouveaux_cabinets = {}
+        for donnees in lot.values():
+            cabinet = donnees['cabinet']
+            if not cabinet['nom']:
+                continue
+            cle = cle_cabinet(cabinet['nom'], cabinet['adresse'], cabinet['code_postal'])
+            if cle not in self.cabinets and cle not in nouveaux_cabinets:
+                nouveaux_cabinets[cle] = Cabinet(**cabinet)
+        if nouveaux_cabinets:
+            Cabinet.objects.bulk_create(nouveaux_cabinets.values(), batch_size=self.options['lot'])
+            self.cabinets.update({cle: cabinet.id for cle, cabinet in nouveaux_cabinets.items()})
+            self.stats['cabinets'] += len(nouveaux_cabinets)
+
+        Professionnel.objects.bulk_create(
+            [
+                Professionnel(
+                    statut_validation=self.options['statut'],
+                    **{champ: valeur for champ, valeur in donnees.items() if champ != 'cabinet'}
+                )
+                for donnees in lot.values()
+            ],
+            batch_size=self.options['lot'],
+            update_conflicts=True,
+            unique_fields=['numero_rpps'],
+            update_fields=CHAMPS_MIS_A_JOUR,
+        )
+        ids = dict(Professionnel.objects.filter(numero_rpps__in=lot.keys()).values_list('numero_rpps', 'id'))
+        mis_a_jour = sum(1 for rpps in lot if rpps in existants)
+        self.stats['mis_a_jour'] += mis_a_jour
+        self.stats['crees'] += len(lot) - mis_a_jour
+
+        liens = []
+        for rpps, donnees in lot.items():
+            cabinet = donnees['cabinet']
+            if cabinet['nom']:
+                cabinet_id = self.cabinets[cle_cabinet(cabinet['nom'], cabinet['adresse'], cabinet['code_postal'])]
+                liens.append(ProfessionnelCabinet(professionnel_id=ids[rpps], cabinet_id=cabinet_id))
+        ProfessionnelCabinet.objects.bulk_create(liens, batch_size=self.options['lot'], ignore_conflicts=True)
+
+        search.indexer_professionnels(Professionnel.objects.filter(id__in=ids.values()))
+
+    def afficher_progression(self, debut):
+        duree = time.perf_counter() - debut
+        self.stdout.write(f"  {self.stats['lues']} lignes ({self.stats['lues'] / max(duree, 1e-9):.0f} lignes/s)")
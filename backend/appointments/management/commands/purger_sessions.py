@@ -0,0 +1,12 @@
+from django.core.management import call_command
+
+from appointments.management.base import CommandePeriodique
+
+
+class Command(CommandePeriodique):
+    help = 'Purge les sessions expirées de django_session (clearsessions), une fois ou périodiquement'
+    intervalle = 3600
+
+    def passage(self, options):
+        call_command('clearsessions')
+        return True, 'Sessions expirées purgées'
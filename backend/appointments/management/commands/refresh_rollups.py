@@ -0,0 +1,27 @@
+from appointments import rollups
+from appointments.management.base import CommandePeriodique
+
+
+class Command(CommandePeriodique):
+    help = (
+        'Met à jour les agrégats quotidiens des statistiques : seulement les jours écoulés ou touchés '
+        'depuis le passage précédent (à lancer périodiquement)'
+    )
+    intervalle = 900
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--complet', action='store_true', help='Recalcule tous les jours passés')
+        parser.add_argument('--lot', type=int, default=rollups.JOURS_PAR_LOT, help='Jours recalculés par transaction')
+
+    def passage(self, options):
+        jours, lignes = rollups.rafraichir(
+            complet=options['complet'], jours_par_lot=options['lot'], progression=self.progression
+        )
+        # --complet ne vaut que pour le premier passage
+        options['complet'] = False
+        return jours, f'{jours} jours recalculés ({lignes} lignes)'
+
+    def progression(self, faits, total):
+        if total > 1:
+            self.stdout.write(f'  {faits}/{total} jours')
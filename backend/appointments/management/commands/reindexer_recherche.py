@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appointments import search
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit le document et l\'index de recherche de tous les professionnels'
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        total = search.reindexer_tout()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total} professionnels indexés en {time.perf_counter() - debut:.1f}s'
+        ))
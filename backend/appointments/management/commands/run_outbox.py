@@ -0,0 +1,31 @@
+import time
+
+from appointments import outbox
+from appointments.management.base import CommandePeriodique
+
+
+class Command(CommandePeriodique):
+    help = (
+        "Draine l'outbox des événements : envoie les notifications par lots, avec nouvel essai en cas d'échec. "
+        "Purge toutes les heures les événements traités anciens"
+    )
+    intervalle = 2
+    derniere_purge = 0
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--lot', type=int, default=outbox.TAILLE_LOT, help='Événements par lot')
+        parser.add_argument(
+            '--conserver', type=int, default=7,
+            help='Jours de conservation des événements traités avant purge (défaut : 7)'
+        )
+
+    def passage(self, options):
+        if time.monotonic() - self.derniere_purge > 3600:
+            purges = outbox.purger(options['conserver'])
+            self.derniere_purge = time.monotonic()
+            if purges:
+                self.stdout.write(f'  {purges} événements traités purgés')
+
+        evenements, envoyes, echecs = outbox.drainer(taille_lot=options['lot'])
+        return evenements, f'{evenements} événements traités ({envoyes} messages, {echecs} échecs)'
@@ -0,0 +1,77 @@
+# Generated by Django 6.0 on 2026-10-18 07:57
+"""
+Deux rendez-vous non annulés d'un professionnel ne peuvent pas se chevaucher.
+
+- rendezvous_creneau_unique (toutes les bases) : même professionnel, date et heure
+  de début. Gardée aussi sur PostgreSQL : c'est le seul rempart en base si
+  l'exclusion ci-dessous n'a pas pu être créée, et Django la connaît (validation des
+  modèles, état des migrations) alors que l'exclusion est en SQL brut.
+- rendezvous_sans_chevauchement (PostgreSQL) : contrainte d'exclusion sur les
+  intervalles qui se chevauchent, plus stricte. Prérequis : l'extension btree_gist,
+  déjà installée (CREATE EXTENSION btree_gist par un superutilisateur) ou que le rôle
+  des migrations peut créer (extension « trusted » depuis PostgreSQL 13 : droit CREATE
+  sur la base). À défaut, la migration passe sans l'exclusion avec un avertissement ;
+  relancer `migrate appointments 0005` puis `migrate` une fois l'extension installée.
+"""
+import warnings
+
+from django.db import DatabaseError, migrations, models, transaction
+
+
+EXCLUSION_SQL = """
+ALTER TABLE appointments_rendezvous
+    ADD CONSTRAINT rendezvous_sans_chevauchement
+    EXCLUDE USING gist (
+        professionnel_id WITH =,
+        tsrange(date + heure_debut, date + heure_fin) WITH &&
+    ) WHERE (statut <> 'annule');
+"""
+
+
+def creer_btree_gist(schema_editor):
+    """Installe btree_gist si besoin ; renvoie False si le rôle n'en a pas le droit"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'btree_gist'")
+        if cursor.fetchone():
+            return True
+    try:
+        # Point de sauvegarde : l'échec ne doit pas annuler la transaction de la migration
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    except DatabaseError as e:
+        warnings.warn(
+            f"Extension btree_gist non créée ({e}) : la contrainte d'exclusion "
+            "rendezvous_sans_chevauchement est omise, seule rendezvous_creneau_unique protège "
+            "des doubles réservations en base. Voir appointments/migrations/0006.",
+            RuntimeWarning
+        )
+        return False
+    return True
+
+
+def ajouter_exclusion(apps, schema_editor):
+    """Interdit les chevauchements de rendez-vous au niveau de PostgreSQL"""
+    if schema_editor.connection.vendor == 'postgresql' and creer_btree_gist(schema_editor):
+        schema_editor.execute(EXCLUSION_SQL)
+
+
+def retirer_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE appointments_rendezvous DROP CONSTRAINT IF EXISTS rendezvous_sans_chevauchement'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_alter_professionnel_password_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='rendezvous',
+            constraint=models.UniqueConstraint(condition=models.Q(('statut', 'annule'), _negated=True), fields=('professionnel', 'date', 'heure_debut'), name='rendezvous_creneau_unique'),
+        ),
+        migrations.RunPython(ajouter_exclusion, retirer_exclusion),
+    ]
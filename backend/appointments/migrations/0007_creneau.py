@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 07:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_rendezvous_creneau_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Creneau',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('heure_debut', models.TimeField(verbose_name='Heure de début')),
+                ('heure_fin', models.TimeField(verbose_name='Heure de fin')),
+                ('statut', models.CharField(choices=[('libre', 'Libre'), ('reserve', 'Réservé')], default='libre', max_length=10)),
+                ('cabinet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='creneaux', to='appointments.cabinet')),
+                ('disponibilite', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='creneaux', to='appointments.disponibilitehoraire', verbose_name='Disponibilité horaire')),
+                ('professionnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='creneaux', to='appointments.professionnel', verbose_name='Professionnel')),
+            ],
+            options={
+                'verbose_name': 'Créneau',
+                'verbose_name_plural': 'Créneaux',
+                'ordering': ['date', 'heure_debut'],
+                'indexes': [models.Index(fields=['professionnel', 'date', 'heure_debut'], name='appointment_profess_0cb4c5_idx')],
+                'unique_together': {('disponibilite', 'date', 'heure_debut')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_creneau'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['date', 'heure_debut', 'id'], name='rendezvous_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['professionnel', 'date', 'heure_debut'], name='rendezvous_pro_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0 on 2026-10-18 08:03
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(texte.lower().split())
+
+
+def creer_index(apps, schema_editor):
+    """Index trigramme (PostgreSQL) ou table FTS5 (SQLite) sur le document de recherche"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX professionnel_recherche_trgm ON appointments_professionnel '
+            'USING gin (document_recherche gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE appointments_professionnel_fts USING fts5("
+            "document, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def supprimer_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS professionnel_recherche_trgm')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS appointments_professionnel_fts')
+
+
+def remplir_documents(apps, schema_editor):
+    Professionnel = apps.get_model('appointments', 'Professionnel')
+    professionnels = list(Professionnel.objects.select_related('specialite').prefetch_related('cabinets'))
+    for professionnel in professionnels:
+        cabinets = list(professionnel.cabinets.all())
+        parties = [professionnel.nom, professionnel.prenom, professionnel.specialite.nom]
+        parties += sorted({cabinet.ville for cabinet in cabinets})
+        parties += sorted({cabinet.code_postal for cabinet in cabinets})
+        professionnel.document_recherche = normaliser(' '.join(parties))
+    Professionnel.objects.bulk_update(professionnels, ['document_recherche'], batch_size=1000)
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO appointments_professionnel_fts (rowid, document) VALUES (%s, %s)',
+                [(p.id, p.document_recherche) for p in professionnels]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_rendezvous_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professionnel',
+            name='document_recherche',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Nom, spécialité, villes et codes postaux sans accents (voir search.py)', verbose_name='Document de recherche'),
+        ),
+        migrations.RunPython(creer_index, supprimer_index),
+        migrations.RunPython(remplir_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0009_professionnel_document_recherche'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cabinet',
+            index=models.Index(fields=['latitude', 'longitude'], name='appointment_latitud_0e9518_idx'),
+        ),
+    ]
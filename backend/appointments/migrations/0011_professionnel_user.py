@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 08:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def lier_par_email(apps, schema_editor):
+    """Relie chaque professionnel au compte utilisateur de même email (comptes professionnels en priorité)"""
+    Professionnel = apps.get_model('appointments', 'Professionnel')
+    User = apps.get_model('appointments', 'User')
+    comptes = {}
+    for user_id, email, type_compte in User.objects.exclude(email='').values_list('id', 'email', 'type_compte'):
+        cle = email.lower()
+        priorite = (type_compte != 'professionnel', user_id)
+        if cle not in comptes or priorite < comptes[cle]:
+            comptes[cle] = priorite
+
+    deja_lies = set(Professionnel.objects.filter(user__isnull=False).values_list('user_id', flat=True))
+    a_lier = []
+    for professionnel in Professionnel.objects.filter(user__isnull=True).only('id', 'email').order_by('id'):
+        compte = comptes.get(professionnel.email.lower())
+        if compte and compte[1] not in deja_lies:
+            professionnel.user_id = compte[1]
+            deja_lies.add(compte[1])
+            a_lier.append(professionnel)
+    Professionnel.objects.bulk_update(a_lier, ['user'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0010_cabinet_coordonnees_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professionnel',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='professionnel', to=settings.AUTH_USER_MODEL, verbose_name='Compte utilisateur'),
+        ),
+        migrations.RunPython(lier_par_email, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_professionnel_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('rappel_envoye', False), ('statut', 'confirme')), fields=['date', 'heure_debut', 'id'], name='rendezvous_rappel_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 08:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0012_rendezvous_rappel_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Evenement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('rendez_vous_cree', 'Rendez-vous créé'), ('rendez_vous_statut', 'Statut de rendez-vous modifié'), ('professionnel_validation', 'Validation de professionnel')], max_length=30)),
+                ('donnees', models.JSONField(default=dict, verbose_name='Données')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('traite', 'Traité'), ('echec', 'Échec')], default='en_attente', max_length=10)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('prochain_essai', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochain essai')),
+                ('derniere_erreur', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_traitement', models.DateTimeField(blank=True, null=True, verbose_name='Date de traitement')),
+            ],
+            options={
+                'verbose_name': 'Événement',
+                'verbose_name_plural': 'Événements',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('statut', 'en_attente')), fields=['prochain_essai', 'id'], name='evenement_a_traiter_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0013_evenement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JourARecalculer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Date')),
+            ],
+            options={
+                'verbose_name': 'Jour à recalculer',
+                'verbose_name_plural': 'Jours à recalculer',
+            },
+        ),
+        migrations.CreateModel(
+            name='RepereStatistiques',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jusqu_au', models.DateField(verbose_name="Jours agrégés jusqu'au")),
+                ('modifies_depuis', models.DateTimeField(verbose_name='Modifications relues depuis')),
+                ('date_calcul', models.DateTimeField(auto_now=True, verbose_name='Date du calcul')),
+            ],
+            options={
+                'verbose_name': 'Repère des statistiques',
+                'verbose_name_plural': 'Repères des statistiques',
+            },
+        ),
+        migrations.CreateModel(
+            name='StatistiqueJour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('statut', models.CharField(choices=[('confirme', 'Confirmé'), ('annule', 'Annulé'), ('termine', 'Terminé'), ('no_show', 'Patient absent')], max_length=10)),
+                ('mode', models.CharField(choices=[('presentiel', 'Présentiel'), ('teleconsultation', 'Téléconsultation')], max_length=20)),
+                ('nombre', models.PositiveIntegerField(verbose_name='Nombre de rendez-vous')),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Montant')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière',
+                'verbose_name_plural': 'Statistiques journalières',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['date_modification'], name='rendezvous_modification_idx'),
+        ),
+        migrations.AddField(
+            model_name='statistiquejour',
+            name='cabinet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='appointments.cabinet'),
+        ),
+        migrations.AddField(
+            model_name='statistiquejour',
+            name='professionnel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='appointments.professionnel'),
+        ),
+        migrations.AddIndex(
+            model_name='statistiquejour',
+            index=models.Index(fields=['professionnel', 'date'], name='statistique_jour_pro_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='statistiquejour',
+            constraint=models.UniqueConstraint(fields=('date', 'professionnel', 'cabinet', 'statut', 'mode'), name='statistique_jour_unique'),
+        ),
+    ]
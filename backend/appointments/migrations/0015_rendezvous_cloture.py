@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0014_statistiques_jour'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rendezvous',
+            name='absence_a_verifier',
+            field=models.BooleanField(default=False, help_text='Clôturé automatiquement sans confirmation de présence (voir cloturer_rendez_vous)', verbose_name='Absence à vérifier'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'confirme')), fields=['date', 'heure_debut', 'id'], name='rendezvous_confirme_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'confirme')), fields=['patient', 'date', 'heure_debut', 'id'], name='rendezvous_patient_venir_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(condition=models.Q(('statut', 'confirme')), fields=['professionnel', 'date', 'heure_debut', 'id'], name='rendezvous_pro_venir_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0015_rendezvous_cloture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rendezvous',
+            name='rappel_reserve_jusqu_au',
+            field=models.DateTimeField(blank=True, help_text='Envoi du rappel en cours par un worker (voir envoyer_rappels)', null=True, verbose_name="Rappel réservé jusqu'au"),
+        ),
+    ]
@@ -66,6 +66,13 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def get_session_auth_hash(self):
+        # Compte relu du cache des sessions (appointments.authentication) : sans le hachage
+        # du mot de passe, l'empreinte calculée à la mise en cache le remplace
+        if 'password' in self.get_deferred_fields() and getattr(self, 'empreinte_session', None):
+            return self.empreinte_session
+        return super().get_session_auth_hash()
+
 
 class Specialite(models.Model):
     nom = models.CharField(max_length=100, unique=True, verbose_name="Nom de la spécialité")
@@ -97,15 +104,33 @@ class Cabinet(models.Model):
         verbose_name = "Cabinet"
         verbose_name_plural = "Cabinets"
         ordering = ['nom']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude']),
+        ]
 
     def __str__(self):
         return f"{self.nom} - {self.ville}"
 
 
+class ProfessionnelQuerySet(models.QuerySet):
+
+    def avec_relations(self):
+        """Précharge ce qu'utilise ProfessionnelSerializer (spécialité et cabinets)"""
+        return self.select_related('specialite').prefetch_related('cabinets')
+
+
 class Professionnel(models.Model):
     nom = models.CharField(max_length=100)
     prenom = models.CharField(max_length=100, verbose_name="Prénom")
     email = models.EmailField(unique=True)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='professionnel',
+        verbose_name="Compte utilisateur"
+    )
     password_hash = models.CharField(max_length=255, blank=True, default='', verbose_name="Mot de passe (hashé)")
     telephone = models.CharField(max_length=20, blank=True, default='', verbose_name="Téléphone")
     
@@ -160,6 +185,14 @@ class Professionnel(models.Model):
     
     date_inscription = models.DateTimeField(auto_now_add=True, verbose_name="Date d'inscription")
     
+    document_recherche = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Document de recherche",
+        help_text="Nom, spécialité, villes et codes postaux sans accents (voir search.py)"
+    )
+    
     cabinets = models.ManyToManyField(
         Cabinet,
         through='ProfessionnelCabinet',
@@ -167,6 +200,8 @@ class Professionnel(models.Model):
         verbose_name="Cabinets"
     )
     
+    objects = ProfessionnelQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Professionnel"
         verbose_name_plural = "Professionnels"
@@ -262,6 +297,56 @@ class DisponibiliteHoraire(models.Model):
         return f"{self.professionnel} - {self.get_jour_semaine_display()} {self.heure_debut}-{self.heure_fin}"
 
 
+class Creneau(models.Model):
+    """Créneau matérialisé à partir d'une DisponibiliteHoraire, sur l'horizon de réservation"""
+    disponibilite = models.ForeignKey(
+        DisponibiliteHoraire,
+        on_delete=models.CASCADE,
+        related_name='creneaux',
+        verbose_name="Disponibilité horaire"
+    )
+    professionnel = models.ForeignKey(
+        Professionnel,
+        on_delete=models.CASCADE,
+        related_name='creneaux',
+        verbose_name="Professionnel"
+    )
+    cabinet = models.ForeignKey(Cabinet, on_delete=models.CASCADE, related_name='creneaux')
+    
+    date = models.DateField(verbose_name="Date")
+    heure_debut = models.TimeField(verbose_name="Heure de début")
+    heure_fin = models.TimeField(verbose_name="Heure de fin")
+    
+    STATUT_CHOICES = [
+        ('libre', 'Libre'),
+        ('reserve', 'Réservé'),
+    ]
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default='libre')
+    
+    class Meta:
+        verbose_name = "Créneau"
+        verbose_name_plural = "Créneaux"
+        ordering = ['date', 'heure_debut']
+        unique_together = ['disponibilite', 'date', 'heure_debut']
+        indexes = [
+            models.Index(fields=['professionnel', 'date', 'heure_debut']),
+        ]
+
+    def __str__(self):
+        return f"{self.professionnel} - {self.date} {self.heure_debut} ({self.get_statut_display()})"
+
+
+class RendezVousQuerySet(models.QuerySet):
+
+    def avec_relations(self):
+        """Précharge ce qu'utilise RendezVousSerializer (professionnel, cabinet, motif et leurs relations)"""
+        return self.select_related(
+            'professionnel__specialite',
+            'cabinet',
+            'motif_consultation__specialite'
+        ).prefetch_related('professionnel__cabinets')
+
+
 class RendezVous(models.Model):
     patient = models.ForeignKey(
         User, 
@@ -314,6 +399,16 @@ class RendezVous(models.Model):
     date_annulation = models.DateTimeField(null=True, blank=True, verbose_name="Date d'annulation")
     
     rappel_envoye = models.BooleanField(default=False, verbose_name="Rappel envoyé")
+    rappel_reserve_jusqu_au = models.DateTimeField(
+        null=True, blank=True, verbose_name="Rappel réservé jusqu'au",
+        help_text="Envoi du rappel en cours par un worker (voir envoyer_rappels)"
+    )
+    absence_a_verifier = models.BooleanField(
+        default=False, verbose_name="Absence à vérifier",
+        help_text="Clôturé automatiquement sans confirmation de présence (voir cloturer_rendez_vous)"
+    )
+    
+    objects = RendezVousQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Rendez-vous"
@@ -322,6 +417,40 @@ class RendezVous(models.Model):
         indexes = [
             models.Index(fields=['date', 'professionnel']),
             models.Index(fields=['patient', 'date']),
+            models.Index(fields=['date', 'heure_debut', 'id'], name='rendezvous_keyset_idx'),
+            models.Index(fields=['professionnel', 'date', 'heure_debut'], name='rendezvous_pro_keyset_idx'),
+            models.Index(
+                fields=['date', 'heure_debut', 'id'],
+                condition=models.Q(rappel_envoye=False, statut='confirme'),
+                name='rendezvous_rappel_idx'
+            ),
+            # Rendez-vous modifiés depuis le dernier refresh_rollups
+            models.Index(fields=['date_modification'], name='rendezvous_modification_idx'),
+            # Rendez-vous confirmés : à venir une fois les passés clôturés par cloturer_rendez_vous
+            models.Index(
+                fields=['date', 'heure_debut', 'id'],
+                condition=models.Q(statut='confirme'),
+                name='rendezvous_confirme_idx'
+            ),
+            models.Index(
+                fields=['patient', 'date', 'heure_debut', 'id'],
+                condition=models.Q(statut='confirme'),
+                name='rendezvous_patient_venir_idx'
+            ),
+            models.Index(
+                fields=['professionnel', 'date', 'heure_debut', 'id'],
+                condition=models.Q(statut='confirme'),
+                name='rendezvous_pro_venir_idx'
+            ),
+        ]
+        # Sur PostgreSQL s'y ajoute la contrainte d'exclusion rendezvous_sans_chevauchement
+        # (migration 0006, qui explique pourquoi les deux sont gardées)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['professionnel', 'date', 'heure_debut'],
+                condition=~models.Q(statut='annule'),
+                name='rendezvous_creneau_unique'
+            ),
         ]
 
     def __str__(self):
@@ -351,3 +480,104 @@ class Favoris(models.Model):
 
     def __str__(self):
         return f"{self.patient} - Favori: {self.professionnel}"
+
+
+class Evenement(models.Model):
+    """
+    Outbox : événement métier écrit dans la transaction qui le produit,
+    puis transformé en notifications par le worker run_outbox (voir outbox.py).
+    """
+    TYPE_CHOICES = [
+        ('rendez_vous_cree', 'Rendez-vous créé'),
+        ('rendez_vous_statut', 'Statut de rendez-vous modifié'),
+        ('professionnel_validation', 'Validation de professionnel'),
+    ]
+    type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    donnees = models.JSONField(default=dict, verbose_name="Données")
+    
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('traite', 'Traité'),
+        ('echec', 'Échec'),
+    ]
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default='en_attente')
+    tentatives = models.PositiveIntegerField(default=0)
+    prochain_essai = models.DateTimeField(default=timezone.now, verbose_name="Prochain essai")
+    derniere_erreur = models.TextField(blank=True, verbose_name="Dernière erreur")
+    
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    date_traitement = models.DateTimeField(null=True, blank=True, verbose_name="Date de traitement")
+    
+    class Meta:
+        verbose_name = "Événement"
+        verbose_name_plural = "Événements"
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['prochain_essai', 'id'],
+                condition=models.Q(statut='en_attente'),
+                name='evenement_a_traiter_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_display()} #{self.id} ({self.get_statut_display()})"
+
+
+class StatistiqueJour(models.Model):
+    """
+    Agrégat quotidien des rendez-vous passés, recalculé par refresh_rollups (voir rollups.py)
+    et lu par les statistiques à la place de RendezVous
+    """
+    date = models.DateField(verbose_name="Date")
+    professionnel = models.ForeignKey(Professionnel, on_delete=models.CASCADE, related_name='+')
+    cabinet = models.ForeignKey(Cabinet, on_delete=models.CASCADE, related_name='+')
+    statut = models.CharField(max_length=10, choices=RendezVous.STATUT_CHOICES)
+    mode = models.CharField(max_length=20, choices=RendezVous.MODE_CHOICES)
+    nombre = models.PositiveIntegerField(verbose_name="Nombre de rendez-vous")
+    montant = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Montant")
+    
+    class Meta:
+        verbose_name = "Statistique journalière"
+        verbose_name_plural = "Statistiques journalières"
+        indexes = [
+            models.Index(fields=['professionnel', 'date'], name='statistique_jour_pro_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'professionnel', 'cabinet', 'statut', 'mode'],
+                name='statistique_jour_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.professionnel_id}/{self.cabinet_id} {self.statut} {self.mode} : {self.nombre}"
+
+
+class JourARecalculer(models.Model):
+    """Jour passé dont un rendez-vous a changé ou disparu depuis le dernier refresh_rollups"""
+    date = models.DateField(unique=True, verbose_name="Date")
+    
+    class Meta:
+        verbose_name = "Jour à recalculer"
+        verbose_name_plural = "Jours à recalculer"
+
+    def __str__(self):
+        return str(self.date)
+
+
+class RepereStatistiques(models.Model):
+    """
+    Ligne unique : état du dernier refresh_rollups. Les agrégats couvrent les jours
+    jusqu'à `jusqu_au` ; les rendez-vous modifiés depuis `modifies_depuis` restent à relire.
+    """
+    jusqu_au = models.DateField(verbose_name="Jours agrégés jusqu'au")
+    modifies_depuis = models.DateTimeField(verbose_name="Modifications relues depuis")
+    date_calcul = models.DateTimeField(auto_now=True, verbose_name="Date du calcul")
+    
+    class Meta:
+        verbose_name = "Repère des statistiques"
+        verbose_name_plural = "Repères des statistiques"
+
+    def __str__(self):
+        return f"Statistiques jusqu'au {self.jusqu_au}"
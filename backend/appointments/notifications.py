@@ -0,0 +1,69 @@
+"""
+Envoi des notifications (email, SMS) par un backend interchangeable.
+
+NOTIFICATIONS_BACKEND donne le chemin de la classe :
+- ConsoleBackend : affiche les messages (développement)
+- FichierBackend : ajoute les messages en NDJSON à NOTIFICATIONS_FICHIER
+- MemoireBackend : conserve les messages dans MemoireBackend.envoyes (tests)
+Un message est un dict : cle (clé d'idempotence), canal ('email' ou 'sms'),
+destinataire, sujet, corps. Les backends reçoivent les messages par lots.
+"""
+import json
+import sys
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class ConsoleBackend:
+
+    def __init__(self, flux=None):
+        self.flux = flux or sys.stdout
+
+    def envoyer(self, messages):
+        for message in messages:
+            self.flux.write(
+                f"[{message['canal']}] {message['destinataire']} : {message['sujet']}\n{message['corps']}\n\n"
+            )
+        self.flux.flush()
+        return len(messages)
+
+
+class FichierBackend:
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or settings.NOTIFICATIONS_FICHIER
+
+    def envoyer(self, messages):
+        with open(self.chemin, 'a', encoding='utf-8') as fichier:
+            fichier.writelines(json.dumps(message, ensure_ascii=False) + '\n' for message in messages)
+        return len(messages)
+
+
+class MemoireBackend:
+
+    envoyes = []
+
+    def envoyer(self, messages):
+        MemoireBackend.envoyes.extend(messages)
+        return len(messages)
+
+
+def messages_pour(cle, preference, email, telephone, sujet, corps_email, corps_sms):
+    """Messages d'un destinataire selon sa préférence ('email', 'sms', 'les_deux' ou 'aucune')"""
+    messages = []
+    if preference in ('email', 'les_deux') and email:
+        messages.append({
+            'cle': f'{cle}-email', 'canal': 'email', 'destinataire': email,
+            'sujet': sujet, 'corps': corps_email,
+        })
+    if preference in ('sms', 'les_deux') and telephone:
+        messages.append({
+            'cle': f'{cle}-sms', 'canal': 'sms', 'destinataire': telephone,
+            'sujet': sujet, 'corps': corps_sms,
+        })
+    return messages
+
+
+def obtenir_backend():
+    return import_string(settings.NOTIFICATIONS_BACKEND)()
@@ -0,0 +1,223 @@
+"""
+Outbox transactionnelle des notifications.
+
+Les vues n'envoient rien : publier() écrit un Evenement dans la transaction de
+la modification métier, il n'existe donc que si celle-ci est validée. Le worker
+(manage.py run_outbox) draine la table par lots :
+- réservation : SELECT ... FOR UPDATE SKIP LOCKED des événements dus, dont
+  prochain_essai est repoussé de DUREE_RESERVATION, puis validation immédiate ;
+  aucun verrou n'est tenu pendant l'envoi et plusieurs workers se partagent la file
+- rendu des messages depuis l'état courant des données (une requête par modèle
+  pour tout le lot) et envoi en un seul appel au backend ; si cet appel échoue,
+  les événements sont renvoyés un à un pour isoler les fautifs
+- un UPDATE marque les événements traités ; les échecs sont reprogrammés avec un
+  délai exponentiel, jusqu'à TENTATIVES_MAX
+Un worker arrêté en cours de lot laisse ses événements réservés : ils redeviennent
+dus à l'expiration de la réservation. La livraison est donc au moins une fois ;
+les messages portent la clé d'idempotence evenement-<id>.
+"""
+import random
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Evenement, Professionnel, RendezVous
+from .notifications import messages_pour, obtenir_backend
+
+
+TAILLE_LOT = 500
+TENTATIVES_MAX = 8
+DUREE_RESERVATION = timedelta(minutes=5)
+DELAI_BASE = timedelta(seconds=30)
+DELAI_MAX = timedelta(hours=1)
+
+STATUTS_PATIENT = {
+    'confirme': 'confirmé',
+    'annule': 'annulé',
+}
+
+
+def publier(type, **donnees):
+    """Enregistre un événement ; à appeler dans la transaction de la modification qu'il décrit"""
+    return Evenement.objects.create(type=type, donnees=donnees)
+
+
+def delai_nouvel_essai(tentatives):
+    """Délai exponentiel (DELAI_BASE, x2 par tentative, plafonné à DELAI_MAX) avec ±20 % d'aléa"""
+    delai = min(DELAI_BASE * 2 ** (tentatives - 1), DELAI_MAX)
+    return delai * random.uniform(0.8, 1.2)
+
+
+def contexte_rendez_vous(rdv):
+    return {
+        'prenom': rdv.patient.first_name,
+        'patient': f'{rdv.patient.first_name} {rdv.patient.last_name}',
+        'pro_nom': rdv.professionnel.nom,
+        'pro_prenom': rdv.professionnel.prenom,
+        'date': rdv.date.strftime('%d/%m/%Y'),
+        'heure': rdv.heure_debut.strftime('%H:%M'),
+        'lieu': 'en téléconsultation' if rdv.mode == 'teleconsultation' else (
+            f'{rdv.cabinet.nom}, {rdv.cabinet.adresse} {rdv.cabinet.ville}'
+        ),
+    }
+
+
+def messages_patient(cle, rdv, sujet, corps):
+    patient = rdv.patient
+    return messages_pour(
+        cle, patient.preference_notification, patient.email, patient.telephone,
+        sujet, f'Bonjour {patient.first_name},\n\n{corps}', f'Medi4ll : {corps}'
+    )
+
+
+def rendu_rendez_vous_cree(cle, donnees, objets):
+    rdv = objets['rendez_vous'].get(donnees['rendez_vous_id'])
+    if rdv is None:
+        return []
+    contexte = contexte_rendez_vous(rdv)
+    return messages_patient(
+        cle, rdv, 'Rendez-vous confirmé le {date} à {heure}'.format(**contexte),
+        'Votre rendez-vous avec Dr {pro_prenom} {pro_nom} le {date} à {heure}, {lieu}, est confirmé.'.format(**contexte)
+    )
+
+
+def rendu_rendez_vous_statut(cle, donnees, objets):
+    """Le patient est prévenu des changements faits par le professionnel, le professionnel des annulations du patient"""
+    rdv = objets['rendez_vous'].get(donnees['rendez_vous_id'])
+    if rdv is None:
+        return []
+    contexte = contexte_rendez_vous(rdv)
+    if donnees['par'] == 'patient':
+        if donnees['statut'] != 'annule':
+            return []
+        return messages_pour(
+            cle, 'email', rdv.professionnel.email, '',
+            'Annulation du {date} à {heure}'.format(**contexte),
+            '{patient} a annulé son rendez-vous du {date} à {heure}.'.format(**contexte), ''
+        )
+    if donnees['statut'] not in STATUTS_PATIENT:
+        return []
+    contexte['statut'] = STATUTS_PATIENT[donnees['statut']]
+    return messages_patient(
+        cle, rdv, 'Rendez-vous {statut} ({date} à {heure})'.format(**contexte),
+        'Votre rendez-vous avec Dr {pro_prenom} {pro_nom} le {date} à {heure} a été {statut}.'.format(**contexte)
+    )
+
+
+def rendu_professionnel_validation(cle, donnees, objets):
+    professionnel = objets['professionnels'].get(donnees['professionnel_id'])
+    if professionnel is None or donnees['statut'] == 'en_attente':
+        return []
+    if donnees['statut'] == 'valide':
+        sujet, corps = 'Compte validé', 'Votre compte Medi4ll est validé : vos disponibilités sont désormais visibles des patients.'
+    else:
+        sujet, corps = 'Compte refusé', "Votre demande d'inscription sur Medi4ll n'a pas été acceptée."
+    return messages_pour(cle, 'email', professionnel.email, '', sujet, f'Bonjour Dr {professionnel.nom},\n\n{corps}', '')
+
+
+RENDUS = {
+    'rendez_vous_cree': rendu_rendez_vous_cree,
+    'rendez_vous_statut': rendu_rendez_vous_statut,
+    'professionnel_validation': rendu_professionnel_validation,
+}
+
+
+def charger_objets(lot):
+    """Objets référencés par les événements du lot, en une requête par modèle"""
+    rendez_vous_ids = {e.donnees['rendez_vous_id'] for e in lot if 'rendez_vous_id' in e.donnees}
+    professionnel_ids = {e.donnees['professionnel_id'] for e in lot if 'professionnel_id' in e.donnees}
+    return {
+        'rendez_vous': RendezVous.objects.select_related('patient', 'professionnel', 'cabinet').in_bulk(rendez_vous_ids),
+        'professionnels': Professionnel.objects.in_bulk(professionnel_ids),
+    }
+
+
+def reserver(taille_lot, echeance):
+    """
+    Réserve les événements dus à `echeance` les plus anciens ; renvoie la liste (vide si
+    rien à faire). La réservation court à partir de l'heure réelle, pas de `echeance`.
+    """
+    with transaction.atomic():
+        lot = Evenement.objects.filter(statut='en_attente', prochain_essai__lte=echeance).order_by('prochain_essai', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            lot = lot.select_for_update(skip_locked=True)
+        lot = list(lot[:taille_lot])
+        if lot:
+            Evenement.objects.filter(id__in=[e.id for e in lot]).update(
+                prochain_essai=timezone.now() + DUREE_RESERVATION
+            )
+    return lot
+
+
+def envoyer_lot(lot, backend):
+    """Envoie les messages du lot ; renvoie (messages envoyés, {id: erreur} des événements en échec)"""
+    messages, erreurs = {}, {}
+    objets = charger_objets(lot)
+    for evenement in lot:
+        try:
+            messages[evenement.id] = RENDUS[evenement.type](f'evenement-{evenement.id}', evenement.donnees, objets)
+        except Exception as e:
+            erreurs[evenement.id] = e
+
+    tous = [message for liste in messages.values() for message in liste]
+    try:
+        return (backend.envoyer(tous) if tous else 0), erreurs
+    except Exception:
+        pass
+
+    envoyes = 0
+    for evenement_id, liste in messages.items():
+        try:
+            envoyes += backend.envoyer(liste) if liste else 0
+        except Exception as e:
+            erreurs[evenement_id] = e
+    return envoyes, erreurs
+
+
+def traiter_lot(taille_lot=TAILLE_LOT, backend=None, maintenant=None):
+    """
+    Réserve et traite un lot d'événements dus à `maintenant` (défaut : l'heure courante) ;
+    renvoie (événements réservés, messages envoyés, échecs)
+    """
+    lot = reserver(taille_lot, maintenant or timezone.now())
+    if not lot:
+        return 0, 0, 0
+
+    envoyes, erreurs = envoyer_lot(lot, backend or obtenir_backend())
+    Evenement.objects.filter(id__in=[e.id for e in lot if e.id not in erreurs]).update(
+        statut='traite', tentatives=F('tentatives') + 1, date_traitement=timezone.now(), derniere_erreur=''
+    )
+    for evenement in lot:
+        if evenement.id in erreurs:
+            evenement.tentatives += 1
+            evenement.derniere_erreur = repr(erreurs[evenement.id])
+            if evenement.tentatives >= TENTATIVES_MAX:
+                evenement.statut = 'echec'
+            else:
+                evenement.prochain_essai = timezone.now() + delai_nouvel_essai(evenement.tentatives)
+            evenement.save(update_fields=['tentatives', 'derniere_erreur', 'statut', 'prochain_essai'])
+    return len(lot), envoyes, len(erreurs)
+
+
+def drainer(taille_lot=TAILLE_LOT, backend=None, maintenant=None):
+    """
+    Traite tous les événements dus au début du drainage (ou à `maintenant`), lot par lot ;
+    renvoie (événements, messages envoyés, échecs). Chaque lot est réservé à l'heure de sa
+    réservation : un drainage long ne laisse pas d'événements réservés déjà expirés.
+    """
+    maintenant = maintenant or timezone.now()
+    backend = backend or obtenir_backend()
+    totaux = [0, 0, 0]
+    while True:
+        resultat = traiter_lot(taille_lot, backend, maintenant)
+        if not resultat[0]:
+            return tuple(totaux)
+        totaux = [total + n for total, n in zip(totaux, resultat)]
+
+
+def purger(jours):
+    """Supprime les événements traités depuis plus de `jours` jours ; renvoie leur nombre"""
+    limite = timezone.now() - timedelta(days=jours)
+    return Evenement.objects.filter(statut='traite', date_traitement__lt=limite).delete()[0]
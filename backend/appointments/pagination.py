@@ -0,0 +1,139 @@
+"""
+Pagination par curseur (keyset) pour les listes volumineuses.
+
+Le curseur est opaque pour le client : il encode les valeurs des champs de tri
+du dernier élément renvoyé. La page suivante est lue avec un WHERE sur ces
+valeurs (parcours d'index) au lieu d'un OFFSET qui relit toutes les lignes.
+"""
+import base64
+import json
+from datetime import date, time
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+
+
+PAGE_SIZE_DEFAUT = 20
+PAGE_SIZE_MAX = 200
+COMPTE_MAX = 10000
+
+
+def encoder_curseur(valeurs):
+    """Encode une liste de valeurs de tri en curseur opaque"""
+    brut = json.dumps([v.isoformat() if isinstance(v, (date, time)) else v for v in valeurs])
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip('=')
+
+
+def decoder_curseur(curseur):
+    """Décode un curseur ; lève ValueError s'il est invalide"""
+    try:
+        brut = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        valeurs = json.loads(brut)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Curseur invalide') from e
+    if not isinstance(valeurs, list):
+        raise ValueError('Curseur invalide')
+    return valeurs
+
+
+def valeurs_curseur(modele, ordre, valeurs):
+    """Valeurs du curseur converties selon les champs de tri ; lève ValueError si l'une est invalide"""
+    if len(valeurs) != len(ordre):
+        raise ValueError('Curseur invalide')
+    converties = []
+    for champ, valeur in zip(ordre, valeurs):
+        if valeur is None or isinstance(valeur, (list, dict)):
+            raise ValueError('Curseur invalide')
+        try:
+            converties.append(modele._meta.get_field(champ.lstrip('-')).to_python(valeur))
+        except (ValidationError, TypeError) as e:
+            raise ValueError('Curseur invalide') from e
+    return converties
+
+
+def filtre_apres(ordre, valeurs):
+    """
+    Construit le filtre « strictement après » le curseur pour un tri multi-champs :
+    (a > va) OR (a = va AND b > vb) OR ...
+    """
+    filtre = Q()
+    egalites = {}
+    for champ, valeur in zip(ordre, valeurs):
+        nom = champ.lstrip('-')
+        operateur = 'lt' if champ.startswith('-') else 'gt'
+        filtre |= Q(**egalites, **{f'{nom}__{operateur}': valeur})
+        egalites[nom] = valeur
+    return filtre
+
+
+def compter(queryset, mode):
+    """
+    Compte les éléments selon le mode demandé :
+    - exact : COUNT(*) complet
+    - approx : estimation du planificateur PostgreSQL pour une table non filtrée,
+      sinon COUNT borné à COMPTE_MAX
+    Renvoie (compte, exact).
+    """
+    if mode == 'exact':
+        return queryset.count(), True
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            ligne = cursor.fetchone()
+        if ligne and ligne[0] >= 0:
+            return ligne[0], False
+    compte = queryset.order_by()[:COMPTE_MAX + 1].count()
+    return min(compte, COMPTE_MAX), compte <= COMPTE_MAX
+
+
+def paginer(queryset, request, ordre):
+    """
+    Pagine un queryset par curseur.
+    Paramètres de requête :
+    - cursor : curseur renvoyé par la page précédente (next_cursor)
+    - page_size : nombre d'éléments (PAGE_SIZE_DEFAUT par défaut, PAGE_SIZE_MAX au plus)
+    - count : 'exact' ou 'approx' pour inclure le nombre total d'éléments
+    Renvoie (éléments de la page, métadonnées) ; lève ValueError si un paramètre est invalide.
+    """
+    page_size = int(request.GET.get('page_size', PAGE_SIZE_DEFAUT))
+    if page_size < 1:
+        raise ValueError('page_size invalide')
+    page_size = min(page_size, PAGE_SIZE_MAX)
+
+    mode_compte = request.GET.get('count')
+    meta = {}
+    if mode_compte in ('exact', 'approx'):
+        meta['count'], meta['count_exact'] = compter(queryset, mode_compte)
+
+    queryset = queryset.order_by(*ordre)
+    curseur = request.GET.get('cursor')
+    if curseur:
+        valeurs = valeurs_curseur(queryset.model, ordre, decoder_curseur(curseur))
+        queryset = queryset.filter(filtre_apres(ordre, valeurs))
+
+    elements = list(queryset[:page_size + 1])
+    suivant = None
+    if len(elements) > page_size:
+        elements = elements[:page_size]
+        dernier = elements[-1]
+        suivant = encoder_curseur([getattr(dernier, champ.lstrip('-')) for champ in ordre])
+    meta['next_cursor'] = suivant
+    return elements, meta
+
+
+def reponse_paginee(queryset, request, ordre, serializer_class):
+    """Réponse {results, next_cursor[, count, count_exact]} pour un queryset paginé par curseur"""
+    try:
+        elements, meta = paginer(queryset, request, ordre)
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres de pagination invalides'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({'results': serializer_class(elements, many=True).data, **meta})
@@ -0,0 +1,163 @@
+"""
+Profilage des requêtes HTTP par vue.
+
+ProfilageMiddleware mesure, pour une fraction PROFILAGE_ECHANTILLON des requêtes :
+- la durée totale de la vue (middlewares suivants compris)
+- le nombre de requêtes SQL et leur durée cumulée (connection.execute_wrapper)
+- les requêtes en double : même SQL paramétré exécuté plusieurs fois, signe
+  d'un N+1 ; les listes IN (%s, %s, ...) sont ramenées à une seule empreinte
+Les mesures sont renvoyées dans l'en-tête Server-Timing (visible dans l'onglet
+réseau du navigateur) et conservées par nom d'URL dans un tampon circulaire de
+PROFILAGE_TAILLE entrées, dont resume() calcule p50/p95/p99.
+
+Hors échantillon, le coût est un tirage aléatoire : le middleware peut rester
+actif en production avec un taux faible. Les agrégats sont propres à chaque
+processus. Les requêtes exécutées pendant la lecture d'une réponse en flux
+(exports) ne sont pas comptées. Sous ASGI, le middleware reste asynchrone pour
+ne pas forcer les vues async dans un thread.
+"""
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+
+DOUBLONS_CONSERVES = 20
+
+_LISTE_PARAMETRES = re.compile(r'\((?:%s, )+%s\)')
+_verrou = threading.Lock()
+_mesures = defaultdict(lambda: deque(maxlen=settings.PROFILAGE_TAILLE))
+_doublons = defaultdict(Counter)
+
+
+def empreinte(sql):
+    """SQL paramétré normalisé : les listes IN de longueurs différentes se confondent"""
+    return _LISTE_PARAMETRES.sub('(%s, ...)', sql)
+
+
+class Mesureur:
+    """execute_wrapper : compte et chronomètre les requêtes SQL"""
+
+    def __init__(self):
+        self.requetes = []
+        self.duree = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree += time.perf_counter() - debut
+            self.requetes.append(sql)
+
+    def doublons(self):
+        """{empreinte: nombre d'exécutions} des requêtes exécutées plus d'une fois"""
+        compte = Counter()
+        for sql, n in Counter(self.requetes).items():
+            compte[empreinte(sql)] += n
+        return {sql: n for sql, n in compte.items() if n > 1}
+
+
+class ProfilageMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asynchrone = iscoroutinefunction(get_response)
+        if self.asynchrone:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asynchrone:
+            return self.__acall__(request)
+        if random.random() >= settings.PROFILAGE_ECHANTILLON:
+            return self.get_response(request)
+
+        mesureur = Mesureur()
+        debut = time.perf_counter()
+        with connection.execute_wrapper(mesureur):
+            response = self.get_response(request)
+        return self.terminer(request, response, mesureur, time.perf_counter() - debut)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PROFILAGE_ECHANTILLON:
+            return await self.get_response(request)
+
+        # Les connexions sont propres à chaque thread : le wrapper est posé dans le
+        # thread où s'exécutent les appels sync_to_async (thread_sensitive) de la requête
+        mesureur = Mesureur()
+        pile = ExitStack()
+        await sync_to_async(lambda: pile.enter_context(connection.execute_wrapper(mesureur)))()
+        debut = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pile.close)()
+        return self.terminer(request, response, mesureur, time.perf_counter() - debut)
+
+    def terminer(self, request, response, mesureur, duree):
+        doublons = mesureur.doublons()
+        response['Server-Timing'] = (
+            f'app;dur={duree * 1000:.1f}, '
+            f'db;desc="{len(mesureur.requetes)} requetes";dur={mesureur.duree * 1000:.1f}, '
+            f'doublons;desc="{sum(doublons.values()) - len(doublons)} requetes en double"'
+        )
+        match = request.resolver_match
+        if match is not None and match.url_name:
+            enregistrer(match.url_name, duree, len(mesureur.requetes), mesureur.duree, doublons)
+        return response
+
+
+def enregistrer(nom, duree, requetes, duree_bd, doublons):
+    with _verrou:
+        _mesures[nom].append((duree, requetes, duree_bd))
+        if doublons:
+            compteur = _doublons[nom]
+            compteur.update(doublons)
+            if len(compteur) > DOUBLONS_CONSERVES * 2:
+                _doublons[nom] = Counter(dict(compteur.most_common(DOUBLONS_CONSERVES)))
+
+
+def centile(valeurs_triees, p):
+    """Centile par rang le plus proche d'une liste triée non vide"""
+    return valeurs_triees[max(0, math.ceil(p / 100 * len(valeurs_triees)) - 1)]
+
+
+def resume():
+    """Statistiques par nom d'URL, vues les plus lentes (p95) en premier ; durées en millisecondes"""
+    with _verrou:
+        mesures = {nom: list(tampon) for nom, tampon in _mesures.items()}
+        doublons = {nom: compteur.most_common(5) for nom, compteur in _doublons.items()}
+
+    vues = []
+    for nom, lignes in mesures.items():
+        durees = sorted(duree * 1000 for duree, _, _ in lignes)
+        requetes = sorted(n for _, n, _ in lignes)
+        vues.append({
+            'vue': nom,
+            'echantillons': len(lignes),
+            'duree_ms': {f'p{p}': round(centile(durees, p), 1) for p in (50, 95, 99)},
+            'requetes': {'moyenne': round(sum(requetes) / len(requetes), 1), 'p95': centile(requetes, 95)},
+            'duree_bd_ms_moyenne': round(sum(duree_bd for _, _, duree_bd in lignes) * 1000 / len(lignes), 1),
+            'doublons': [{'sql': sql, 'executions': n} for sql, n in doublons.get(nom, [])],
+        })
+    vues.sort(key=lambda vue: vue['duree_ms']['p95'], reverse=True)
+    return {
+        'echantillonnage': settings.PROFILAGE_ECHANTILLON,
+        'taille_tampon': settings.PROFILAGE_TAILLE,
+        'vues': vues,
+    }
+
+
+def reinitialiser():
+    with _verrou:
+        _mesures.clear()
+        _doublons.clear()
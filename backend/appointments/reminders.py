@@ -0,0 +1,137 @@
+"""
+Rappels de rendez-vous.
+
+Les rendez-vous confirmés sans rappel (index partiel rendezvous_rappel_idx)
+commençant dans la fenêtre de RAPPELS_DELAI_HEURES heures sont parcourus par
+lots, dans l'ordre (date, heure_debut, id), comme la file de outbox.py :
+- réservation : lecture verrouillée (SKIP LOCKED, plusieurs workers possibles)
+  et rappel_reserve_jusqu_au repoussé de DUREE_RESERVATION, puis validation
+  immédiate ; aucun verrou n'est tenu pendant l'envoi
+- rendu des messages, envoi, puis un seul UPDATE de rappel_envoye
+Après un arrêt brutal ou un envoi en échec, le lot redevient dû à l'expiration
+de la réservation ; chaque message porte la clé d'idempotence rappel-<id> pour
+que le fournisseur écarte les doublons.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import RendezVous
+from .notifications import messages_pour, obtenir_backend
+from .pagination import filtre_apres
+
+
+TAILLE_LOT = 1000
+DUREE_RESERVATION = timedelta(minutes=5)
+ORDRE = ['date', 'heure_debut', 'id']
+
+SUJET = 'Rappel : rendez-vous le {date} à {heure}'
+CORPS_EMAIL = (
+    'Bonjour {prenom},\n\n'
+    'Nous vous rappelons votre rendez-vous avec Dr {pro_prenom} {pro_nom} '
+    'le {date} à {heure}, {lieu}.\n\n'
+    "En cas d'empêchement, merci de l'annuler depuis votre espace Medi4ll."
+)
+CORPS_SMS = 'Medi4ll : RDV avec Dr {pro_nom} le {date} à {heure}, {lieu}.'
+
+CHAMPS = [
+    'id', 'date', 'heure_debut', 'mode',
+    'patient__first_name', 'patient__email', 'patient__telephone', 'patient__preference_notification',
+    'professionnel__nom', 'professionnel__prenom',
+    'cabinet__nom', 'cabinet__adresse', 'cabinet__ville',
+]
+
+
+def fenetre(maintenant, heures):
+    """
+    Filtre des rendez-vous commençant entre maintenant et maintenant + heures :
+    intervalle de dates (parcours d'index) puis exclusion des heures hors bornes.
+    """
+    debut = timezone.localtime(maintenant)
+    fin = debut + timedelta(hours=heures)
+    return (
+        Q(date__range=(debut.date(), fin.date()))
+        & ~Q(date=debut.date(), heure_debut__lt=debut.time())
+        & ~Q(date=fin.date(), heure_debut__gt=fin.time())
+    )
+
+
+def rendez_vous_a_rappeler(maintenant=None, heures=None):
+    """Rendez-vous confirmés sans rappel dans la fenêtre (parcours de l'index partiel)"""
+    heures = settings.RAPPELS_DELAI_HEURES if heures is None else heures
+    return RendezVous.objects.filter(
+        fenetre(maintenant or timezone.now(), heures), rappel_envoye=False, statut='confirme'
+    )
+
+
+def reserver(rendez_vous, apres, taille_lot):
+    """Réserve le lot suivant le curseur `apres` (rendez-vous non réservés par un autre worker)"""
+    maintenant = timezone.now()
+    with transaction.atomic():
+        lot = rendez_vous.filter(
+            Q(rappel_reserve_jusqu_au__isnull=True) | Q(rappel_reserve_jusqu_au__lte=maintenant)
+        ).order_by(*ORDRE)
+        if apres:
+            lot = lot.filter(filtre_apres(ORDRE, apres))
+        if connection.features.has_select_for_update_skip_locked:
+            lot = lot.select_for_update(skip_locked=True, of=('self',))
+        lignes = list(lot.values(*CHAMPS)[:taille_lot])
+        if lignes:
+            RendezVous.objects.filter(id__in=[ligne['id'] for ligne in lignes]).update(
+                rappel_reserve_jusqu_au=maintenant + DUREE_RESERVATION
+            )
+    return lignes
+
+
+def messages_rappel(ligne):
+    """Messages (email et/ou SMS selon la préférence du patient) d'un rendez-vous lu par values()"""
+    contexte = {
+        'prenom': ligne['patient__first_name'],
+        'pro_nom': ligne['professionnel__nom'],
+        'pro_prenom': ligne['professionnel__prenom'],
+        'date': ligne['date'].strftime('%d/%m/%Y'),
+        'heure': ligne['heure_debut'].strftime('%H:%M'),
+        'lieu': 'en téléconsultation' if ligne['mode'] == 'teleconsultation' else (
+            f"{ligne['cabinet__nom']}, {ligne['cabinet__adresse']} {ligne['cabinet__ville']}"
+        ),
+    }
+    return messages_pour(
+        f"rappel-{ligne['id']}", ligne['patient__preference_notification'],
+        ligne['patient__email'], ligne['patient__telephone'],
+        SUJET.format(**contexte), CORPS_EMAIL.format(**contexte), CORPS_SMS.format(**contexte)
+    )
+
+
+def traiter_lot(rendez_vous, apres, taille_lot, backend):
+    """
+    Réserve et envoie les rappels du lot suivant le curseur `apres` ; si l'envoi
+    lève une exception, le lot sera repris à l'expiration de la réservation.
+    Renvoie (dernières valeurs de tri ou None si plus rien, rendez-vous traités, messages envoyés).
+    """
+    lignes = reserver(rendez_vous, apres, taille_lot)
+    if not lignes:
+        return None, 0, 0
+
+    messages = [message for ligne in lignes for message in messages_rappel(ligne)]
+    envoyes = backend.envoyer(messages) if messages else 0
+    RendezVous.objects.filter(id__in=[ligne['id'] for ligne in lignes]).update(
+        rappel_envoye=True, rappel_reserve_jusqu_au=None
+    )
+    dernier = lignes[-1]
+    return [dernier[champ] for champ in ORDRE], len(lignes), envoyes
+
+
+def envoyer_rappels(maintenant=None, heures=None, taille_lot=TAILLE_LOT, backend=None):
+    """Envoie tous les rappels dus ; renvoie (rendez-vous traités, messages envoyés)"""
+    rendez_vous = rendez_vous_a_rappeler(maintenant, heures)
+    backend = backend or obtenir_backend()
+    apres, traites, envoyes = None, 0, 0
+    while True:
+        apres, n, m = traiter_lot(rendez_vous, apres, taille_lot, backend)
+        if apres is None:
+            return traites, envoyes
+        traites += n
+        envoyes += m
@@ -0,0 +1,102 @@
+"""
+Agrégats quotidiens des rendez-vous (StatistiqueJour).
+
+Une ligne par (date, professionnel, cabinet, statut, mode) avec le nombre de
+rendez-vous et leur montant, pour les jours passés uniquement : aujourd'hui et
+l'avenir changent sans cesse et restent lus dans RendezVous.
+
+refresh_rollups ne recalcule que les jours touchés depuis le passage précédent :
+- jours écoulés depuis RepereStatistiques.jusqu_au
+- jours des rendez-vous dont date_modification dépasse le repère (écritures en
+  masse sans signal, comme generer_donnees)
+- jours signalés dans JourARecalculer par les signaux (suppressions, que
+  date_modification ne peut pas voir)
+Chaque lot de jours est supprimé puis réinséré dans une transaction, à partir
+d'une requête GROUP BY. Le repère est reculé de MARGE pour relire les
+transactions validées pendant le calcul : recalculer un jour deux fois est sans effet.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .analytics import MONTANT
+from .bulk import inserer_en_masse
+from .models import JourARecalculer, RendezVous, RepereStatistiques, StatistiqueJour
+
+
+JOURS_PAR_LOT = 31
+MARGE = timedelta(minutes=5)
+CHAMPS = ['date', 'professionnel_id', 'cabinet_id', 'statut', 'mode']
+
+
+def signaler(*dates):
+    """Marque les jours passés à recalculer (les autres seront agrégés une fois écoulés)"""
+    aujourd_hui = timezone.localdate()
+    jours = [JourARecalculer(date=jour) for jour in set(dates) if jour < aujourd_hui]
+    if jours:
+        JourARecalculer.objects.bulk_create(jours, ignore_conflicts=True)
+
+
+def jours_a_recalculer(repere, hier):
+    """Jours jusqu'à hier à recalculer d'après le repère (tous sans repère)"""
+    if repere is None:
+        return set(RendezVous.objects.filter(date__lte=hier).values_list('date', flat=True).distinct().order_by())
+
+    # Filtre sur date_modification seul et sans DISTINCT : SQLite parcourrait sinon
+    # tout l'index des dates au lieu de rendezvous_modification_idx
+    modifies = (
+        RendezVous.objects.filter(date_modification__gte=repere.modifies_depuis)
+        .values_list('date', flat=True).order_by()
+    )
+    jours = {jour for jour in modifies.iterator() if jour <= hier}
+    jours.update(JourARecalculer.objects.filter(date__lte=hier).values_list('date', flat=True))
+    jour = repere.jusqu_au + timedelta(days=1)
+    while jour <= hier:
+        jours.add(jour)
+        jour += timedelta(days=1)
+    return jours
+
+
+def recalculer(jours):
+    """Remplace les agrégats des jours donnés ; renvoie le nombre de lignes écrites"""
+    with transaction.atomic():
+        # Marques retirées d'abord : une modification validée pendant le calcul en repose une
+        JourARecalculer.objects.filter(date__in=jours).delete()
+        StatistiqueJour.objects.filter(date__in=jours).delete()
+        lignes = (
+            RendezVous.objects.filter(date__in=jours)
+            .values(*CHAMPS)
+            .annotate(nombre=Count('id'), montant=Sum(MONTANT))
+            .values_list(*CHAMPS, 'nombre', 'montant')
+            .order_by()
+        )
+        return inserer_en_masse(StatistiqueJour, CHAMPS + ['nombre', 'montant'], lignes.iterator())
+
+
+def rafraichir(complet=False, jours_par_lot=JOURS_PAR_LOT, progression=None):
+    """
+    Met à jour les agrégats jusqu'à hier ; `complet` les recalcule tous.
+    `progression(jours faits, jours à faire)` est appelé après chaque lot.
+    Renvoie (jours recalculés, lignes écrites).
+    """
+    debut = timezone.now()
+    hier = timezone.localdate() - timedelta(days=1)
+    repere = None if complet else RepereStatistiques.objects.first()
+    if complet:
+        with transaction.atomic():
+            StatistiqueJour.objects.all().delete()
+            JourARecalculer.objects.all().delete()
+
+    jours = sorted(jours_a_recalculer(repere, hier))
+    lignes = 0
+    for i in range(0, len(jours), jours_par_lot):
+        lignes += recalculer(jours[i:i + jours_par_lot])
+        if progression:
+            progression(min(i + jours_par_lot, len(jours)), len(jours))
+
+    RepereStatistiques.objects.update_or_create(
+        id=1, defaults={'jusqu_au': hier, 'modifies_depuis': debut - MARGE}
+    )
+    return len(jours), lignes
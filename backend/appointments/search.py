@@ -0,0 +1,138 @@
+"""
+Recherche plein texte des professionnels.
+
+Chaque Professionnel porte un document de recherche dénormalisé
+(document_recherche) : nom, prénom, spécialité, villes et codes postaux de
+ses cabinets, en minuscules et sans accents. Il est indexé :
+- PostgreSQL : index GIN trigramme (pg_trgm), classement par similarité
+- SQLite : table virtuelle FTS5 appointments_professionnel_fts, classement bm25
+- autres bases : simple filtre sur le document
+Le document est tenu à jour par les signaux (voir signals.py).
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Professionnel, ProfessionnelCabinet
+
+
+TABLE_FTS = 'appointments_professionnel_fts'
+TAILLE_LOT = 1000
+
+
+def normaliser(texte):
+    """Minuscules, sans accents, espaces simples"""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(texte.lower().split())
+
+
+def termes(texte):
+    """Découpe une recherche en termes normalisés (lettres et chiffres uniquement)"""
+    return re.findall(r'\w+', normaliser(texte))
+
+
+def construire_document(nom, prenom, specialite, cabinets):
+    """Document de recherche d'un professionnel ; cabinets : [(ville, code postal), ...]"""
+    parties = [nom, prenom, specialite]
+    parties += sorted({ville for ville, _ in cabinets})
+    parties += sorted({code_postal for _, code_postal in cabinets})
+    return normaliser(' '.join(parties))
+
+
+def fts_disponible():
+    return connection.vendor == 'sqlite'
+
+
+def synchroniser_fts(documents):
+    """Remplace les entrées FTS5 des professionnels donnés : [(id, document), ...]"""
+    if not fts_disponible() or not documents:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE_FTS} WHERE rowid = %s', [(i,) for i, _ in documents])
+        cursor.executemany(f'INSERT INTO {TABLE_FTS} (rowid, document) VALUES (%s, %s)', documents)
+
+
+def supprimer_fts(professionnel_id):
+    if fts_disponible():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE_FTS} WHERE rowid = %s', [professionnel_id])
+
+
+def indexer_professionnels(queryset):
+    """Recalcule et enregistre le document de recherche des professionnels du queryset"""
+    professionnels = list(queryset.order_by().values_list('id', 'nom', 'prenom', 'specialite__nom'))
+    cabinets = defaultdict(list)
+    for professionnel_id, ville, code_postal in ProfessionnelCabinet.objects.filter(
+        professionnel_id__in=[professionnel[0] for professionnel in professionnels]
+    ).values_list('professionnel_id', 'cabinet__ville', 'cabinet__code_postal'):
+        cabinets[professionnel_id].append((ville, code_postal))
+    documents = [
+        (professionnel_id, construire_document(nom, prenom, specialite, cabinets[professionnel_id]))
+        for professionnel_id, nom, prenom, specialite in professionnels
+    ]
+    enregistrer_documents(documents)
+    synchroniser_fts(documents)
+    return len(documents)
+
+
+def enregistrer_documents(documents):
+    """
+    Écrit les documents [(id, document), ...] par un UPDATE préparé exécuté en série :
+    bulk_update générerait un CASE WHEN par ligne, quadratique à compiler sur de gros lots.
+    """
+    if not documents:
+        return
+    table = Professionnel._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {table} SET document_recherche = %s WHERE id = %s',
+            [(document, professionnel_id) for professionnel_id, document in documents]
+        )
+
+
+def reindexer_tout():
+    """Reconstruit l'index de recherche complet, par lots"""
+    if fts_disponible():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE_FTS}')
+    total = 0
+    ids = list(Professionnel.objects.order_by('id').values_list('id', flat=True))
+    for debut in range(0, len(ids), TAILLE_LOT):
+        total += indexer_professionnels(Professionnel.objects.filter(id__in=ids[debut:debut + TAILLE_LOT]))
+    return total
+
+
+def rechercher(queryset, texte):
+    """Filtre un queryset de professionnels sur une recherche et le trie par pertinence"""
+    mots = termes(texte)
+    if not mots:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        for mot in mots:
+            queryset = queryset.filter(document_recherche__contains=mot)
+        return queryset.annotate(
+            rang=TrigramWordSimilarity(' '.join(mots), 'document_recherche')
+        ).order_by('-rang', 'nom', 'prenom')
+
+    if fts_disponible():
+        requete = ' '.join(f'"{mot}"*' for mot in mots)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {TABLE_FTS} WHERE {TABLE_FTS} MATCH %s', [requete])
+        ).annotate(
+            rang=RawSQL(
+                f'SELECT bm25({TABLE_FTS}) FROM {TABLE_FTS} '
+                f'WHERE {TABLE_FTS} MATCH %s AND rowid = appointments_professionnel.id',
+                [requete]
+            )
+        ).order_by('rang', 'nom', 'prenom')
+
+    for mot in mots:
+        queryset = queryset.filter(document_recherche__contains=mot)
+    return queryset
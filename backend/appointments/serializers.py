@@ -48,7 +48,7 @@ class RendezVousSerializer(serializers.ModelSerializer):
         model = RendezVous
         fields = ['id', 'professionnel', 'cabinet', 'motif_consultation', 'date', 
                   'heure_debut', 'heure_fin', 'statut', 'mode', 'notes_patient', 
-                  'rappel_envoye', 'date_creation']
+                  'rappel_envoye', 'absence_a_verifier', 'date_creation']
 
 
 class DisponibiliteHoraireSerializer(serializers.ModelSerializer):
@@ -63,8 +63,7 @@ class DisponibiliteHoraireSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         cabinet_id = validated_data.pop('cabinet_id')
         cabinet = Cabinet.objects.get(id=cabinet_id)
-        professionnel = self.context.get('professionnel')
-        return DisponibiliteHoraire.objects.create(cabinet=cabinet, professionnel=professionnel, **validated_data)
+        return DisponibiliteHoraire.objects.create(cabinet=cabinet, **validated_data)
     
     def update(self, instance, validated_data):
         cabinet_id = validated_data.pop('cabinet_id', None)
@@ -0,0 +1,127 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import (
+    Specialite, Cabinet, Professionnel, ProfessionnelCabinet,
+    MotifConsultation, DisponibiliteHoraire, RendezVous, User
+)
+from . import rollups, slots, search
+from . import cache as reference_cache
+from .authentication import VERSION_COMPTES, oublier_utilisateur
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def utilisateur_modifie(sender, instance, **kwargs):
+    """
+    Le compte mis en cache pour les sessions doit être relu : un compte désactivé ou dont
+    le mot de passe a changé est déconnecté dès sa requête suivante, sans attendre
+    UTILISATEUR_CACHE_TTL. Un QuerySet.update() sur User ne passe pas par ce signal.
+    """
+    oublier_utilisateur(instance.id)
+
+
+@receiver(post_save, sender=DisponibiliteHoraire)
+def disponibilite_enregistree(sender, instance, raw=False, **kwargs):
+    """Régénère les créneaux matérialisés de la règle (la suppression passe par le CASCADE)"""
+    if not raw:
+        slots.regenerer_regle(instance)
+
+
+@receiver(post_save, sender=RendezVous)
+@receiver(post_delete, sender=RendezVous)
+def rendez_vous_modifie(sender, instance, raw=False, **kwargs):
+    """Réserve ou libère les créneaux touchés par le rendez-vous"""
+    if not raw:
+        slots.recalculer_statuts(instance.professionnel_id, instance.date)
+
+
+@receiver(post_save, sender=RendezVous)
+@receiver(post_delete, sender=RendezVous)
+def rendez_vous_statistiques(sender, instance, raw=False, **kwargs):
+    """Un jour passé déjà agrégé doit être recalculé par refresh_rollups"""
+    if not raw:
+        rollups.signaler(instance.date)
+
+
+@receiver(post_save, sender=Professionnel)
+def professionnel_enregistre(sender, instance, raw=False, **kwargs):
+    """Met à jour le document de recherche du professionnel"""
+    if not raw:
+        search.indexer_professionnels(Professionnel.objects.filter(id=instance.id))
+
+
+@receiver(post_delete, sender=Professionnel)
+def professionnel_supprime(sender, instance, **kwargs):
+    search.supprimer_fts(instance.id)
+
+
+@receiver(post_save, sender=Professionnel)
+@receiver(post_delete, sender=Professionnel)
+def comptes_professionnels_invalider(sender, instance, raw=False, **kwargs):
+    """Le professionnel mémorisé en session (ou son absence) doit être réévalué (voir authentication.py)"""
+    if not raw:
+        reference_cache.invalider(VERSION_COMPTES)
+
+
+@receiver(post_save, sender=Specialite)
+def specialite_enregistree(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.indexer_professionnels(instance.professionnels.all())
+
+
+@receiver(post_save, sender=Cabinet)
+def cabinet_enregistre(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.indexer_professionnels(Professionnel.objects.filter(cabinets=instance))
+
+
+@receiver(pre_delete, sender=Cabinet)
+def cabinet_avant_suppression(sender, instance, **kwargs):
+    instance._professionnel_ids = list(instance.professionnels.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Cabinet)
+def cabinet_supprime(sender, instance, **kwargs):
+    search.indexer_professionnels(Professionnel.objects.filter(id__in=getattr(instance, '_professionnel_ids', [])))
+
+
+@receiver(post_save, sender=ProfessionnelCabinet)
+@receiver(post_delete, sender=ProfessionnelCabinet)
+def professionnel_cabinet_modifie(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.indexer_professionnels(Professionnel.objects.filter(id=instance.professionnel_id))
+
+
+@receiver(m2m_changed, sender=Professionnel.cabinets.through)
+def cabinets_modifies(sender, instance, action, reverse, pk_set, **kwargs):
+    """Professionnel.cabinets.add/remove/clear (ou l'inverse depuis Cabinet)"""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        if action != 'pre_clear':
+            search.indexer_professionnels(Professionnel.objects.filter(id=instance.id))
+    elif action == 'pre_clear':
+        instance._professionnel_ids = list(instance.professionnels.values_list('id', flat=True))
+    else:
+        ids = pk_set if action != 'post_clear' else getattr(instance, '_professionnel_ids', [])
+        search.indexer_professionnels(Professionnel.objects.filter(id__in=ids or []))
+
+
+@receiver(post_save, sender=Specialite)
+@receiver(post_delete, sender=Specialite)
+def specialites_invalider_cache(sender, **kwargs):
+    reference_cache.invalider('specialites')
+    reference_cache.invalider('motifs')
+
+
+@receiver(post_save, sender=Cabinet)
+@receiver(post_delete, sender=Cabinet)
+def cabinets_invalider_cache(sender, **kwargs):
+    reference_cache.invalider('cabinets')
+
+
+@receiver(post_save, sender=MotifConsultation)
+@receiver(post_delete, sender=MotifConsultation)
+def motifs_invalider_cache(sender, **kwargs):
+    reference_cache.invalider('motifs')
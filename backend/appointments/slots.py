@@ -0,0 +1,222 @@
+"""
+Créneaux matérialisés (Creneau).
+
+Les créneaux sont générés à l'avance sur CRENEAUX_HORIZON_SEMAINES semaines par
+la commande generer_creneaux, puis tenus à jour par les signaux lorsqu'une
+DisponibiliteHoraire ou un RendezVous change. Jusqu'à la dernière date
+matérialisée d'un professionnel (le plus proche des derniers créneaux de ses
+règles), la lecture des créneaux libres est un simple parcours d'index ; au-delà,
+par exemple quand generer_creneaux n'a pas tourné depuis quelques jours, ou si
+l'une de ses règles n'a encore aucun créneau, on retombe sur le calcul à partir
+des règles (availability). Relancer generer_creneaux ne fait donc que réavancer
+la partie rapide.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .availability import (
+    STATUTS_NON_BLOQUANTS, en_minutes, depuis_minutes, format_minutes,
+    decouper_regles, fusionner_intervalles, est_occupe,
+    calculer_creneaux_jour, calculer_creneaux_periode
+)
+from .bulk import inserer_en_masse
+from .models import Creneau, DisponibiliteHoraire, RendezVous
+
+
+CHAMPS_CRENEAU = ['disponibilite', 'professionnel', 'cabinet', 'date', 'heure_debut', 'heure_fin', 'statut']
+
+
+def horizon(semaines=None):
+    """Renvoie (première date, dernière date incluse) de l'horizon matérialisé"""
+    aujourdhui = timezone.localdate()
+    semaines = semaines or settings.CRENEAUX_HORIZON_SEMAINES
+    return aujourdhui, aujourdhui + timedelta(weeks=semaines) - timedelta(days=1)
+
+
+def regles_avec_fins(professionnel_ids):
+    """Règles des professionnels annotées de leur dernier créneau (fin, None sans créneau)"""
+    return DisponibiliteHoraire.objects.filter(
+        professionnel_id__in=professionnel_ids
+    ).annotate(fin=Max('creneaux__date')).order_by('professionnel_id', 'id')
+
+
+def fins_materialisees(professionnel_ids):
+    """
+    {professionnel_id: dernière date matérialisée}, la plus proche des fins de ses règles
+    (parcours de l'index (disponibilite, date)). Un professionnel dont une règle n'a aucun
+    créneau, par exemple créée avant la matérialisation, est absent : calcul depuis les règles.
+    """
+    fins = {}
+    for professionnel_id, fin in regles_avec_fins(professionnel_ids).values_list('professionnel_id', 'fin'):
+        if professionnel_id not in fins:
+            fins[professionnel_id] = fin
+        elif fins[professionnel_id] is not None:
+            fins[professionnel_id] = fin and min(fins[professionnel_id], fin)
+    return {professionnel_id: fin for professionnel_id, fin in fins.items() if fin is not None}
+
+
+def reservations_fusionnees(professionnel_ids, date_debut, date_fin):
+    """Intervalles occupés (en minutes, fusionnés) par (professionnel_id, date)"""
+    occupes = defaultdict(list)
+    for professionnel_id, jour, debut, fin in RendezVous.objects.filter(
+        professionnel_id__in=professionnel_ids,
+        date__range=(date_debut, date_fin)
+    ).exclude(
+        statut__in=STATUTS_NON_BLOQUANTS
+    ).values_list('professionnel_id', 'date', 'heure_debut', 'heure_fin'):
+        occupes[(professionnel_id, jour)].append((en_minutes(debut), en_minutes(fin)))
+    return {cle: fusionner_intervalles(intervalles) for cle, intervalles in occupes.items()}
+
+
+def construire_creneaux(regles, date_debut, date_fin):
+    """Créneaux des règles sur la période, statut compris, en tuples dans l'ordre de CHAMPS_CRENEAU"""
+    occupes = reservations_fusionnees({regle.professionnel_id for regle in regles}, date_debut, date_fin)
+    modeles = {
+        regle.id: decouper_regles([(regle.heure_debut, regle.heure_fin, regle.duree_creneau)])
+        for regle in regles
+    }
+    jour = date_debut
+    while jour <= date_fin:
+        for regle in regles:
+            if regle.jour_semaine != jour.weekday():
+                continue
+            intervalles = occupes.get((regle.professionnel_id, jour), [])
+            for debut, fin in modeles[regle.id]:
+                yield (
+                    regle.id,
+                    regle.professionnel_id,
+                    regle.cabinet_id,
+                    jour,
+                    depuis_minutes(debut),
+                    depuis_minutes(fin),
+                    'reserve' if est_occupe(intervalles, debut, fin) else 'libre'
+                )
+        jour += timedelta(days=1)
+
+
+def regenerer_professionnel(professionnel_id, regles, date_debut, date_fin):
+    """Remplace tous les créneaux d'un professionnel (passés compris) par ceux de ses règles"""
+    with transaction.atomic():
+        Creneau.objects.filter(professionnel_id=professionnel_id).delete()
+        return inserer_en_masse(Creneau, CHAMPS_CRENEAU, construire_creneaux(regles, date_debut, date_fin))
+
+
+def regenerer_tout(progression=None, semaines=None):
+    """
+    Reconstruit les créneaux de l'horizon et purge les créneaux passés, professionnel
+    par professionnel : chaque transaction ne verrouille que les lignes d'un agenda et
+    la table reste lisible et réservable pendant la régénération.
+    `progression(professionnels faits, professionnels à faire)` est appelé après chacun.
+    """
+    date_debut, date_fin = horizon(semaines)
+    par_professionnel = defaultdict(list)
+    for regle in DisponibiliteHoraire.objects.order_by('professionnel_id', 'id'):
+        par_professionnel[regle.professionnel_id].append(regle)
+
+    total = 0
+    for i, (professionnel_id, regles) in enumerate(par_professionnel.items(), 1):
+        total += regenerer_professionnel(professionnel_id, regles, date_debut, date_fin)
+        if progression:
+            progression(i, len(par_professionnel))
+    Creneau.objects.exclude(
+        professionnel_id__in=DisponibiliteHoraire.objects.values('professionnel_id')
+    ).delete()
+    return total
+
+
+def regenerer_regle(regle):
+    """Régénère les créneaux à venir d'une règle après création ou modification"""
+    date_debut, date_fin = horizon()
+    with transaction.atomic():
+        regles = list(regles_avec_fins([regle.professionnel_id]))
+        autres = [autre for autre in regles if autre.id != regle.id]
+        if not autres or any(autre.fin is None for autre in autres):
+            # Premier agenda matérialisé du professionnel (ou règles jamais matérialisées) :
+            # ses autres règles aussi, sinon les lectures ne verraient que celle-ci
+            regenerer_professionnel(regle.professionnel_id, regles, date_debut, date_fin)
+            return
+        Creneau.objects.filter(disponibilite=regle).delete()
+        # Pas au-delà des autres règles du professionnel : sa dernière date matérialisée
+        # doit rester couverte par toutes ses règles
+        date_fin = min(date_fin, min(autre.fin for autre in autres))
+        inserer_en_masse(Creneau, CHAMPS_CRENEAU, construire_creneaux([regle], date_debut, date_fin))
+
+
+def recalculer_statuts(professionnel_id, jour):
+    """Met à jour le statut des créneaux d'un professionnel pour une date"""
+    creneaux = list(Creneau.objects.filter(
+        professionnel_id=professionnel_id, date=jour
+    ).values_list('id', 'heure_debut', 'heure_fin', 'statut'))
+    if not creneaux:
+        return
+    occupes = reservations_fusionnees([professionnel_id], jour, jour).get((professionnel_id, jour), [])
+
+    a_liberer, a_reserver = [], []
+    for creneau_id, debut, fin, statut in creneaux:
+        reserve = est_occupe(occupes, en_minutes(debut), en_minutes(fin))
+        if reserve and statut != 'reserve':
+            a_reserver.append(creneau_id)
+        elif not reserve and statut != 'libre':
+            a_liberer.append(creneau_id)
+    if a_reserver:
+        Creneau.objects.filter(id__in=a_reserver).update(statut='reserve')
+    if a_liberer:
+        Creneau.objects.filter(id__in=a_liberer).update(statut='libre')
+
+
+def creneaux_libres_jour(professionnel_id, jour, cabinet_id=None):
+    """Créneaux libres (HH:MM) d'un professionnel pour une date"""
+    date_debut = timezone.localdate()
+    fin = fins_materialisees([professionnel_id]).get(professionnel_id)
+    if fin is None or not date_debut <= jour <= fin:
+        return calculer_creneaux_jour(professionnel_id, jour, cabinet_id=cabinet_id)
+
+    creneaux = Creneau.objects.filter(professionnel_id=professionnel_id, date=jour, statut='libre')
+    if cabinet_id:
+        creneaux = creneaux.filter(cabinet_id=cabinet_id)
+    maintenant = timezone.localtime()
+    if jour == maintenant.date():
+        creneaux = creneaux.filter(heure_debut__gte=maintenant.time())
+    debuts = creneaux.order_by('heure_debut').values_list('heure_debut', flat=True)
+    return [format_minutes(minutes) for minutes in dict.fromkeys(en_minutes(debut) for debut in debuts)]
+
+
+def creneaux_libres_periode(professionnel_ids, date_debut, date_fin, cabinet_id=None):
+    """
+    Créneaux libres de plusieurs professionnels sur une période :
+    {professionnel_id: {date ISO: [HH:MM, ...]}} sans les jours vides.
+    """
+    date_debut = max(date_debut, timezone.localdate())
+    fins = fins_materialisees(professionnel_ids)
+    # Professionnels dont la période dépasse la partie matérialisée : calcul depuis les règles
+    materialises = [i for i in professionnel_ids if fins.get(i) and fins[i] >= date_fin]
+    calcules = [i for i in professionnel_ids if not (fins.get(i) and fins[i] >= date_fin)]
+    resultat = {professionnel_id: {} for professionnel_id in professionnel_ids}
+    if calcules:
+        resultat.update(calculer_creneaux_periode(calcules, date_debut, date_fin, cabinet_id=cabinet_id))
+    if not materialises:
+        return resultat
+
+    creneaux = Creneau.objects.filter(
+        professionnel_id__in=materialises,
+        date__range=(date_debut, date_fin),
+        statut='libre'
+    )
+    if cabinet_id:
+        creneaux = creneaux.filter(cabinet_id=cabinet_id)
+    maintenant = timezone.localtime()
+    for professionnel_id, jour, debut in creneaux.order_by('date', 'heure_debut').values_list(
+        'professionnel_id', 'date', 'heure_debut'
+    ):
+        if jour == maintenant.date() and debut < maintenant.time():
+            continue
+        heures = resultat[professionnel_id].setdefault(jour.isoformat(), [])
+        heure = format_minutes(en_minutes(debut))
+        if not heures or heures[-1] != heure:
+            heures.append(heure)
+    return resultat
@@ -0,0 +1,79 @@
+"""
+Clôture des rendez-vous passés.
+
+Un rendez-vous reste 'confirme' tant que personne ne change son statut : les
+rendez-vous confirmés finis depuis CLOTURE_DELAI_HEURES heures passent ici à
+'termine' (avec revue=True, ils sont de plus marqués absence_a_verifier pour
+que le professionnel confirme la présence ou signale un no_show). Les index
+partiels sur statut='confirme' ne contiennent alors plus que des rendez-vous à
+venir, et les listes « à venir » les parcourent sans lire l'historique.
+
+Parcours par lots dans l'ordre (date, heure_debut, id) de l'index partiel
+rendezvous_confirme_idx. Chaque lot est une transaction courte : lecture
+verrouillée des identifiants (SKIP LOCKED : une réservation ou un changement de
+statut en cours n'attend pas), puis un seul UPDATE ensembliste. Aucun signal
+n'est envoyé : date_modification est mise à jour et les jours sont signalés aux
+agrégats (rollups.py) ; le statut 'termine' bloque les créneaux comme 'confirme'.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import rollups
+from .models import RendezVous
+from .pagination import filtre_apres
+
+
+TAILLE_LOT = 1000
+ORDRE = ['date', 'heure_debut', 'id']
+
+
+def rendez_vous_a_cloturer(maintenant=None, heures=None):
+    """Rendez-vous confirmés finis depuis plus de `heures` heures (CLOTURE_DELAI_HEURES par défaut)"""
+    heures = settings.CLOTURE_DELAI_HEURES if heures is None else heures
+    limite = timezone.localtime(maintenant or timezone.now()) - timedelta(hours=heures)
+    return RendezVous.objects.filter(
+        Q(date__lt=limite.date()) | Q(date=limite.date(), heure_fin__lte=limite.time()),
+        statut='confirme'
+    )
+
+
+def traiter_lot(rendez_vous, apres, taille_lot, revue):
+    """
+    Clôture le lot suivant le curseur `apres`.
+    Renvoie (dernières valeurs de tri ou None si plus rien, rendez-vous clôturés).
+    """
+    with transaction.atomic():
+        lot = rendez_vous.order_by(*ORDRE)
+        if apres:
+            lot = lot.filter(filtre_apres(ORDRE, apres))
+        if connection.features.has_select_for_update_skip_locked:
+            lot = lot.select_for_update(skip_locked=True)
+        lignes = list(lot.values_list(*ORDRE)[:taille_lot])
+        if not lignes:
+            return None, 0
+
+        clotures = RendezVous.objects.filter(id__in=[ligne[2] for ligne in lignes], statut='confirme').update(
+            statut='termine', absence_a_verifier=revue, date_modification=timezone.now()
+        )
+        rollups.signaler(*{ligne[0] for ligne in lignes})
+    return list(lignes[-1]), clotures
+
+
+def cloturer(maintenant=None, heures=None, taille_lot=TAILLE_LOT, revue=False, progression=None):
+    """
+    Clôture tous les rendez-vous passés dus ; `progression(clôturés, dernier jour traité)`
+    est appelé après chaque lot. Renvoie le nombre de rendez-vous clôturés.
+    """
+    rendez_vous = rendez_vous_a_cloturer(maintenant, heures)
+    apres, total = None, 0
+    while True:
+        apres, n = traiter_lot(rendez_vous, apres, taille_lot, revue)
+        if apres is None:
+            return total
+        total += n
+        if progression:
+            progression(total, apres[0])
@@ -1,2 +1,1416 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import DatabaseError, connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+
+from . import benchmark, exports, outbox, pagination, profiling, reminders, search, slots, sweeper
+from . import cache as reference_cache
+from .availability import calculer_creneaux_libres
+from .notifications import MemoireBackend
+from .models import (
+    User, Specialite, Cabinet, Professionnel, MotifConsultation,
+    DisponibiliteHoraire, Creneau, RendezVous, Evenement, JourARecalculer, StatistiqueJour
+)
+
+
+def prochain_jour(jour_semaine):
+    """Renvoie la prochaine date (hors aujourd'hui) tombant un jour_semaine donné"""
+    jour = date.today() + timedelta(days=1)
+    while jour.weekday() != jour_semaine:
+        jour += timedelta(days=1)
+    return jour
+
+
+class DonneesMixin:
+    """Crée un jeu de données minimal commun aux tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.specialite = Specialite.objects.create(nom='Médecine générale')
+        cls.cabinet = Cabinet.objects.create(
+            nom='Cabinet Victoire', adresse='12 place de la Victoire',
+            ville='Bordeaux', code_postal='33000', telephone='0556123456'
+        )
+        cls.professionnel = Professionnel.objects.create(
+            nom='Martin', prenom='Sophie', email='sophie.martin@medi4ll.fr',
+            specialite=cls.specialite, tarif_consultation=Decimal('30.00'),
+            statut_validation='valide'
+        )
+        cls.professionnel.cabinets.add(cls.cabinet)
+        cls.motif = MotifConsultation.objects.create(
+            specialite=cls.specialite, libelle='Consultation générale',
+            duree_estimee=30, tarif=Decimal('25.00')
+        )
+        cls.patient = User.objects.create_user(
+            username='patient', email='patient@test.com', password='password123'
+        )
+
+
+class CalculCreneauxTests(TestCase):
+
+    def test_soustrait_les_reservations(self):
+        libres = calculer_creneaux_libres(
+            [(time(9, 0), time(11, 0), 30)],
+            [(time(9, 30), time(10, 15))]
+        )
+        self.assertEqual(libres, [(540, 570), (630, 660)])
+
+    def test_regles_qui_se_chevauchent(self):
+        libres = calculer_creneaux_libres(
+            [(time(9, 0), time(10, 0), 30), (time(9, 0), time(9, 30), 30)],
+            []
+        )
+        self.assertEqual(libres, [(540, 570), (570, 600)])
+
+    def test_ignore_les_creneaux_passes(self):
+        libres = calculer_creneaux_libres(
+            [(time(9, 0), time(10, 0), 30)], [], apres=time(9, 10)
+        )
+        self.assertEqual(libres, [(570, 600)])
+
+
+class DisponibilitesViewTests(DonneesMixin, TestCase):
+
+    def test_slots_pour_une_date(self):
+        jour = prochain_jour(0)
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(10, 30), duree_creneau=30
+        )
+        RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=jour,
+            heure_debut=time(9, 30), heure_fin=time(10, 0)
+        )
+        RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=jour, statut='annule',
+            heure_debut=time(10, 0), heure_fin=time(10, 30)
+        )
+
+        url = f'/api/professionnels/{self.professionnel.id}/disponibilites/'
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'date': jour.isoformat(), 'cabinet_id': self.cabinet.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['slots'], ['09:00', '10:00'])
+
+    def test_hors_horizon_calcule_depuis_les_regles(self):
+        jour = prochain_jour(0) + timedelta(weeks=52)
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(10, 0), duree_creneau=30
+        )
+        self.assertFalse(Creneau.objects.filter(date=jour).exists())
+
+        url = f'/api/professionnels/{self.professionnel.id}/disponibilites/'
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'date': jour.isoformat()})
+        self.assertEqual(response.json()['slots'], ['09:00', '09:30'])
+
+    def test_apres_la_derniere_date_materialisee(self):
+        """generer_creneaux en retard : les jours non matérialisés sont calculés depuis les règles"""
+        lundi = prochain_jour(0)
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(10, 0), duree_creneau=30
+        )
+        Creneau.objects.filter(date__gt=lundi).delete()
+        regle = DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=1,
+            heure_debut=time(9, 0), heure_fin=time(10, 0), duree_creneau=30
+        )
+        self.assertFalse(Creneau.objects.filter(disponibilite=regle, date__gt=lundi).exists())
+
+        url = f'/api/professionnels/{self.professionnel.id}/disponibilites/'
+        for jour in (lundi, lundi + timedelta(days=1), lundi + timedelta(days=7)):
+            response = self.client.get(url, {'date': jour.isoformat()})
+            self.assertEqual(response.json()['slots'], ['09:00', '09:30'])
+        response = self.client.get('/api/professionnels/disponibilites/', {
+            'ids': self.professionnel.id, 'date_debut': lundi.isoformat(),
+            'date_fin': (lundi + timedelta(days=8)).isoformat(),
+        })
+        self.assertEqual(len(response.json()['professionnels'][str(self.professionnel.id)]['jours']), 4)
+
+    def test_regles_anterieures_a_la_materialisation(self):
+        """Règles sans créneaux (avant le premier generer_creneaux) : aucune n'est masquée"""
+        lundi = prochain_jour(0)
+        ancienne = DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(10, 0), duree_creneau=30
+        )
+        Creneau.objects.all().delete()
+        url = f'/api/professionnels/{self.professionnel.id}/disponibilites/'
+        self.assertEqual(self.client.get(url, {'date': lundi.isoformat()}).json()['slots'], ['09:00', '09:30'])
+
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(14, 0), heure_fin=time(15, 0), duree_creneau=30
+        )
+        self.assertTrue(Creneau.objects.filter(disponibilite=ancienne, date=lundi).exists())
+        attendus = ['09:00', '09:30', '14:00', '14:30']
+        self.assertEqual(self.client.get(url, {'date': lundi.isoformat()}).json()['slots'], attendus)
+
+        Creneau.objects.filter(disponibilite=ancienne).delete()
+        self.assertEqual(slots.fins_materialisees([self.professionnel.id]), {})
+        self.assertEqual(self.client.get(url, {'date': lundi.isoformat()}).json()['slots'], attendus)
+
+    def test_date_invalide(self):
+        url = f'/api/professionnels/{self.professionnel.id}/disponibilites/'
+        response = self.client.get(url, {'date': '2026-13-45'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CreneauxMaterialisesTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        self.jour = prochain_jour(2)
+        self.regle = DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=2,
+            heure_debut=time(14, 0), heure_fin=time(15, 0), duree_creneau=30
+        )
+
+    def statuts(self):
+        return list(Creneau.objects.filter(date=self.jour).values_list('heure_debut', 'statut'))
+
+    def test_regle_materialisee_sur_l_horizon(self):
+        self.assertEqual(self.statuts(), [(time(14, 0), 'libre'), (time(14, 30), 'libre')])
+        self.assertEqual(Creneau.objects.filter(disponibilite=self.regle).count(), 2 * 8)
+
+    def test_suit_les_rendez_vous(self):
+        rdv = RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=self.jour,
+            heure_debut=time(14, 30), heure_fin=time(15, 0)
+        )
+        self.assertEqual(self.statuts(), [(time(14, 0), 'libre'), (time(14, 30), 'reserve')])
+        rdv.statut = 'annule'
+        rdv.save()
+        self.assertEqual(self.statuts(), [(time(14, 0), 'libre'), (time(14, 30), 'libre')])
+
+    def test_suit_les_regles(self):
+        self.regle.heure_fin = time(14, 30)
+        self.regle.save()
+        self.assertEqual(self.statuts(), [(time(14, 0), 'libre')])
+        self.regle.delete()
+        self.assertEqual(self.statuts(), [])
+
+    def test_regenerer_tout(self):
+        RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=self.jour,
+            heure_debut=time(14, 0), heure_fin=time(14, 30)
+        )
+        passe = Creneau.objects.filter(disponibilite=self.regle).first()
+        passe.date = timezone.localdate() - timedelta(days=7)
+        passe.save()
+        Creneau.objects.filter(disponibilite=self.regle).update(statut='libre')
+
+        progression = []
+        self.assertEqual(slots.regenerer_tout(lambda fait, total: progression.append((fait, total))), 2 * 8)
+        self.assertEqual(progression, [(1, 1)])
+        self.assertFalse(Creneau.objects.filter(date__lt=timezone.localdate()).exists())
+        self.assertEqual(self.statuts(), [(time(14, 0), 'reserve'), (time(14, 30), 'libre')])
+
+        DisponibiliteHoraire.objects.filter(id=self.regle.id).delete()
+        self.assertEqual(slots.regenerer_tout(), 0)
+        self.assertFalse(Creneau.objects.exists())
+
+    def test_commande_horizon(self):
+        sortie = io.StringIO()
+        call_command('generer_creneaux', semaines=2, stdout=sortie)
+        self.assertIn('4 créneaux générés', sortie.getvalue())
+        self.assertEqual(Creneau.objects.filter(disponibilite=self.regle).count(), 2 * 2)
+        self.assertEqual(slots.horizon()[1] - slots.horizon(2)[1], timedelta(weeks=6))
+
+
+class DisponibilitesPeriodeViewTests(DonneesMixin, TestCase):
+
+    def test_plusieurs_professionnels_en_deux_requetes(self):
+        autre = Professionnel.objects.create(
+            nom='Bernard', prenom='Jean', email='jean.bernard@medi4ll.fr',
+            specialite=self.specialite, tarif_consultation=Decimal('30.00')
+        )
+        lundi = prochain_jour(0)
+        for professionnel in (self.professionnel, autre):
+            DisponibiliteHoraire.objects.create(
+                professionnel=professionnel, cabinet=self.cabinet, jour_semaine=0,
+                heure_debut=time(9, 0), heure_fin=time(10, 0), duree_creneau=30
+            )
+        RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=lundi,
+            heure_debut=time(9, 0), heure_fin=time(9, 30)
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/professionnels/disponibilites/', {
+                'ids': f'{self.professionnel.id},{autre.id}',
+                'date_debut': lundi.isoformat(),
+                'date_fin': (lundi + timedelta(days=7)).isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+        professionnels = response.json()['professionnels']
+        self.assertEqual(professionnels[str(self.professionnel.id)]['jours'], {
+            lundi.isoformat(): ['09:30'],
+            (lundi + timedelta(days=7)).isoformat(): ['09:00', '09:30'],
+        })
+        self.assertEqual(
+            professionnels[str(autre.id)]['prochain_creneau'],
+            {'date': lundi.isoformat(), 'heure': '09:00'}
+        )
+
+    def test_periode_trop_longue(self):
+        response = self.client.get('/api/professionnels/disponibilites/', {
+            'ids': str(self.professionnel.id),
+            'date_debut': '2030-01-01',
+            'date_fin': '2030-03-01',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class ContrainteChevauchementTests(TestCase):
+    """Migration 0006 sur PostgreSQL, selon que btree_gist est installée ou peut l'être"""
+
+    def executer(self, extension_installee, erreur=None):
+        migration = importlib.import_module('appointments.migrations.0006_rendezvous_creneau_unique')
+        schema_editor = mock.MagicMock()
+        schema_editor.connection.vendor = 'postgresql'
+        schema_editor.connection.alias = 'default'
+        curseur = schema_editor.connection.cursor.return_value.__enter__.return_value
+        curseur.fetchone.return_value = (1,) if extension_installee else None
+        schema_editor.execute.side_effect = erreur
+        migration.ajouter_exclusion(None, schema_editor)
+        return migration, [appel.args[0] for appel in schema_editor.execute.call_args_list]
+
+    def test_extension_deja_installee(self):
+        migration, requetes = self.executer(extension_installee=True)
+        self.assertEqual(requetes, [migration.EXCLUSION_SQL])
+
+    def test_extension_refusee(self):
+        with self.assertWarnsRegex(RuntimeWarning, 'rendezvous_sans_chevauchement'):
+            _, requetes = self.executer(False, DatabaseError('permission denied to create extension "btree_gist"'))
+        self.assertEqual(requetes, ['CREATE EXTENSION IF NOT EXISTS btree_gist'])
+
+
+class CreationRendezVousTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        self.jour = prochain_jour(0)
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(12, 0), duree_creneau=20
+        )
+        self.client.force_login(self.patient)
+
+    def reserver(self, heure_debut, **extra):
+        return self.client.post('/api/rendez-vous/create/', {
+            'professionnel_id': self.professionnel.id,
+            'cabinet_id': self.cabinet.id,
+            'motif_consultation_id': self.motif.id,
+            'date': self.jour.isoformat(),
+            'heure_debut': heure_debut,
+            **extra
+        }, content_type='application/json')
+
+    def test_heure_fin_deduite_du_creneau(self):
+        response = self.reserver('09:00')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['heure_fin'], '09:20:00')
+
+    def test_conflit_renvoie_409(self):
+        self.assertEqual(self.reserver('09:00').status_code, 201)
+        self.assertEqual(self.reserver('09:00').status_code, 409)
+        self.assertEqual(self.reserver('09:10', heure_fin='09:30').status_code, 409)
+        self.assertEqual(self.reserver('09:20').status_code, 201)
+
+    def test_creneau_annule_reservable(self):
+        self.assertEqual(self.reserver('09:00').status_code, 201)
+        RendezVous.objects.update(statut='annule')
+        self.assertEqual(self.reserver('09:00').status_code, 201)
+
+    def test_reconfirmation_d_un_creneau_repris(self):
+        def annule(heure_debut, heure_fin):
+            rdv = self.reserver(heure_debut, heure_fin=heure_fin).json()['id']
+            self.client.put(f'/api/rendez-vous/{rdv}/statut/', {'statut': 'annule'}, content_type='application/json')
+            return rdv
+
+        meme_debut = annule('09:00', '09:20')
+        chevauchant = annule('10:15', '10:45')
+        self.assertEqual(self.reserver('09:00').status_code, 201)
+        self.assertEqual(self.reserver('10:00', heure_fin='10:30').status_code, 201)
+        for rdv in (meme_debut, chevauchant):
+            response = self.client.put(
+                f'/api/rendez-vous/{rdv}/statut/', {'statut': 'confirme'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(RendezVous.objects.get(id=rdv).statut, 'annule')
+
+        libre = annule('11:00', '11:20')
+        response = self.client.put(
+            f'/api/rendez-vous/{libre}/statut/', {'statut': 'confirme'}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['statut'], 'confirme')
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class NombreRequetesListesTests(DonneesMixin, TestCase):
+    """Les listes doivent coûter un nombre constant de requêtes, quel que soit le volume"""
+
+    NOMBRE = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(username='admin', password='admin', is_admin=True)
+        professionnels = Professionnel.objects.bulk_create([
+            Professionnel(
+                nom=f'Nom{i}', prenom=f'Prenom{i}', email=f'pro{i}@medi4ll.fr',
+                specialite=cls.specialite, tarif_consultation=Decimal('30.00'),
+                statut_validation='valide'
+            )
+            for i in range(cls.NOMBRE)
+        ])
+        Professionnel.cabinets.through.objects.bulk_create([
+            Professionnel.cabinets.through(professionnel=professionnel, cabinet=cls.cabinet)
+            for professionnel in professionnels
+        ])
+        search.indexer_professionnels(Professionnel.objects.all())
+        debut = date.today() + timedelta(days=1)
+        RendezVous.objects.bulk_create([
+            RendezVous(
+                patient=cls.patient, professionnel=professionnels[i], cabinet=cls.cabinet,
+                motif_consultation=cls.motif, date=debut + timedelta(days=i),
+                heure_debut=time(9, 0), heure_fin=time(9, 30)
+            )
+            for i in range(cls.NOMBRE)
+        ])
+
+    def test_get_professionnels(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/professionnels/', {'ville': 'Bordeaux'})
+        self.assertEqual(len(response.json()), self.NOMBRE + 1)
+
+    def test_professionnels_list_create(self):
+        self.client.force_login(self.admin)
+        # Session lue dans le cache (cached_db) ; utilisateur lu en base puis mis en cache
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/professionnels/manage/', {'page_size': 200})
+        self.assertEqual(len(response.json()['results']), 200)
+
+    def test_admin_rendez_vous(self):
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/admin/rendez-vous/', {'page_size': 200})
+        self.assertEqual(len(response.json()['results']), 200)
+
+    def test_get_user_rendez_vous(self):
+        self.client.force_login(self.patient)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/rendez-vous/', {'page_size': 200})
+        self.assertEqual(len(response.json()['results']), 200)
+
+    def test_professionnel_rendez_vous(self):
+        pro = User.objects.create_user(username='pro', email='pro0@medi4ll.fr', password='x')
+        self.client.force_login(pro)
+        self.client.get('/api/rendez-vous/professionnel/')
+        # Session et utilisateur en cache : seules les requêtes de la vue restent
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/rendez-vous/professionnel/')
+        self.assertEqual(len(response.json()['results']), 1)
+
+
+class PaginationCurseurTests(DonneesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        debut = date.today() + timedelta(days=1)
+        RendezVous.objects.bulk_create([
+            RendezVous(
+                patient=cls.patient, professionnel=cls.professionnel, cabinet=cls.cabinet,
+                motif_consultation=cls.motif, date=debut + timedelta(days=i // 3),
+                heure_debut=time(9 + i % 3, 0), heure_fin=time(9 + i % 3, 30)
+            )
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.patient)
+
+    def test_parcours_complet_sans_doublon(self):
+        vus = []
+        params = {'page_size': 10, 'count': 'exact'}
+        while True:
+            data = self.client.get('/api/rendez-vous/', params).json()
+            self.assertEqual(data['count'], 25)
+            vus.extend(rdv['id'] for rdv in data['results'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        attendus = list(RendezVous.objects.order_by('-date', '-heure_debut', '-id').values_list('id', flat=True))
+        self.assertEqual(vus, attendus)
+
+    def test_compte_approximatif_borne(self):
+        data = self.client.get('/api/rendez-vous/', {'count': 'approx'}).json()
+        self.assertEqual((data['count'], data['count_exact']), (25, True))
+
+    def test_curseur_invalide(self):
+        response = self.client.get('/api/rendez-vous/', {'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 400)
+        # Curseurs bien encodés mais aux valeurs inutilisables pour les champs de tri
+        for valeurs in (['pas-une-date', '09:00:00', 1], ['2026-01-01', '25:99', 1],
+                        ['2026-01-01', '09:00:00', 'x'], [['2026-01-01'], '09:00:00', 1],
+                        ['2026-01-01', None, 1], ['2026-01-01', '09:00:00']):
+            response = self.client.get('/api/rendez-vous/', {'cursor': pagination.encoder_curseur(valeurs)})
+            self.assertEqual(response.status_code, 400, valeurs)
+
+
+class RechercheProfessionnelsTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        dermato = Specialite.objects.create(nom='Dermatologue')
+        self.autre = Professionnel.objects.create(
+            nom='Lefèbvre', prenom='Émilie', email='emilie.lefebvre@medi4ll.fr',
+            specialite=dermato, tarif_consultation=Decimal('50.00'),
+            statut_validation='valide'
+        )
+        lyon = Cabinet.objects.create(
+            nom='Cabinet Bellecour', adresse='10 place Bellecour',
+            ville='Lyon', code_postal='69002', telephone='0478234567'
+        )
+        self.autre.cabinets.add(lyon)
+
+    def ids(self, **params):
+        return [p['id'] for p in self.client.get('/api/professionnels/', params).json()]
+
+    def test_recherche_sans_accents_et_par_prefixe(self):
+        self.assertEqual(self.ids(q='lefebvre emil'), [self.autre.id])
+        self.assertEqual(self.ids(q='dermato'), [self.autre.id])
+        self.assertEqual(self.ids(q='690'), [self.autre.id])
+
+    def test_ville_et_nom(self):
+        self.assertEqual(self.ids(ville='bordeaux'), [self.professionnel.id])
+        self.assertEqual(self.ids(nom='Sophie', ville='Lyon'), [])
+        self.assertEqual(self.ids(nom='lef', ville='Lyon'), [self.autre.id])
+        self.assertEqual(self.ids(q='dermato', ville='Bordeaux'), [])
+
+    def test_ville_et_nom_restent_des_filtres_de_champ(self):
+        """ville ne cherche pas dans les noms ni nom dans les villes, quel que soit l'index"""
+        homonyme = Professionnel.objects.create(
+            nom='Lyon', prenom='Paul', email='paul.lyon@medi4ll.fr',
+            specialite=self.specialite, tarif_consultation=Decimal('30.00'),
+            statut_validation='valide'
+        )
+        homonyme.cabinets.add(self.cabinet)
+        self.autre.cabinets.add(self.cabinet)
+        self.assertEqual(self.ids(ville='lyon'), [self.autre.id])
+        self.assertEqual(self.ids(nom='lyon'), [homonyme.id])
+        self.assertEqual(self.ids(nom='bordeaux'), [])
+        self.assertEqual(self.ids(ville='bordeaux', nom='lyon'), [homonyme.id])
+        self.assertEqual(self.ids(ville='bord', nom='lef'), [self.autre.id])
+        self.assertEqual(self.ids(ville='ordeaux'), [])
+
+    def test_document_suit_les_modifications(self):
+        cabinet = self.autre.cabinets.get()
+        cabinet.ville = 'Villeurbanne'
+        cabinet.save()
+        self.assertEqual(self.ids(q='villeurbanne'), [self.autre.id])
+        self.autre.cabinets.clear()
+        self.assertEqual(self.ids(q='villeurbanne'), [])
+        self.professionnel.nom = 'Durand'
+        self.professionnel.save()
+        self.assertEqual(self.ids(q='durand'), [self.professionnel.id])
+
+
+class ProximiteTests(DonneesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Cabinet.objects.filter(id=cls.cabinet.id).update(latitude=Decimal('44.8310'), longitude=Decimal('-0.5720'))
+        cls.merignac = Cabinet.objects.create(
+            nom='Cabinet Mérignac', adresse='1 avenue de la Marne', ville='Mérignac',
+            code_postal='33700', telephone='0556000000',
+            latitude=Decimal('44.8422'), longitude=Decimal('-0.6459')
+        )
+        cls.lyon = Cabinet.objects.create(
+            nom='Cabinet Bellecour', adresse='10 place Bellecour', ville='Lyon',
+            code_postal='69002', telephone='0478234567',
+            latitude=Decimal('45.7578'), longitude=Decimal('4.8320')
+        )
+        cls.proche = Professionnel.objects.create(
+            nom='Bernard', prenom='Jean', email='jean.bernard@medi4ll.fr',
+            specialite=cls.specialite, tarif_consultation=Decimal('30.00'),
+            statut_validation='valide'
+        )
+        cls.proche.cabinets.add(cls.merignac, cls.lyon)
+
+    def test_rayon(self):
+        data = self.client.get('/api/professionnels/proximite/', {
+            'lat': '44.8378', 'lng': '-0.5792', 'rayon_km': '3'
+        }).json()
+        self.assertEqual([p['id'] for p in data], [self.professionnel.id])
+        self.assertAlmostEqual(data[0]['distance_km'], 0.93, delta=0.05)
+        self.assertEqual(data[0]['cabinet_proche_id'], self.cabinet.id)
+
+    def test_k_plus_proches_depuis_lyon(self):
+        data = self.client.get('/api/professionnels/proximite/', {
+            'lat': '45.7640', 'lng': '4.8357', 'k': '2'
+        }).json()
+        self.assertEqual([p['id'] for p in data], [self.proche.id, self.professionnel.id])
+        self.assertEqual(data[0]['cabinet_proche_id'], self.lyon.id)
+        self.assertGreater(data[1]['distance_km'], 400)
+
+    def test_rayon_et_resultats_bornes(self):
+        with mock.patch('appointments.views.PROXIMITE_K_MAX', 1):
+            data = self.client.get('/api/professionnels/proximite/', {
+                'lat': '44.8378', 'lng': '-0.5792', 'rayon_km': '100000'
+            }).json()
+        self.assertEqual([p['id'] for p in data], [self.professionnel.id])
+        with mock.patch('appointments.geo.RAYON_MAX_KM', 100):
+            data = self.client.get('/api/professionnels/proximite/', {
+                'lat': '45.7640', 'lng': '4.8357', 'rayon_km': '100000'
+            }).json()
+        self.assertEqual([p['id'] for p in data], [self.proche.id])
+
+    def test_coordonnees_invalides(self):
+        response = self.client.get('/api/professionnels/proximite/', {'lat': '95', 'lng': '0'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CacheReferenceTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reference_cache._local.clear()
+
+    def test_etag_et_304_sans_requete(self):
+        response = self.client.get('/api/specialites/')
+        etag = response['ETag']
+        self.assertEqual(response.json()[0]['nom'], 'Médecine générale')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/specialites/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidation_par_version(self):
+        etag = self.client.get('/api/cabinets/')['ETag']
+        self.cabinet.nom = 'Cabinet Victoire Bis'
+        self.cabinet.save()
+        response = self.client.get('/api/cabinets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['nom'], 'Cabinet Victoire Bis')
+
+    def test_motifs_filtres_par_specialite(self):
+        data = self.client.get('/api/motifs/', {'specialite': self.specialite.id}).json()
+        self.assertEqual([m['libelle'] for m in data], ['Consultation générale'])
+        self.assertEqual(self.client.get('/api/motifs/', {'specialite': 0}).json(), [])
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class ProfessionnelSessionTests(DonneesMixin, TestCase):
+    """Le professionnel de l'utilisateur connecté est résolu une fois par session"""
+
+    def setUp(self):
+        cache.clear()
+        self.compte = User.objects.create_user(
+            username='sophie', email='Sophie.Martin@medi4ll.fr', password='x', type_compte='professionnel'
+        )
+        self.client.force_login(self.compte)
+
+    def test_liaison_par_email_au_premier_acces(self):
+        response = self.client.get('/api/professionnel/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.professionnel.refresh_from_db()
+        self.assertEqual(self.professionnel.user, self.compte)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/professionnel/disponibilites/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_sans_professionnel_memorise_jusqu_a_creation(self):
+        self.client.force_login(self.patient)
+        self.assertEqual(self.client.get('/api/rendez-vous/professionnel/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.client.get('/api/rendez-vous/professionnel/')
+        Professionnel.objects.create(
+            nom='Durand', prenom='Paul', email='patient@test.com', specialite=self.specialite,
+            tarif_consultation=Decimal('30.00')
+        )
+        self.assertEqual(self.client.get('/api/rendez-vous/professionnel/').status_code, 200)
+
+    def test_professionnel_supprime(self):
+        self.assertEqual(self.client.get('/api/professionnel/cabinets/').status_code, 200)
+        Professionnel.objects.filter(id=self.professionnel.id).delete()
+        response = self.client.post(
+            '/api/professionnel/cabinets/', {'cabinet_id': self.cabinet.id}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_modification_du_profil(self):
+        self.client.get('/api/professionnel/profile/')
+        response = self.client.put(
+            '/api/professionnel/profile/', {'bio': 'Nouvelle bio'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('professionnel_id', self.client.session)
+
+    def test_professionnel_modifie_le_statut_de_ses_rendez_vous(self):
+        rdv = RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=prochain_jour(0),
+            heure_debut=time(9, 0), heure_fin=time(9, 30)
+        )
+        response = self.client.put(
+            f'/api/rendez-vous/{rdv.id}/statut/', {'statut': 'confirme'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class SessionsTests(DonneesMixin, TestCase):
+    """Sessions hors base et utilisateur de la session mis en cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.patient)
+
+    def test_utilisateur_en_cache_invalide_par_le_profil(self):
+        self.client.get('/api/user/profile/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/check-admin/')
+        self.assertEqual(response.json(), {'is_admin': False, 'username': 'patient'})
+        # Les champs du profil ne sont pas en cache : une requête pour les lire
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/user/profile/')
+        self.assertEqual(response.json()['ville'], '')
+        self.client.put('/api/user/profile/', {'ville': 'Bordeaux'}, content_type='application/json')
+        self.assertIsNone(cache.get(f'utilisateur:{self.patient.id}'))
+        self.assertEqual(self.client.get('/api/user/profile/').json()['ville'], 'Bordeaux')
+
+    def test_ni_mot_de_passe_ni_profil_en_cache(self):
+        self.client.get('/api/check-admin/')
+        donnees = cache.get(f'utilisateur:{self.patient.id}')
+        self.assertNotIn('password', donnees['champs'])
+        self.assertNotIn('numero_securite_sociale', donnees['champs'])
+        self.assertNotIn(self.patient.password, repr(donnees))
+
+    def test_deconnexion(self):
+        self.client.get('/api/user/profile/')
+        self.assertIsNotNone(cache.get(f'utilisateur:{self.patient.id}'))
+        self.client.post('/api/logout/')
+        self.assertIsNone(cache.get(f'utilisateur:{self.patient.id}'))
+        self.assertEqual(self.client.get('/api/user/profile/').status_code, 403)
+
+    def test_compte_desactive_deconnecte_a_la_requete_suivante(self):
+        self.assertEqual(self.client.get('/api/check-admin/').status_code, 200)
+        self.assertIsNotNone(cache.get(f'utilisateur:{self.patient.id}'))
+        self.patient.is_active = False
+        self.patient.save(update_fields=['is_active'])
+        self.assertIsNone(cache.get(f'utilisateur:{self.patient.id}'))
+        self.assertEqual(self.client.get('/api/check-admin/').status_code, 403)
+
+    def test_changement_de_mot_de_passe_invalide_les_sessions(self):
+        self.client.get('/api/user/profile/')
+        self.patient.set_password('nouveau')
+        self.patient.save()
+        self.assertEqual(self.client.get('/api/user/profile/').status_code, 403)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_cookies_signes(self):
+        self.client.force_login(self.patient)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/user/profile/')
+        self.assertEqual(response.json()['username'], 'patient')
+
+
+class ConnexionTests(DonneesMixin, TestCase):
+    """Connexion : vérification dans le pool de hachage, réécriture des hachages périmés"""
+
+    def connecter(self, password='password123', **donnees):
+        return self.client.post(
+            '/api/login/', json.dumps({'username': 'patient', 'password': password, **donnees}),
+            content_type='application/json'
+        )
+
+    def test_connexion_par_le_pool(self):
+        response = self.connecter()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'patient')
+        self.assertEqual(self.client.get('/api/user/profile/').status_code, 200)
+
+    @override_settings(LOGIN_HACHAGE_PROCESSUS=0)
+    def test_identifiants_invalides(self):
+        self.assertEqual(self.connecter('mauvais').status_code, 401)
+        self.assertEqual(self.client.post(
+            '/api/login/', json.dumps({'username': 'inconnu', 'password': 'x'}), content_type='application/json'
+        ).status_code, 401)
+        self.assertEqual(self.client.post('/api/login/', {}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.get('/api/login/').status_code, 405)
+
+    @override_settings(LOGIN_HACHAGE_PROCESSUS=0, PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_hachage_reecrit_au_nouveau_cout(self):
+        self.assertEqual(self.connecter().status_code, 200)
+        self.patient.refresh_from_db()
+        self.assertTrue(self.patient.password.startswith('pbkdf2_sha256$1000$'))
+
+    @override_settings(
+        LOGIN_HACHAGE_PROCESSUS=0, PASSWORD_ARGON2_TIME_COST=1, PASSWORD_ARGON2_MEMORY_COST=1024,
+        PASSWORD_HASHERS=['appointments.hashers.Argon2Hasher', 'appointments.hashers.PBKDF2Hasher']
+    )
+    def test_migration_vers_argon2(self):
+        self.assertEqual(self.connecter().status_code, 200)
+        self.patient.refresh_from_db()
+        self.assertTrue(self.patient.password.startswith('argon2$argon2id$v=19$m=1024,t=1,'))
+        self.assertEqual(self.connecter().status_code, 200)
+
+
+class ExportsTests(DonneesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(username='admin', password='admin', is_admin=True)
+        jour = prochain_jour(0)
+        for heure, statut in [(9, 'confirme'), (10, 'annule'), (11, 'termine')]:
+            RendezVous.objects.create(
+                patient=cls.patient, professionnel=cls.professionnel, cabinet=cls.cabinet,
+                motif_consultation=cls.motif, date=jour, heure_debut=time(heure, 0),
+                heure_fin=time(heure, 30), statut=statut
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def contenu(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_filtre_par_statut(self):
+        response = self.client.get('/api/admin/export/rendez-vous/', {'statut': 'confirme,termine'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lignes = self.contenu(response).splitlines()
+        self.assertEqual(lignes[0].split(',')[:3], ['id', 'date', 'heure_debut'])
+        self.assertEqual([ligne.split(',')[4] for ligne in lignes[1:]], ['confirme', 'termine'])
+
+    def test_ndjson_clients_d_un_professionnel(self):
+        response = self.client.get('/api/admin/export/clients/', {
+            'sortie': 'ndjson', 'professionnel_id': self.professionnel.id
+        })
+        lignes = [json.loads(ligne) for ligne in self.contenu(response).splitlines()]
+        self.assertEqual([ligne['email'] for ligne in lignes], ['patient@test.com'])
+
+    async def test_flux_asynchrone_en_asgi(self):
+        client = AsyncClient()
+        await client.aforce_login(self.admin)
+        with mock.patch.object(exports, 'TAILLE_PAQUET', 2):
+            response = await client.get('/api/admin/export/rendez-vous/')
+            self.assertTrue(response.is_async)
+            morceaux = [morceau async for morceau in response.streaming_content]
+        self.assertEqual(len(morceaux), 3)
+        lignes = b''.join(morceaux).decode().splitlines()
+        self.assertEqual([ligne.split(',')[4] for ligne in lignes[1:]], ['confirme', 'annule', 'termine'])
+
+    def test_parametres_invalides(self):
+        self.assertEqual(self.client.get('/api/admin/export/rendez-vous/', {'statut': 'inconnu'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/admin/export/rendez-vous/', {'sortie': 'xml'}).status_code, 400)
+        self.client.force_login(self.patient)
+        self.assertEqual(self.client.get('/api/admin/export/clients/').status_code, 403)
+
+
+class ImportProfessionnelsTests(DonneesMixin, TestCase):
+
+    def importer(self, contenu, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as fichier:
+            fichier.write(contenu)
+        self.addCleanup(os.unlink, fichier.name)
+        call_command('import_professionnels', fichier.name, lot=2, stdout=io.StringIO(), **options)
+
+    def test_upsert_et_dedoublonnage(self):
+        entete = 'numero_rpps,nom,prenom,email,specialite,cabinet_nom,cabinet_adresse,cabinet_ville,cabinet_code_postal\n'
+        self.importer(
+            entete
+            + '10000000001,Durand,Paul,paul@rpps.fr,Médecine générale,Cabinet Victoire,12 place de la Victoire,Bordeaux,33000\n'
+            + '10000000002,Petit,Anne,anne@rpps.fr,médecine générale,Cabinet Lac,1 rue du Lac,Bordeaux,33300\n'
+            + '10000000003,Doublon,Email,paul@rpps.fr,Médecine générale,,,,\n'
+            + '10000000004,Inconnue,Spé,x@rpps.fr,Podologie,,,,\n'
+        )
+        self.importer(entete + '10000000001,Durand,Pierre,paul@rpps.fr,Médecine générale,,,,\n')
+
+        importes = Professionnel.objects.filter(numero_rpps__startswith='1000000')
+        self.assertEqual(
+            sorted(importes.values_list('numero_rpps', 'prenom')),
+            [('10000000001', 'Pierre'), ('10000000002', 'Anne')]
+        )
+        paul = importes.get(numero_rpps='10000000001')
+        self.assertEqual(list(paul.cabinets.all()), [self.cabinet])
+        self.assertEqual(Cabinet.objects.filter(nom='Cabinet Lac').count(), 1)
+        self.assertIn('pierre', paul.document_recherche)
+
+
+class GenerationDonneesTests(TestCase):
+
+    def generer(self, **options):
+        call_command(
+            'generer_donnees', patients=20, professionnels=5, cabinets=3, semaines=2,
+            stdout=io.StringIO(), **options
+        )
+
+    def test_reproductible(self):
+        self.generer(graine=1)
+        rendez_vous = list(RendezVous.objects.order_by('id').values_list(
+            'professionnel__numero_rpps', 'date', 'heure_debut', 'statut'
+        ))
+        self.assertTrue(rendez_vous)
+        self.assertTrue(Creneau.objects.filter(statut='reserve').exists())
+
+        RendezVous.objects.all().delete()
+        Professionnel.objects.all().delete()
+        User.objects.all().delete()
+        self.generer(graine=1)
+        self.assertEqual(list(RendezVous.objects.order_by('id').values_list(
+            'professionnel__numero_rpps', 'date', 'heure_debut', 'statut'
+        )), rendez_vous)
+
+        with self.assertRaises(CommandError):
+            self.generer(graine=1)
+
+
+@override_settings(NOTIFICATIONS_BACKEND='appointments.notifications.MemoireBackend')
+class RappelsTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        MemoireBackend.envoyes = []
+        self.maintenant = timezone.make_aware(datetime.combine(prochain_jour(0), time(8, 0)))
+
+    def rendez_vous(self, jour, heure, **extra):
+        return RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=jour, heure_debut=time(heure, 0),
+            heure_fin=time(heure, 30), **extra
+        )
+
+    def test_fenetre_lots_et_idempotence(self):
+        lundi = prochain_jour(0)
+        dus = [self.rendez_vous(lundi, heure) for heure in (9, 10, 11)]
+        dus.append(self.rendez_vous(lundi + timedelta(days=1), 7))
+        self.rendez_vous(lundi, 7)
+        self.rendez_vous(lundi + timedelta(days=1), 9)
+        self.rendez_vous(lundi, 12, statut='annule')
+
+        self.assertEqual(reminders.envoyer_rappels(self.maintenant, heures=24, taille_lot=2), (4, 4))
+        self.assertEqual(
+            sorted(message['cle'] for message in MemoireBackend.envoyes),
+            sorted(f'rappel-{rdv.id}-email' for rdv in dus)
+        )
+        self.assertEqual(reminders.envoyer_rappels(self.maintenant, heures=24), (0, 0))
+
+    def test_preferences_du_patient(self):
+        self.patient.preference_notification = 'les_deux'
+        self.patient.telephone = '0612345678'
+        self.patient.save()
+        self.rendez_vous(prochain_jour(0), 9, mode='teleconsultation')
+        reminders.envoyer_rappels(self.maintenant, heures=24)
+        self.assertEqual([message['canal'] for message in MemoireBackend.envoyes], ['email', 'sms'])
+        self.assertIn('téléconsultation', MemoireBackend.envoyes[1]['corps'])
+
+        MemoireBackend.envoyes = []
+        self.patient.preference_notification = 'aucune'
+        self.patient.save()
+        rdv = self.rendez_vous(prochain_jour(0), 10)
+        self.assertEqual(reminders.envoyer_rappels(self.maintenant, heures=24), (1, 0))
+        rdv.refresh_from_db()
+        self.assertTrue(rdv.rappel_envoye)
+
+    def test_envoi_en_echec_repris_apres_la_reservation(self):
+        rdv = self.rendez_vous(prochain_jour(0), 9)
+        with self.assertRaises(ConnectionError):
+            reminders.envoyer_rappels(self.maintenant, heures=24, backend=BackendRefusant(self.patient.email))
+        rdv.refresh_from_db()
+        self.assertFalse(rdv.rappel_envoye)
+        self.assertIsNotNone(rdv.rappel_reserve_jusqu_au)
+        # Réservé : un autre worker ne le reprend pas avant l'expiration
+        self.assertEqual(reminders.envoyer_rappels(self.maintenant, heures=24), (0, 0))
+
+        RendezVous.objects.filter(id=rdv.id).update(rappel_reserve_jusqu_au=timezone.now())
+        self.assertEqual(reminders.envoyer_rappels(self.maintenant, heures=24), (1, 1))
+        rdv.refresh_from_db()
+        self.assertTrue(rdv.rappel_envoye)
+        self.assertIsNone(rdv.rappel_reserve_jusqu_au)
+
+
+class BackendRefusant:
+    """Backend qui échoue dès qu'un lot contient un message pour `destinataire`"""
+
+    def __init__(self, destinataire):
+        self.destinataire = destinataire
+        self.envoyes = []
+
+    def envoyer(self, messages):
+        if any(message['destinataire'] == self.destinataire for message in messages):
+            raise ConnectionError('fournisseur indisponible')
+        self.envoyes.extend(messages)
+        return len(messages)
+
+
+@override_settings(NOTIFICATIONS_BACKEND='appointments.notifications.MemoireBackend')
+class OutboxTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        MemoireBackend.envoyes = []
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(12, 0), duree_creneau=30
+        )
+        self.client.force_login(self.patient)
+
+    def reserver_puis_annuler(self):
+        response = self.client.post('/api/rendez-vous/create/', {
+            'professionnel_id': self.professionnel.id, 'cabinet_id': self.cabinet.id,
+            'motif_consultation_id': self.motif.id, 'date': prochain_jour(0).isoformat(), 'heure_debut': '09:00',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.put(
+            f"/api/rendez-vous/{response.json()['id']}/statut/", {'statut': 'annule'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_evenements_ecrits_puis_envoyes_par_le_worker(self):
+        self.reserver_puis_annuler()
+        self.assertEqual(list(Evenement.objects.values_list('type', 'statut')), [
+            ('rendez_vous_cree', 'en_attente'), ('rendez_vous_statut', 'en_attente'),
+        ])
+        self.assertEqual(MemoireBackend.envoyes, [])
+
+        self.assertEqual(outbox.drainer(taille_lot=1), (2, 2, 0))
+        self.assertEqual(
+            [message['destinataire'] for message in MemoireBackend.envoyes],
+            ['patient@test.com', 'sophie.martin@medi4ll.fr']
+        )
+        self.assertFalse(Evenement.objects.exclude(statut='traite').exists())
+        self.assertEqual(outbox.drainer(), (0, 0, 0))
+
+    def test_echec_isole_et_reprogramme(self):
+        self.reserver_puis_annuler()
+        backend = BackendRefusant('sophie.martin@medi4ll.fr')
+        maintenant = timezone.now()
+        self.assertEqual(outbox.drainer(backend=backend, maintenant=maintenant), (2, 1, 1))
+        self.assertEqual([message['destinataire'] for message in backend.envoyes], ['patient@test.com'])
+
+        evenement = Evenement.objects.get(type='rendez_vous_statut')
+        self.assertEqual((evenement.statut, evenement.tentatives), ('en_attente', 1))
+        self.assertGreater(evenement.prochain_essai, maintenant)
+        self.assertIn('fournisseur indisponible', evenement.derniere_erreur)
+        self.assertEqual(outbox.drainer(backend=backend, maintenant=maintenant), (0, 0, 0))
+
+        Evenement.objects.filter(id=evenement.id).update(tentatives=outbox.TENTATIVES_MAX - 1)
+        outbox.drainer(backend=backend, maintenant=evenement.prochain_essai)
+        evenement.refresh_from_db()
+        self.assertEqual(evenement.statut, 'echec')
+
+    def test_reservation_a_l_heure_de_chaque_lot(self):
+        """Drainage plus long que DUREE_RESERVATION : le lot envoyé est toujours réservé"""
+        self.reserver_puis_annuler()
+        horloge = [timezone.now()]
+        reservations = []
+
+        class BackendLent:
+            def envoyer(self, messages):
+                ids = {int(message['cle'].split('-')[1]) for message in messages}
+                reservations.append(all(
+                    prochain_essai > horloge[0]
+                    for prochain_essai in Evenement.objects.filter(id__in=ids).values_list('prochain_essai', flat=True)
+                ))
+                horloge[0] += outbox.DUREE_RESERVATION * 2
+                return len(messages)
+
+        with mock.patch('appointments.outbox.timezone.now', side_effect=lambda: horloge[0]):
+            self.assertEqual(outbox.drainer(taille_lot=1, backend=BackendLent()), (2, 2, 0))
+        self.assertEqual(reservations, [True, True])
+
+    def test_validation_du_professionnel(self):
+        admin = User.objects.create_user(username='admin', password='x', is_admin=True)
+        self.client.force_login(admin)
+        self.professionnel.statut_validation = 'en_attente'
+        self.professionnel.save()
+        url = f'/api/professionnels/manage/{self.professionnel.id}/'
+        self.assertEqual(self.client.put(url, {'bio': 'Bio'}, content_type='application/json').status_code, 200)
+        self.assertFalse(Evenement.objects.exists())
+        self.client.put(url, {'statut_validation': 'valide'}, content_type='application/json')
+        outbox.drainer()
+        self.assertEqual(MemoireBackend.envoyes[0]['sujet'], 'Compte validé')
+
+
+class ProfilageTests(DonneesMixin, TestCase):
+
+    def setUp(self):
+        profiling.reinitialiser()
+        self.admin = User.objects.create_user(username='admin', password='x', is_admin=True)
+
+    def test_server_timing_et_centiles_par_vue(self):
+        for _ in range(3):
+            response = self.client.get('/api/professionnels/')
+            self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;desc="\d+ requetes";dur=[\d.]+')
+        self.client.force_login(self.patient)
+        self.assertEqual(self.client.get('/api/admin/profilage/').status_code, 403)
+
+        self.client.force_login(self.admin)
+        vues = {vue['vue']: vue for vue in self.client.get('/api/admin/profilage/').json()['vues']}
+        self.assertEqual(vues['professionnels']['echantillons'], 3)
+        self.assertLessEqual(vues['professionnels']['duree_ms']['p50'], vues['professionnels']['duree_ms']['p99'])
+        self.assertEqual(self.client.delete('/api/admin/profilage/').status_code, 204)
+        self.assertNotIn('professionnels', [vue['vue'] for vue in profiling.resume()['vues']])
+
+    @override_settings(PROFILAGE_ECHANTILLON=0)
+    def test_hors_echantillon(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/professionnels/'))
+
+    def test_requetes_en_double(self):
+        mesureur = profiling.Mesureur()
+        with connection.execute_wrapper(mesureur):
+            for patient_id in (1, 2, 3):
+                list(RendezVous.objects.filter(patient_id=patient_id))
+            list(User.objects.filter(id__in=[1, 2]))
+            list(User.objects.filter(id__in=[1, 2, 3]))
+            list(Specialite.objects.all())
+        doublons = mesureur.doublons()
+        self.assertEqual(sorted(doublons.values()), [2, 3])
+        self.assertTrue(any('IN (%s, ...)' in sql for sql in doublons))
+
+
+class BudgetRequetesTests(DonneesMixin, TestCase):
+    """Chaque scénario du banc d'essai (manage.py benchmark) respecte son budget de requêtes SQL"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Cabinet.objects.filter(id=cls.cabinet.id).update(latitude=Decimal('44.8310'), longitude=Decimal('-0.5720'))
+        DisponibiliteHoraire.objects.create(
+            professionnel=cls.professionnel, cabinet=cls.cabinet, jour_semaine=1,
+            heure_debut=time(9, 0), heure_fin=time(12, 0), duree_creneau=30
+        )
+        debut = date.today() - timedelta(days=200)
+        RendezVous.objects.bulk_create([
+            RendezVous(
+                patient=cls.patient, professionnel=cls.professionnel, cabinet=cls.cabinet,
+                motif_consultation=cls.motif, date=debut + timedelta(days=i),
+                heure_debut=time(8, 0), heure_fin=time(8, 30), statut='termine'
+            )
+            for i in range(2 * benchmark.PAGE)
+        ])
+
+    def test_scenarios_dans_le_budget(self):
+        contexte = benchmark.preparer_contexte(4)
+        self.assertTrue(contexte['curseur_patient'])
+        executant = benchmark.ExecutantClient(contexte['utilisateurs'])
+        crees = []
+        for scenario in benchmark.SCENARIOS:
+            with self.subTest(scenario=scenario[0]):
+                resultat, ids = benchmark.mesurer(executant, scenario, contexte, iterations=2, echauffement=1)
+                self.assertEqual(resultat['erreurs'], 0)
+                self.assertLessEqual(resultat['requetes'], benchmark.BUDGETS_REQUETES[scenario[0]])
+                crees += ids
+        self.assertEqual(len(crees), 3)
+        benchmark.nettoyer(crees)
+        self.assertFalse(RendezVous.objects.filter(id__in=crees).exists())
+        self.assertFalse(Evenement.objects.exists())
+
+    def test_regressions(self):
+        reference = {'admin_clients': {'latence_ms': {'p95': 10.0}, 'requetes': 3}}
+        resultats = {'admin_clients': {'latence_ms': {'p95': 14.0}, 'requetes': 4, 'budget_requetes': 3}}
+        self.assertEqual(len(benchmark.regressions(resultats, reference, tolerance=0.25)), 2)
+        self.assertEqual(benchmark.regressions(resultats, reference, tolerance=0.5)[0].split(' :')[0], 'admin_clients')
+        self.assertEqual(len(benchmark.depassements(resultats)), 1)
+
+    def test_mesure_connexion(self):
+        # Connexion conservée entre les cycles (la transaction du test empêche toute fermeture)
+        resultat = benchmark.mesurer_connexion(5)
+        self.assertEqual(resultat['iterations'], 5)
+        self.assertEqual(resultat['connexions_obtenues'], 0)
+        self.assertFalse(resultat['pool'])
+
+
+class VuesAsynchronesTests(DonneesMixin, TestCase):
+    """Les lectures publiques sont des vues async : elles passent par le gestionnaire ASGI sans thread dédié"""
+
+    def setUp(self):
+        cache.clear()
+        profiling.reinitialiser()
+        self.async_client = AsyncClient()
+        DisponibiliteHoraire.objects.create(
+            professionnel=self.professionnel, cabinet=self.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(10, 0), duree_creneau=30
+        )
+
+    async def test_professionnels_et_disponibilites(self):
+        response = await self.async_client.get('/api/professionnels/', {'q': 'martin'})
+        self.assertEqual([p['cabinets'][0]['ville'] for p in response.json()], ['Bordeaux'])
+        self.assertIn('db;desc="2 requetes"', response['Server-Timing'])
+
+        url = f'/api/professionnels/{self.professionnel.id}/disponibilites/'
+        response = await self.async_client.get(url, {'date': prochain_jour(0).isoformat()})
+        self.assertEqual(response.json()['slots'], ['09:00', '09:30'])
+        regles = (await self.async_client.get(url)).json()
+        self.assertEqual(regles[0]['cabinet']['nom'], 'Cabinet Victoire')
+        self.assertEqual((await self.async_client.get('/api/professionnels/0/disponibilites/')).status_code, 404)
+        self.assertEqual((await self.async_client.post('/api/professionnels/')).status_code, 405)
+
+    async def test_reference_sans_requete_une_fois_en_cache(self):
+        response = await self.async_client.get('/api/specialites/')
+        self.assertEqual(response.json()[0]['nom'], 'Médecine générale')
+        response = await self.async_client.get('/api/specialites/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('db;desc="0 requetes"', response['Server-Timing'])
+
+
+class StatistiquesTests(DonneesMixin, TestCase):
+    """Statistiques agrégées : une requête GROUP BY, capacité tirée des règles horaires"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(username='admin', password='admin', is_admin=True)
+        cls.lundi = date(2026, 3, 2)
+        DisponibiliteHoraire.objects.create(
+            professionnel=cls.professionnel, cabinet=cls.cabinet, jour_semaine=0,
+            heure_debut=time(9, 0), heure_fin=time(11, 0), duree_creneau=30
+        )
+        gratuit = MotifConsultation.objects.create(
+            specialite=cls.specialite, libelle='Suivi', duree_estimee=30, tarif=Decimal('0')
+        )
+        for heure, statut, mode, motif in [
+            (9, 'termine', 'presentiel', cls.motif),
+            (10, 'no_show', 'presentiel', cls.motif),
+            (10, 'annule', 'presentiel', cls.motif),
+            (11, 'confirme', 'teleconsultation', gratuit),
+        ]:
+            RendezVous.objects.create(
+                patient=cls.patient, professionnel=cls.professionnel, cabinet=cls.cabinet,
+                motif_consultation=motif, date=cls.lundi, heure_debut=time(heure, 0),
+                heure_fin=time(heure, 30), statut=statut, mode=mode
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_semaine_par_professionnel(self):
+        response = self.client.get('/api/statistiques/', {
+            'date_debut': '2026-03-02', 'date_fin': '2026-03-08', 'periode': 'semaine', 'par': 'professionnel'
+        })
+        self.assertEqual(response.status_code, 200)
+        donnees = response.json()
+        ligne, = donnees['resultats']
+        self.assertEqual(ligne['periode'], '2026-03-02')
+        self.assertEqual(ligne['professionnel'], self.professionnel.id)
+        self.assertEqual(ligne['statuts'], {'confirme': 1, 'annule': 1, 'termine': 1, 'no_show': 1})
+        self.assertEqual(ligne['modes'], {'presentiel': 2, 'teleconsultation': 1})
+        self.assertEqual(ligne['taux_absence'], 0.5)
+        self.assertEqual(ligne['chiffre_affaires'], '25.00')
+        self.assertEqual(ligne['chiffre_affaires_prevu'], '30.00')
+        self.assertEqual(ligne['capacite'], 4)
+        self.assertEqual(ligne['taux_occupation'], 0.75)
+        self.assertEqual(donnees['libelles'], {str(self.professionnel.id): str(self.professionnel)})
+
+    def test_capacite_des_jours_sans_rendez_vous(self):
+        response = self.client.get('/api/statistiques/', {
+            'date_debut': '2026-03-01', 'date_fin': '2026-03-31', 'periode': 'mois'
+        })
+        total = response.json()['total']
+        self.assertEqual(total['capacite'], 5 * 4)
+        self.assertEqual(total['rendez_vous'], 4)
+
+    def test_professionnel_limite_a_ses_rendez_vous(self):
+        compte = User.objects.create_user(
+            username='sophie', email='sophie.martin@medi4ll.fr', password='x', type_compte='professionnel'
+        )
+        autre = Professionnel.objects.create(
+            nom='Durand', prenom='Paul', email='paul.durand@medi4ll.fr', specialite=self.specialite,
+            tarif_consultation=Decimal('30.00')
+        )
+        self.client.force_login(compte)
+        response = self.client.get('/api/statistiques/', {
+            'date_debut': '2026-03-02', 'date_fin': '2026-03-02', 'professionnel_id': autre.id
+        })
+        self.assertEqual(response.json()['total']['rendez_vous'], 4)
+
+    def test_acces_et_parametres_invalides(self):
+        self.assertEqual(self.client.get('/api/statistiques/', {'periode': 'annee'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/statistiques/', {'par': 'ville'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/statistiques/', {'date_debut': '2026-13-01'}).status_code, 400)
+        self.client.force_login(self.patient)
+        self.assertEqual(self.client.get('/api/statistiques/').status_code, 403)
+
+
+class StatistiquesAgregeesTests(StatistiquesTests):
+    """Mêmes statistiques lues dans les agrégats quotidiens de refresh_rollups"""
+
+    def setUp(self):
+        super().setUp()
+        call_command('refresh_rollups', stdout=io.StringIO())
+
+    def stats(self):
+        return self.client.get('/api/statistiques/', {
+            'date_debut': '2026-03-01', 'date_fin': '2026-03-31', 'par': 'cabinet'
+        }).json()
+
+    def test_agregats_par_jour(self):
+        self.assertEqual(StatistiqueJour.objects.count(), 4)
+        self.assertEqual(self.stats()['agrege_jusqu_au'], (timezone.localdate() - timedelta(days=1)).isoformat())
+
+    def test_suppression_lue_en_direct_puis_recalculee(self):
+        RendezVous.objects.filter(statut='no_show').delete()
+        self.assertEqual(list(JourARecalculer.objects.values_list('date', flat=True)), [self.lundi])
+        self.assertEqual(self.stats()['total']['statuts']['no_show'], 0)
+
+        sortie = io.StringIO()
+        call_command('refresh_rollups', stdout=sortie)
+        self.assertIn('1 jours recalculés', sortie.getvalue())
+        self.assertFalse(JourARecalculer.objects.exists())
+        self.assertEqual(StatistiqueJour.objects.count(), 3)
+        self.assertEqual(self.stats()['total']['statuts']['no_show'], 0)
+
+    def test_ecriture_en_masse_relue_par_date_modification(self):
+        RendezVous.objects.bulk_create([RendezVous(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=self.lundi + timedelta(days=7),
+            heure_debut=time(9, 0), heure_fin=time(9, 30), statut='termine'
+        )])
+        self.assertEqual(self.stats()['total']['rendez_vous'], 4)
+        call_command('refresh_rollups', stdout=io.StringIO())
+        total = self.stats()['total']
+        self.assertEqual(total['rendez_vous'], 5)
+        self.assertEqual(total['chiffre_affaires'], '50.00')
+
+
+class ClotureTests(DonneesMixin, TestCase):
+    """Les rendez-vous confirmés passés sont clôturés par lots ; les listes « à venir » ne gardent que l'avenir"""
+
+    def setUp(self):
+        self.lundi = prochain_jour(0)
+        self.maintenant = timezone.make_aware(datetime.combine(self.lundi, time(12, 0)))
+
+    def rendez_vous(self, jour, heure, **extra):
+        return RendezVous.objects.create(
+            patient=self.patient, professionnel=self.professionnel, cabinet=self.cabinet,
+            motif_consultation=self.motif, date=jour, heure_debut=time(heure, 0),
+            heure_fin=time(heure, 30), **extra
+        )
+
+    def test_lots_delai_et_statuts(self):
+        passes = [self.rendez_vous(self.lundi - timedelta(days=1), heure) for heure in (9, 10, 11)]
+        passes.append(self.rendez_vous(self.lundi, 9))
+        en_cours = self.rendez_vous(self.lundi, 11)
+        absent = self.rendez_vous(self.lundi - timedelta(days=1), 12, statut='no_show')
+
+        progression = []
+        clotures = sweeper.cloturer(
+            self.maintenant, heures=2, taille_lot=2, revue=True,
+            progression=lambda n, jour: progression.append(n)
+        )
+        self.assertEqual(clotures, 4)
+        self.assertEqual(progression, [2, 4])
+        self.assertEqual(
+            set(RendezVous.objects.filter(statut='termine', absence_a_verifier=True).values_list('id', flat=True)),
+            {rdv.id for rdv in passes}
+        )
+        self.assertEqual(RendezVous.objects.get(id=en_cours.id).statut, 'confirme')
+        self.assertEqual(RendezVous.objects.get(id=absent.id).statut, 'no_show')
+        self.assertEqual(sweeper.cloturer(self.maintenant, heures=2), 0)
+
+    def test_revue_par_le_professionnel(self):
+        rdv = self.rendez_vous(date(2026, 3, 2), 9)
+        sweeper.cloturer(revue=True)
+        self.assertTrue(JourARecalculer.objects.filter(date=rdv.date).exists())
+        compte = User.objects.create_user(
+            username='sophie', email='sophie.martin@medi4ll.fr', password='x', type_compte='professionnel'
+        )
+        self.client.force_login(compte)
+        response = self.client.get('/api/rendez-vous/professionnel/', {'a_verifier': '1'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [rdv.id])
+
+        response = self.client.put(
+            f'/api/rendez-vous/{rdv.id}/statut/', {'statut': 'no_show'}, content_type='application/json'
+        )
+        self.assertFalse(response.json()['absence_a_verifier'])
+        self.assertEqual(self.client.get('/api/rendez-vous/professionnel/', {'a_verifier': '1'}).json()['results'], [])
+
+    def test_a_venir(self):
+        self.rendez_vous(date(2026, 3, 2), 9)
+        proches = [self.rendez_vous(self.lundi + timedelta(days=7), 9), self.rendez_vous(self.lundi, 10)]
+        self.rendez_vous(self.lundi, 11, statut='annule')
+        self.client.force_login(self.patient)
+        response = self.client.get('/api/rendez-vous/', {'a_venir': '1'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [proches[1].id, proches[0].id])
+
+    def test_commande(self):
+        self.rendez_vous(date(2026, 3, 2), 9)
+        sortie = io.StringIO()
+        call_command('cloturer_rendez_vous', stdout=sortie)
+        self.assertIn('1 rendez-vous clôturés', sortie.getvalue())
+        self.assertEqual(RendezVous.objects.get().statut, 'termine')
+
+    def test_commande_en_boucle(self):
+        """Les passages sans rien à clôturer ne sont pas affichés en mode --boucle"""
+        self.rendez_vous(date(2026, 3, 2), 9)
+        sortie = io.StringIO()
+        with mock.patch('appointments.management.base.time.sleep', side_effect=[None, KeyboardInterrupt]) as sommeil:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('cloturer_rendez_vous', boucle=True, intervalle=5, stdout=sortie)
+        sommeil.assert_called_with(5)
+        self.assertEqual(sommeil.call_count, 2)
+        self.assertEqual(sortie.getvalue().count('rendez-vous clôturés en'), 1)
+
+
+class ReglagesConnexionsTests(TestCase):
+    """Connexions PostgreSQL : en ASGI, pool ou connexions persistantes, jamais une par requête"""
+
+    def reglages(self, **env):
+        environ = {
+            k: v for k, v in os.environ.items()
+            if not k.startswith('DATABASE_') and k != 'DJANGO_ASGI'
+        }
+        environ.update(DATABASE_HOST='db', **env)
+        with mock.patch.dict(os.environ, environ, clear=True):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'backend', 'settings.py'))['DATABASES']['default']
+
+    def test_pool_par_defaut_en_asgi(self):
+        base = self.reglages(DJANGO_ASGI='1')
+        self.assertEqual(base['CONN_MAX_AGE'], 0)
+        self.assertEqual(base['OPTIONS']['pool']['max_size'], 10)
+
+    def test_connexions_persistantes_hors_asgi(self):
+        base = self.reglages()
+        self.assertEqual(base['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', base['OPTIONS'])
+
+    def gunicorn(self, **env):
+        environ = {
+            k: v for k, v in os.environ.items()
+            if not k.startswith(('DATABASE_', 'GUNICORN_')) and k != 'DJANGO_ASGI'
+        }
+        environ.update(DATABASE_HOST='db', CACHE_BACKEND='file', **env)
+        return subprocess.run(
+            [sys.executable, '-c', "import runpy; runpy.run_path('gunicorn.conf.py')"],
+            cwd=settings.BASE_DIR, env=environ, capture_output=True, text=True
+        )
+
+    def test_gunicorn_refuse_une_connexion_par_requete(self):
+        self.assertEqual(self.gunicorn().returncode, 0)
+        self.assertEqual(self.gunicorn(GUNICORN_WORKER_CLASS='gthread', DATABASE_POOL='0').returncode, 0)
+        refus = self.gunicorn(DATABASE_POOL='0')
+        self.assertNotEqual(refus.returncode, 0)
+        self.assertIn('une connexion par requête', refus.stderr)
+        self.assertEqual(self.gunicorn(DATABASE_POOL='0', DATABASE_CONN_MAX_AGE='60').returncode, 0)
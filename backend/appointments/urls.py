@@ -13,14 +13,21 @@ urlpatterns = [
     path('user/profile/', views.user_profile, name='user-profile'),
     path('specialites/', views.get_specialites, name='specialites'),
     path('professionnels/', views.get_professionnels, name='professionnels'),
+    path('professionnels/proximite/', views.professionnels_proximite, name='professionnels-proximite'),
+    path('professionnels/disponibilites/', views.professionnels_disponibilites_periode, name='professionnels-disponibilites-periode'),
     path('professionnels/<int:professionnel_id>/disponibilites/', views.professionnel_disponibilites, name='professionnel-disponibilites'),
     path('professionnels/manage/', views.professionnels_list_create, name='professionnels-manage'),
     path('professionnels/manage/<int:pk>/', views.professionnel_detail, name='professionnel-detail'),
     path('cabinets/', views.get_cabinets, name='cabinets'),
+    path('motifs/', views.get_motifs, name='motifs'),
     path('admin/rendez-vous/', views.admin_rendez_vous, name='admin-rendez-vous'),
     path('admin/rendez-vous/<int:rdv_id>/', views.admin_rendez_vous, name='admin-rendez-vous-delete'),
     path('admin/clients/', views.admin_clients, name='admin-clients'),
     path('admin/clients/<int:client_id>/', views.admin_clients, name='admin-clients-delete'),
+    path('admin/export/rendez-vous/', views.admin_export_rendez_vous, name='admin-export-rendez-vous'),
+    path('admin/export/clients/', views.admin_export_clients, name='admin-export-clients'),
+    path('admin/profilage/', views.admin_profilage, name='admin-profilage'),
+    path('statistiques/', views.statistiques, name='statistiques'),
     path('professionnel/disponibilites/', views.manage_disponibilites, name='manage-disponibilites'),
     path('professionnel/disponibilites/<int:dispo_id>/', views.manage_disponibilite_detail, name='manage-disponibilite-detail'),
     path('professionnel/profile/', views.manage_professionnel_profile, name='manage-professionnel-profile'),
@@ -1,10 +1,19 @@
+import json
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.contrib.auth import authenticate, login, logout
+from django.conf import settings
+from django.contrib.auth import alogin, logout
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
 from django.utils.decorators import method_decorator
+from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from datetime import datetime, timedelta, time as datetime_time
 from .models import (
@@ -14,9 +23,28 @@ from .models import (
 from .serializers import (
     RendezVousSerializer, ProfessionnelSerializer, 
     CabinetSerializer, SpecialiteSerializer, UserSerializer, 
-    DisponibiliteHoraireSerializer
+    DisponibiliteHoraireSerializer, MotifConsultationSerializer
 )
+from .slots import creneaux_libres_jour, creneaux_libres_periode
+from .pagination import reponse_paginee
+from .search import rechercher
+from .geo import professionnels_proches
+from . import cache as reference_cache
+from .authentication import professionnel_connecte, oublier_professionnel, oublier_utilisateur, utilisateur_complet
+from .booking import reserver_creneau, calculer_heure_fin, changer_statut, CreneauIndisponible
+from .outbox import publier
+from . import analytics, exports, hashers, profiling
+
 
+ORDRE_RENDEZ_VOUS = ['-date', '-heure_debut', '-id']
+ORDRE_A_VENIR = ['date', 'heure_debut', 'id']
+ORDRE_PROFESSIONNELS = ['nom', 'prenom', 'id']
+ORDRE_CLIENTS = ['-date_joined', '-id']
+
+PROXIMITE_K_MAX = 100
+PERIODE_DISPONIBILITES_MAX_JOURS = 31
+PROFESSIONNELS_DISPONIBILITES_MAX = 100
+STATISTIQUES_JOURS_DEFAUT = 30
 
 
 @api_view(['POST'])
@@ -35,6 +63,7 @@ def register_user(request):
                 numero_rpps = f"TEMP{user.id}{int(time.time()) % 1000000}"
                 
                 Professionnel.objects.create(
+                    user=user,
                     nom=user.last_name,
                     prenom=user.first_name,
                     email=user.email,
@@ -64,25 +93,43 @@ def register_user(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
 @csrf_exempt
-def login_user(request):
-    """Connexion d'un utilisateur"""
-    username = request.data.get('username')
-    password = request.data.get('password')
-    
+@require_POST
+async def login_user(request):
+    """
+    Connexion d'un utilisateur
+    Le mot de passe est vérifié dans le pool de hachage (voir hashers.py), et
+    réécrit s'il a été haché avec un autre algorithme ou un autre coût.
+    """
+    try:
+        donnees = json.loads(request.body) if request.content_type == 'application/json' else request.POST
+    except ValueError:
+        donnees = {}
+    username = donnees.get('username')
+    password = donnees.get('password')
+
     if not username or not password:
-        return Response(
-            {'error': 'Username et password requis'}, 
+        return JsonResponse(
+            {'error': 'Username et password requis'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    user = authenticate(request, username=username, password=password)
-    
+
+    user = await User.objects.filter(username=username).afirst()
+    if user is None or not user.is_active:
+        # Même coût qu'une vérification : le temps de réponse ne révèle pas les comptes
+        await hashers.executer(hashers.hacher, password)
+        user = None
+    else:
+        valide, nouveau_hachage = await hashers.executer(hashers.verifier, password, user.password)
+        if not valide:
+            user = None
+        elif nouveau_hachage:
+            user.password = nouveau_hachage
+            await user.asave(update_fields=['password'])
+
     if user is not None:
-        login(request, user)
-        return Response({
+        await alogin(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+        return JsonResponse({
             'message': 'Connexion réussie',
             'user': {
                 'id': user.id,
@@ -95,8 +142,8 @@ def login_user(request):
             }
         })
     else:
-        return Response(
-            {'error': 'Identifiants invalides'}, 
+        return JsonResponse(
+            {'error': 'Identifiants invalides'},
             status=status.HTTP_401_UNAUTHORIZED
         )
 
@@ -106,6 +153,7 @@ def login_user(request):
 @csrf_exempt
 def logout_user(request):
     """Déconnexion d'un utilisateur"""
+    oublier_utilisateur(request.user.id)
     logout(request)
     return Response({'message': 'Déconnexion réussie'})
 
@@ -125,66 +173,87 @@ def check_admin(request):
 @permission_classes([IsAuthenticated])
 def user_profile(request):
     """Récupère ou modifie le profil de l'utilisateur connecté"""
+    utilisateur = utilisateur_complet(request.user)
     if request.method == 'GET':
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(utilisateur)
         return Response(serializer.data)
     
     elif request.method == 'PUT':
-        serializer = UserSerializer(request.user, data=request.data, partial=True)
+        serializer = UserSerializer(utilisateur, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_specialites(request):
-    """Liste toutes les spécialités médicales"""
-    specialites = Specialite.objects.all()
-    serializer = SpecialiteSerializer(specialites, many=True)
-    return Response(serializer.data)
+@require_GET
+async def get_specialites(request):
+    """Liste toutes les spécialités médicales (mise en cache, ETag)"""
+    return await reference_cache.areponse_reference(
+        request, 'specialites',
+        lambda: SpecialiteSerializer(Specialite.objects.all(), many=True).data
+    )
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_cabinets(request):
-    """Liste tous les cabinets médicaux"""
-    cabinets = Cabinet.objects.all()
-    serializer = CabinetSerializer(cabinets, many=True)
-    return Response(serializer.data)
+@require_GET
+async def get_cabinets(request):
+    """Liste tous les cabinets médicaux (mise en cache, ETag)"""
+    return await reference_cache.areponse_reference(
+        request, 'cabinets',
+        lambda: CabinetSerializer(Cabinet.objects.all(), many=True).data
+    )
+
 
+@require_GET
+async def get_motifs(request):
+    """
+    Liste les motifs de consultation (mise en cache, ETag)
+    Paramètres :
+    - specialite : ID de la spécialité
+    """
+    specialite_id = request.GET.get('specialite')
+    filtre = None
+    if specialite_id:
+        filtre = lambda motif: str(motif['specialite']['id']) == specialite_id
+    return await reference_cache.areponse_reference(
+        request, 'motifs',
+        lambda: MotifConsultationSerializer(
+            MotifConsultation.objects.select_related('specialite'), many=True
+        ).data,
+        filtre=filtre
+    )
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_professionnels(request):
+
+@require_GET
+async def get_professionnels(request):
     """
     Liste tous les professionnels avec filtres optionnels
     Paramètres :
+    - q : Recherche libre (nom, prénom, spécialité, ville, code postal), triée par pertinence
     - specialite : ID de la spécialité
-    - ville : Nom de la ville
-    - nom : Recherche dans nom/prenom
+    - ville : Ville d'un des cabinets (début du nom, sans casse)
+    - nom : Début du nom ou du prénom (sans casse)
     - tarif_max : Prix maximum
     """
-    professionnels = Professionnel.objects.filter(statut_validation='valide')
+    professionnels = Professionnel.objects.filter(statut_validation='valide').avec_relations()
     
     specialite_id = request.GET.get('specialite')
     ville = request.GET.get('ville')
     nom = request.GET.get('nom')
     tarif_max = request.GET.get('tarif_max')
+    recherche = request.GET.get('q')
     
     if specialite_id:
         professionnels = professionnels.filter(specialite_id=specialite_id)
     
     if ville:
-        professionnels = professionnels.filter(
-            cabinets__ville__icontains=ville
-        ).distinct()
+        # Sous-requête plutôt que jointure : un seul résultat par professionnel
+        professionnels = professionnels.filter(id__in=ProfessionnelCabinet.objects.filter(
+            cabinet__ville__istartswith=ville
+        ).values('professionnel_id'))
     
     if nom:
-        professionnels = professionnels.filter(
-            Q(nom__icontains=nom) | Q(prenom__icontains=nom)
-        )
+        professionnels = professionnels.filter(Q(nom__istartswith=nom) | Q(prenom__istartswith=nom))
     
     if tarif_max:
         try:
@@ -192,95 +261,241 @@ def get_professionnels(request):
         except ValueError:
             pass
     
-    serializer = ProfessionnelSerializer(professionnels, many=True)
-    return Response(serializer.data)
+    if recherche:
+        professionnels = rechercher(professionnels, recherche)
+    
+    serializer = ProfessionnelSerializer([professionnel async for professionnel in professionnels], many=True)
+    return JsonResponse(serializer.data, safe=False)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def professionnel_disponibilites(request, professionnel_id):
-    """Récupère les disponibilités d'un professionnel"""
+def professionnels_proximite(request):
+    """
+    Professionnels proches d'un point, triés par distance
+    Paramètres :
+    - lat, lng : coordonnées du point (degrés décimaux)
+    - rayon_km : rayon de recherche (optionnel, RAYON_MAX_KM au plus)
+    - k : nombre maximum de professionnels, les plus proches (20 par défaut sans rayon,
+      PROXIMITE_K_MAX par défaut et au plus)
+    - specialite : ID de la spécialité (optionnel)
+    """
     try:
-        professionnel = Professionnel.objects.get(id=professionnel_id)
-    except Professionnel.DoesNotExist:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+        rayon_km = float(request.GET['rayon_km']) if request.GET.get('rayon_km') else None
+        k = int(request.GET['k']) if request.GET.get('k') else None
+    except (KeyError, ValueError):
         return Response(
+            {'error': 'Paramètres lat, lng, rayon_km ou k invalides'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (rayon_km is not None and rayon_km <= 0):
+        return Response(
+            {'error': 'Coordonnées ou rayon hors limites'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if k is None:
+        k = 20 if rayon_km is None else PROXIMITE_K_MAX
+    k = max(1, min(k, PROXIMITE_K_MAX))
+    
+    professionnels = Professionnel.objects.filter(statut_validation='valide')
+    if request.GET.get('specialite'):
+        professionnels = professionnels.filter(specialite_id=request.GET.get('specialite'))
+    
+    proches = professionnels_proches(professionnels, lat, lng, rayon_km=rayon_km, k=k)
+    par_id = Professionnel.objects.avec_relations().in_bulk([p[0] for p in proches])
+    resultats = []
+    for professionnel_id, distance, cabinet_id in proches:
+        donnees = ProfessionnelSerializer(par_id[professionnel_id]).data
+        donnees['distance_km'] = round(distance, 2)
+        donnees['cabinet_proche_id'] = cabinet_id
+        resultats.append(donnees)
+    return Response(resultats)
+
+
+@require_GET
+async def professionnel_disponibilites(request, professionnel_id):
+    """
+    Récupère les disponibilités d'un professionnel
+    Paramètres :
+    - date : date (AAAA-MM-JJ) pour laquelle calculer les créneaux libres
+    - cabinet_id : ID du cabinet (optionnel)
+    Sans date, renvoie les règles horaires brutes.
+    """
+    if not await Professionnel.objects.filter(id=professionnel_id).aexists():
+        return JsonResponse(
             {'error': 'Professionnel non trouvé'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    disponibilites = DisponibiliteHoraire.objects.filter(professionnel=professionnel)
-    serializer = DisponibiliteHoraireSerializer(disponibilites, many=True)
-    return Response(serializer.data)
+    date_param = request.GET.get('date')
+    if date_param:
+        try:
+            jour = datetime.strptime(date_param, '%Y-%m-%d').date()
+            cabinet_id = int(request.GET['cabinet_id']) if request.GET.get('cabinet_id') else None
+        except ValueError:
+            return JsonResponse(
+                {'error': 'Paramètres date ou cabinet_id invalides'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        slots = await sync_to_async(creneaux_libres_jour)(professionnel_id, jour, cabinet_id=cabinet_id)
+        return JsonResponse({
+            'date': jour.isoformat(),
+            'cabinet_id': cabinet_id,
+            'slots': slots
+        })
+    
+    disponibilites = DisponibiliteHoraire.objects.filter(professionnel_id=professionnel_id).select_related('cabinet')
+    serializer = DisponibiliteHoraireSerializer([d async for d in disponibilites], many=True)
+    return JsonResponse(serializer.data, safe=False)
+
+
+@require_GET
+async def professionnels_disponibilites_periode(request):
+    """
+    Créneaux libres de plusieurs professionnels sur une période
+    Paramètres :
+    - ids : IDs des professionnels séparés par des virgules
+    - date_debut : date de début (AAAA-MM-JJ), aujourd'hui par défaut
+    - date_fin : date de fin incluse (AAAA-MM-JJ), date_debut + 13 jours par défaut
+    - cabinet_id : ID du cabinet (optionnel)
+    """
+    try:
+        ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip()]
+        date_debut = request.GET.get('date_debut')
+        date_debut = datetime.strptime(date_debut, '%Y-%m-%d').date() if date_debut else timezone.localdate()
+        date_fin = request.GET.get('date_fin')
+        date_fin = datetime.strptime(date_fin, '%Y-%m-%d').date() if date_fin else date_debut + timedelta(days=13)
+        cabinet_id = int(request.GET['cabinet_id']) if request.GET.get('cabinet_id') else None
+    except ValueError:
+        return JsonResponse(
+            {'error': 'Paramètres ids, date_debut, date_fin ou cabinet_id invalides'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not ids or len(ids) > PROFESSIONNELS_DISPONIBILITES_MAX:
+        return JsonResponse(
+            {'error': f'Entre 1 et {PROFESSIONNELS_DISPONIBILITES_MAX} professionnels requis'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if date_fin < date_debut or (date_fin - date_debut).days >= PERIODE_DISPONIBILITES_MAX_JOURS:
+        return JsonResponse(
+            {'error': f'Période invalide (maximum {PERIODE_DISPONIBILITES_MAX_JOURS} jours)'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    creneaux = await sync_to_async(creneaux_libres_periode)(
+        list(dict.fromkeys(ids)), date_debut, date_fin, cabinet_id=cabinet_id
+    )
+    professionnels = {}
+    for professionnel_id, jours in creneaux.items():
+        prochain = None
+        if jours:
+            premier_jour = min(jours)
+            prochain = {'date': premier_jour, 'heure': jours[premier_jour][0]}
+        professionnels[str(professionnel_id)] = {
+            'prochain_creneau': prochain,
+            'jours': jours
+        }
+    
+    return JsonResponse({
+        'date_debut': date_debut.isoformat(),
+        'date_fin': date_fin.isoformat(),
+        'cabinet_id': cabinet_id,
+        'professionnels': professionnels
+    })
+
+
+def liste_rendez_vous(request, rendez_vous):
+    """
+    Liste paginée par curseur ; avec a_venir=1, seulement les rendez-vous confirmés
+    à partir d'aujourd'hui, les plus proches d'abord (index partiels sur statut='confirme')
+    """
+    if request.GET.get('a_venir') == '1':
+        rendez_vous = rendez_vous.filter(statut='confirme', date__gte=timezone.localdate())
+        return reponse_paginee(rendez_vous, request, ORDRE_A_VENIR, RendezVousSerializer)
+    return reponse_paginee(rendez_vous, request, ORDRE_RENDEZ_VOUS, RendezVousSerializer)
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_rendez_vous(request):
-    """Liste les rendez-vous du patient connecté"""
-    rendez_vous = RendezVous.objects.filter(patient=request.user).order_by('-date', '-heure_debut')
-    
-    page = request.GET.get('page', 1)
-    page_size = request.GET.get('page_size', 10)
-    
-    try:
-        page = int(page)
-        page_size = int(page_size)
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        total = rendez_vous.count()
-        rendez_vous_page = rendez_vous[start:end]
-        
-        serializer = RendezVousSerializer(rendez_vous_page, many=True)
-        return Response({
-            'results': serializer.data,
-            'total': total,
-            'page': page,
-            'page_size': page_size
-        })
-    except ValueError:
-        serializer = RendezVousSerializer(rendez_vous, many=True)
-        return Response(serializer.data)
+    """Liste les rendez-vous du patient connecté (pagination par curseur, a_venir=1 : à venir)"""
+    rendez_vous = RendezVous.objects.filter(patient=request.user).avec_relations()
+    return liste_rendez_vous(request, rendez_vous)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @csrf_exempt
 def create_rendez_vous(request):
-    """Crée un nouveau rendez-vous"""
+    """
+    Crée un nouveau rendez-vous
+    Sans heure_fin, la durée est celle du créneau (ou à défaut du motif).
+    Renvoie 409 si le créneau chevauche un rendez-vous existant.
+    """
     try:
-        professionnel = Professionnel.objects.get(id=request.data.get('professionnel_id'))
+        professionnel = Professionnel.objects.select_related('specialite').get(id=request.data.get('professionnel_id'))
         cabinet = Cabinet.objects.get(id=request.data.get('cabinet_id'))
         
         motif_consultation = None
         if request.data.get('motif_consultation_id'):
-            motif_consultation = MotifConsultation.objects.get(id=request.data.get('motif_consultation_id'))
-        
-        rdv = RendezVous.objects.create(
+            motif_consultation = MotifConsultation.objects.select_related('specialite').get(
+                id=request.data.get('motif_consultation_id')
+            )
+    except (Professionnel.DoesNotExist, Cabinet.DoesNotExist, MotifConsultation.DoesNotExist) as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        jour = datetime.strptime(str(request.data.get('date')), '%Y-%m-%d').date()
+        heure_debut = datetime_time.fromisoformat(str(request.data.get('heure_debut')))
+        heure_fin = request.data.get('heure_fin')
+        if heure_fin:
+            heure_fin = datetime_time.fromisoformat(str(heure_fin))
+        else:
+            heure_fin = calculer_heure_fin(professionnel, cabinet, jour, heure_debut, motif_consultation)
+    except ValueError:
+        return Response(
+            {'error': 'Date ou heures invalides'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if heure_fin <= heure_debut:
+        return Response(
+            {'error': "L'heure de fin doit être postérieure à l'heure de début"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        rdv = reserver_creneau(
             patient=request.user,
             professionnel=professionnel,
             cabinet=cabinet,
             motif_consultation=motif_consultation,
-            date=request.data.get('date'),
-            heure_debut=request.data.get('heure_debut'),
-            heure_fin=request.data.get('heure_fin'),
+            date=jour,
+            heure_debut=heure_debut,
+            heure_fin=heure_fin,
             mode=request.data.get('mode', 'presentiel'),
-            notes_patient=request.data.get('notes_patient', ''),
-            statut='confirme'
+            notes_patient=request.data.get('notes_patient', '')
         )
-        
-        serializer = RendezVousSerializer(rdv)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-        
-    except (Professionnel.DoesNotExist, Cabinet.DoesNotExist, MotifConsultation.DoesNotExist) as e:
+    except CreneauIndisponible:
         return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_404_NOT_FOUND
+            {'error': "Ce créneau n'est plus disponible"}, 
+            status=status.HTTP_409_CONFLICT
         )
     except Exception as e:
         return Response(
             {'error': str(e)}, 
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    serializer = RendezVousSerializer(rdv)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT'])
@@ -291,7 +506,7 @@ def update_rendez_vous_statut(request, rdv_id):
     try:
         rdv = RendezVous.objects.get(id=rdv_id)
         
-        if request.user != rdv.patient and not hasattr(request.user, 'professionnel'):
+        if request.user != rdv.patient and professionnel_connecte(request) != rdv.professionnel_id:
             return Response(
                 {'error': 'Non autorisé'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -299,10 +514,18 @@ def update_rendez_vous_statut(request, rdv_id):
         
         nouveau_statut = request.data.get('statut')
         if nouveau_statut in ['confirme', 'annule', 'termine', 'no_show']:
-            rdv.statut = nouveau_statut
+            rdv.absence_a_verifier = False
             if nouveau_statut == 'annule':
                 rdv.date_annulation = datetime.now()
-            rdv.save()
+            try:
+                changer_statut(
+                    rdv, nouveau_statut, par='patient' if request.user == rdv.patient else 'professionnel'
+                )
+            except CreneauIndisponible:
+                return Response(
+                    {'error': "Ce créneau n'est plus disponible"}, 
+                    status=status.HTTP_409_CONFLICT
+                )
             
             serializer = RendezVousSerializer(rdv)
             return Response(serializer.data)
@@ -322,17 +545,20 @@ def update_rendez_vous_statut(request, rdv_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def professionnel_rendez_vous(request):
-    """Liste les rendez-vous reçus par le professionnel connecté"""
-    try:
-        professionnel = Professionnel.objects.get(email=request.user.email)
-        rendez_vous = RendezVous.objects.filter(professionnel=professionnel).order_by('-date', '-heure_debut')
-        serializer = RendezVousSerializer(rendez_vous, many=True)
-        return Response(serializer.data)
-    except Professionnel.DoesNotExist:
+    """
+    Liste les rendez-vous reçus par le professionnel connecté
+    (a_venir=1 : à venir ; a_verifier=1 : clôturés automatiquement, présence à confirmer)
+    """
+    professionnel_id = professionnel_connecte(request)
+    if professionnel_id is None:
         return Response(
             {'error': 'Professionnel non trouvé'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    rendez_vous = RendezVous.objects.filter(professionnel_id=professionnel_id).avec_relations()
+    if request.GET.get('a_verifier') == '1':
+        rendez_vous = rendez_vous.filter(absence_a_verifier=True, statut='termine')
+    return liste_rendez_vous(request, rendez_vous)
 
 
 @api_view(['GET', 'PUT'])
@@ -340,7 +566,7 @@ def professionnel_rendez_vous(request):
 def manage_professionnel_profile(request):
     """Récupère ou modifie le profil professionnel"""
     try:
-        professionnel = Professionnel.objects.get(email=request.user.email)
+        professionnel = Professionnel.objects.avec_relations().get(id=professionnel_connecte(request))
         
         if request.method == 'GET':
             serializer = ProfessionnelSerializer(professionnel)
@@ -350,10 +576,12 @@ def manage_professionnel_profile(request):
             serializer = ProfessionnelSerializer(professionnel, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
+                oublier_professionnel(request)
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
     except Professionnel.DoesNotExist:
+        oublier_professionnel(request)
         return Response(
             {'error': 'Professionnel non trouvé'}, 
             status=status.HTTP_404_NOT_FOUND
@@ -364,38 +592,41 @@ def manage_professionnel_profile(request):
 @permission_classes([IsAuthenticated])
 def manage_disponibilites(request):
     """Gère les disponibilités horaires du professionnel"""
-    try:
-        professionnel = Professionnel.objects.get(email=request.user.email)
-        
-        if request.method == 'GET':
-            disponibilites = DisponibiliteHoraire.objects.filter(professionnel=professionnel)
-            serializer = DisponibiliteHoraireSerializer(disponibilites, many=True)
-            return Response(serializer.data)
-        
-        elif request.method == 'POST':
-            serializer = DisponibiliteHoraireSerializer(
-                data=request.data, 
-                context={'professionnel': professionnel}
-            )
-            if serializer.is_valid():
-                serializer.save(professionnel=professionnel)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            
-    except Professionnel.DoesNotExist:
+    professionnel_id = professionnel_connecte(request)
+    if professionnel_id is None:
         return Response(
             {'error': 'Professionnel non trouvé'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    if request.method == 'GET':
+        disponibilites = DisponibiliteHoraire.objects.filter(
+            professionnel_id=professionnel_id
+        ).select_related('cabinet')
+        serializer = DisponibiliteHoraireSerializer(disponibilites, many=True)
+        return Response(serializer.data)
+    
+    elif request.method == 'POST':
+        serializer = DisponibiliteHoraireSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(professionnel_id=professionnel_id)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def manage_disponibilite_detail(request, dispo_id):
     """Gère une disponibilité horaire spécifique"""
+    professionnel_id = professionnel_connecte(request)
+    if professionnel_id is None:
+        return Response(
+            {'error': 'Professionnel non trouvé'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
     try:
-        professionnel = Professionnel.objects.get(email=request.user.email)
-        disponibilite = DisponibiliteHoraire.objects.get(id=dispo_id, professionnel=professionnel)
+        disponibilite = DisponibiliteHoraire.objects.get(id=dispo_id, professionnel_id=professionnel_id)
         
         if request.method == 'GET':
             serializer = DisponibiliteHoraireSerializer(disponibilite)
@@ -412,11 +643,6 @@ def manage_disponibilite_detail(request, dispo_id):
             disponibilite.delete()
             return Response({'message': 'Disponibilité supprimée'}, status=status.HTTP_204_NO_CONTENT)
             
-    except Professionnel.DoesNotExist:
-        return Response(
-            {'error': 'Professionnel non trouvé'}, 
-            status=status.HTTP_404_NOT_FOUND
-        )
     except DisponibiliteHoraire.DoesNotExist:
         return Response(
             {'error': 'Disponibilité non trouvée'}, 
@@ -428,57 +654,56 @@ def manage_disponibilite_detail(request, dispo_id):
 @permission_classes([IsAuthenticated])
 def manage_professionnel_cabinets(request):
     """Gère les cabinets du professionnel"""
-    try:
-        professionnel = Professionnel.objects.get(email=request.user.email)
-        
-        if request.method == 'GET':
-            cabinets = professionnel.cabinets.all()
-            serializer = CabinetSerializer(cabinets, many=True)
-            return Response(serializer.data)
-        
-        elif request.method == 'POST':
-            cabinet_id = request.data.get('cabinet_id')
-            if cabinet_id:
-                try:
-                    cabinet = Cabinet.objects.get(id=cabinet_id)
-                    professionnel.cabinets.add(cabinet)
-                    return Response({'message': 'Cabinet ajouté'}, status=status.HTTP_201_CREATED)
-                except Cabinet.DoesNotExist:
-                    return Response(
-                        {'error': 'Cabinet non trouvé'}, 
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-            else:
-                serializer = CabinetSerializer(data=request.data)
-                if serializer.is_valid():
-                    cabinet = serializer.save()
-                    professionnel.cabinets.add(cabinet)
-                    return Response(serializer.data, status=status.HTTP_201_CREATED)
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-                
-    except Professionnel.DoesNotExist:
+    professionnel_id = professionnel_connecte(request)
+    if professionnel_id is None:
         return Response(
             {'error': 'Professionnel non trouvé'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    if request.method == 'GET':
+        cabinets = Cabinet.objects.filter(professionnels=professionnel_id)
+        serializer = CabinetSerializer(cabinets, many=True)
+        return Response(serializer.data)
+    
+    elif request.method == 'POST':
+        cabinet_id = request.data.get('cabinet_id')
+        if cabinet_id:
+            try:
+                cabinet = Cabinet.objects.get(id=cabinet_id)
+                ProfessionnelCabinet.objects.get_or_create(professionnel_id=professionnel_id, cabinet=cabinet)
+                return Response({'message': 'Cabinet ajouté'}, status=status.HTTP_201_CREATED)
+            except Cabinet.DoesNotExist:
+                return Response(
+                    {'error': 'Cabinet non trouvé'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        else:
+            serializer = CabinetSerializer(data=request.data)
+            if serializer.is_valid():
+                cabinet = serializer.save()
+                ProfessionnelCabinet.objects.create(professionnel_id=professionnel_id, cabinet=cabinet)
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def manage_professionnel_cabinet_detail(request, cabinet_id):
     """Retire un cabinet de la liste du professionnel"""
+    professionnel_id = professionnel_connecte(request)
+    if professionnel_id is None:
+        return Response(
+            {'error': 'Professionnel non trouvé'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
     try:
-        professionnel = Professionnel.objects.get(email=request.user.email)
         cabinet = Cabinet.objects.get(id=cabinet_id)
         
-        professionnel.cabinets.remove(cabinet)
+        ProfessionnelCabinet.objects.filter(professionnel_id=professionnel_id, cabinet=cabinet).delete()
         return Response({'message': 'Cabinet retiré'}, status=status.HTTP_204_NO_CONTENT)
         
-    except Professionnel.DoesNotExist:
-        return Response(
-            {'error': 'Professionnel non trouvé'}, 
-            status=status.HTTP_404_NOT_FOUND
-        )
     except Cabinet.DoesNotExist:
         return Response(
             {'error': 'Cabinet non trouvé'}, 
@@ -497,9 +722,8 @@ def professionnels_list_create(request):
         )
     
     if request.method == 'GET':
-        professionnels = Professionnel.objects.all()
-        serializer = ProfessionnelSerializer(professionnels, many=True)
-        return Response(serializer.data)
+        professionnels = Professionnel.objects.avec_relations()
+        return reponse_paginee(professionnels, request, ORDRE_PROFESSIONNELS, ProfessionnelSerializer)
     
     elif request.method == 'POST':
         serializer = ProfessionnelSerializer(data=request.data)
@@ -535,9 +759,16 @@ def professionnel_detail(request, pk):
         return Response(serializer.data)
     
     elif request.method == 'PUT':
+        statut_precedent = professionnel.statut_validation
         serializer = ProfessionnelSerializer(professionnel, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                professionnel = serializer.save()
+                if professionnel.statut_validation != statut_precedent:
+                    publier(
+                        'professionnel_validation', professionnel_id=professionnel.id,
+                        statut=professionnel.statut_validation
+                    )
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -560,9 +791,8 @@ def admin_rendez_vous(request, rdv_id=None):
         )
     
     if request.method == 'GET':
-        rendez_vous = RendezVous.objects.all().order_by('-date', '-heure_debut')
-        serializer = RendezVousSerializer(rendez_vous, many=True)
-        return Response(serializer.data)
+        rendez_vous = RendezVous.objects.avec_relations()
+        return reponse_paginee(rendez_vous, request, ORDRE_RENDEZ_VOUS, RendezVousSerializer)
     
     elif request.method == 'DELETE' and rdv_id:
         try:
@@ -591,8 +821,7 @@ def admin_clients(request, client_id=None):
     
     if request.method == 'GET':
         clients = User.objects.filter(type_compte='client')
-        serializer = UserSerializer(clients, many=True)
-        return Response(serializer.data)
+        return reponse_paginee(clients, request, ORDRE_CLIENTS, UserSerializer)
     
     elif request.method == 'DELETE' and client_id:
         try:
@@ -607,3 +836,118 @@ def admin_clients(request, client_id=None):
                 {'error': 'Client non trouvé'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_export_rendez_vous(request):
+    """
+    Export en flux de tous les rendez-vous (admin)
+    Paramètres : sortie (csv par défaut, ndjson), date_debut, date_fin, statut, professionnel_id
+    """
+    return exporter(request, exports.filtrer_rendez_vous, exports.COLONNES_RENDEZ_VOUS, 'rendez-vous')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_export_clients(request):
+    """
+    Export en flux de tous les clients (admin)
+    Paramètres : sortie (csv par défaut, ndjson), date_debut, date_fin, statut, professionnel_id
+    """
+    return exporter(request, exports.filtrer_clients, exports.COLONNES_CLIENTS, 'clients')
+
+
+def exporter(request, filtrer, colonnes, nom):
+    if not request.user.is_admin:
+        return Response(
+            {'error': 'Accès réservé aux administrateurs'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    sortie = request.GET.get('sortie', 'csv')
+    if sortie not in exports.SORTIES:
+        return Response(
+            {'error': 'Format de sortie invalide (csv ou ndjson)'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        queryset = filtrer(request.GET)
+    except ValueError:
+        return Response(
+            {'error': "Paramètres d'export invalides"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return exports.reponse_export(
+        queryset, colonnes, nom, sortie, asynchrone=isinstance(request._request, ASGIRequest)
+    )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def admin_profilage(request):
+    """
+    Profil des vues de ce processus : durée p50/p95/p99, requêtes SQL, requêtes en double (admin)
+    DELETE remet les mesures à zéro.
+    """
+    if not request.user.is_admin:
+        return Response(
+            {'error': 'Accès réservé aux administrateurs'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if request.method == 'DELETE':
+        profiling.reinitialiser()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(profiling.resume())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def statistiques(request):
+    """
+    Statistiques agrégées des rendez-vous : statuts, modes, taux d'absence, chiffre
+    d'affaires et taux d'occupation (admin : tous ; professionnel : les siens)
+    Paramètres :
+    - date_debut : date de début (AAAA-MM-JJ), date_fin - 29 jours par défaut
+    - date_fin : date de fin incluse (AAAA-MM-JJ), aujourd'hui par défaut
+    - periode : jour (défaut), semaine ou mois
+    - par : professionnel, cabinet ou specialite (optionnel)
+    - professionnel_id, cabinet_id, specialite_id : filtres (optionnels)
+    """
+    try:
+        date_fin = request.GET.get('date_fin')
+        date_fin = datetime.strptime(date_fin, '%Y-%m-%d').date() if date_fin else timezone.localdate()
+        date_debut = request.GET.get('date_debut')
+        date_debut = (
+            datetime.strptime(date_debut, '%Y-%m-%d').date() if date_debut
+            else date_fin - timedelta(days=STATISTIQUES_JOURS_DEFAUT - 1)
+        )
+        filtres = {
+            nom: int(request.GET[nom]) if request.GET.get(nom) else None
+            for nom in ('professionnel_id', 'cabinet_id', 'specialite_id')
+        }
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres date_debut, date_fin ou identifiants invalides'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not request.user.is_admin:
+        professionnel_id = professionnel_connecte(request)
+        if professionnel_id is None:
+            return Response(
+                {'error': 'Accès réservé aux professionnels et administrateurs'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        filtres['professionnel_id'] = professionnel_id
+    
+    try:
+        resultat = analytics.statistiques(
+            date_debut, date_fin, periode=request.GET.get('periode', 'jour'),
+            dimension=request.GET.get('par') or None, **filtres
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(resultat)
@@ -0,0 +1,18 @@
+"""
+ASGI config for backend project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Connexions en ASGI : pool sur PostgreSQL, pas de connexions persistantes (voir settings.py)
+os.environ.setdefault('DJANGO_ASGI', '1')
+
+application = get_asgi_application()
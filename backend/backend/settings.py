@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'appointments.profiling.ProfilageMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -61,6 +62,10 @@ def env_bool(name: str, default: bool = False) -> bool:
         return default
     return val.strip().lower() in {"1", "true", "yes", "on"}
 
+def env_int(name: str) -> int | None:
+    val = os.getenv(name)
+    return int(val) if val else None
+
 SESSION_COOKIE_HTTPONLY = env_bool('SESSION_COOKIE_HTTPONLY', False)
 SESSION_COOKIE_SAMESITE = os.getenv('SESSION_COOKIE_SAMESITE', None)
 SESSION_COOKIE_SECURE = env_bool('SESSION_COOKIE_SECURE', False)
@@ -73,6 +78,82 @@ CSRF_TRUSTED_ORIGINS = os.getenv(
 
 SESSION_COOKIE_AGE = 86400
 
+# Cache partagé : 'file' (défaut, partagé entre workers d'une même machine), 'db'
+# (table créée par `manage.py createcachetable`) ou 'locmem' (par processus : un
+# seul processus, gunicorn.conf.py le refuse avec plusieurs workers). Les versions
+# des données de référence et des comptes professionnels y sont incrémentées : un
+# cache par processus laisserait les autres workers sur l'ancienne version
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/medi4ll-cache'),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'medi4ll_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Stockage des sessions (SESSION_BACKEND) :
+# - 'cached_db' (défaut avec un cache partagé) : lues dans le cache, écrites en
+#   cache et en base
+# - 'cache' : cache seul ; un cache vidé déconnecte tout le monde
+# - 'db' (défaut avec CACHE_BACKEND=locmem) : table django_session seule
+# - 'signed_cookies' : contenu signé dans le cookie, aucun stockage serveur ;
+#   une déconnexion n'invalide pas les copies du cookie avant SESSION_COOKIE_AGE
+# Avec locmem, chaque worker garderait sa propre copie des sessions en cache : une
+# déconnexion ne serait vue que par l'un d'eux.
+# La table django_session est purgée des sessions expirées par purger_sessions
+# (service sessions de docker-compose)
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'db' if CACHE_BACKEND == 'locmem' else 'cached_db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+
+# Utilisateur de la session mis en cache (voir appointments.authentication) ;
+# ModelBackend reste déclaré pour les sessions ouvertes avant son ajout
+AUTHENTICATION_BACKENDS = [
+    'appointments.authentication.UtilisateurEnCacheBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+UTILISATEUR_CACHE_TTL = int(os.getenv('UTILISATEUR_CACHE_TTL', '300'))
+
+# Hachage des mots de passe (voir appointments.hashers) : algorithme des nouveaux
+# hachages, puis les autres pour vérifier les anciens, réécrits à la connexion.
+# Coûts vides = défauts de Django
+HACHEURS = {
+    'pbkdf2': 'appointments.hashers.PBKDF2Hasher',
+    'argon2': 'appointments.hashers.Argon2Hasher',
+    'bcrypt': 'appointments.hashers.BCryptHasher',
+    'scrypt': 'appointments.hashers.ScryptHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [HACHEURS[PASSWORD_HASHER]] + [
+    chemin for nom, chemin in HACHEURS.items() if nom != PASSWORD_HASHER
+]
+
+
+PASSWORD_PBKDF2_ITERATIONS = env_int('PASSWORD_PBKDF2_ITERATIONS')
+PASSWORD_ARGON2_TIME_COST = env_int('PASSWORD_ARGON2_TIME_COST')
+PASSWORD_ARGON2_MEMORY_COST = env_int('PASSWORD_ARGON2_MEMORY_COST')
+PASSWORD_BCRYPT_ROUNDS = env_int('PASSWORD_BCRYPT_ROUNDS')
+PASSWORD_SCRYPT_WORK_FACTOR = env_int('PASSWORD_SCRYPT_WORK_FACTOR')
+
+# Processus de hachage par worker pour la connexion (0 : thread du worker)
+LOGIN_HACHAGE_PROCESSUS = int(os.getenv('LOGIN_HACHAGE_PROCESSUS', '1'))
+
+# Horizon (en semaines) des créneaux matérialisés par generer_creneaux
+CRENEAUX_HORIZON_SEMAINES = int(os.getenv('CRENEAUX_HORIZON_SEMAINES', '8'))
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -91,7 +172,28 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
-
+ASGI_APPLICATION = 'backend.asgi.application'
+
+
+# Connexions à la base :
+# - DJANGO_ASGI : posée par backend.asgi et gunicorn.conf.py (worker uvicorn par
+#   défaut) avant le chargement des réglages ; change les deux défauts ci-dessous
+# - DATABASE_CONN_MAX_AGE : secondes de réutilisation d'une connexion entre deux
+#   requêtes du même worker (défaut : 60 ; 0 = une connexion par requête).
+#   En ASGI, le défaut est 0 : le code synchrone y tourne dans des threads de
+#   sync_to_async dont les connexions persistantes ne sont pas refermées par le
+#   cycle de requête
+# - DATABASE_HEALTH_CHECKS : connexion réutilisée vérifiée en début de requête,
+#   rouverte si la base a redémarré
+# - DATABASE_POOL (PostgreSQL) : pool psycopg 3 par processus, de
+#   DATABASE_POOL_MIN à DATABASE_POOL_MAX connexions ; remplace CONN_MAX_AGE.
+#   Actif par défaut en ASGI, sans quoi chaque requête ouvrirait sa connexion.
+#   Prévoir workers x DATABASE_POOL_MAX <= max_connections
+# - DATABASE_PGBOUNCER (PostgreSQL) : derrière pgbouncer en mode transaction,
+#   curseurs côté serveur désactivés (ils ne survivent pas à la transaction)
+SERVI_EN_ASGI = env_bool('DJANGO_ASGI', False)
+CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', '0' if SERVI_EN_ASGI else '60'))
+CONN_HEALTH_CHECKS = env_bool('DATABASE_HEALTH_CHECKS', True)
 
 if os.getenv('DATABASE_HOST'):
     DATABASES = {
@@ -102,17 +204,59 @@ if os.getenv('DATABASE_HOST'):
             'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
             'HOST': os.getenv('DATABASE_HOST', 'localhost'),
             'PORT': os.getenv('DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': CONN_HEALTH_CHECKS,
+            'DISABLE_SERVER_SIDE_CURSORS': env_bool('DATABASE_PGBOUNCER', False),
+            'OPTIONS': {},
         }
     }
+    if env_bool('DATABASE_POOL', SERVI_EN_ASGI):
+        # Le pool gère lui-même la durée de vie des connexions ; CONN_HEALTH_CHECKS
+        # les fait vérifier à leur sortie du pool
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN', '2')),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX', '10')),
+            'timeout': int(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+            'max_idle': 300,
+        }
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                # Les transactions prennent le verrou d'écriture dès le BEGIN :
+                # les réservations concurrentes sont sérialisées au lieu d'échouer
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 
 
+# Données de référence (spécialités, cabinets, motifs) : durée de vie locale
+# sans revalidation, et durée de vie dans le cache partagé (secondes)
+REFERENCE_CACHE_TTL_LOCAL = int(os.getenv('REFERENCE_CACHE_TTL_LOCAL', '5'))
+REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', '3600'))
+
+# Notifications (rappels de rendez-vous) : classe d'envoi et fichier de FichierBackend
+NOTIFICATIONS_BACKEND = os.getenv('NOTIFICATIONS_BACKEND', 'appointments.notifications.ConsoleBackend')
+NOTIFICATIONS_FICHIER = os.getenv('NOTIFICATIONS_FICHIER', '/tmp/medi4ll-notifications.ndjson')
+# Les rappels partent pour les rendez-vous commençant dans les RAPPELS_DELAI_HEURES heures
+RAPPELS_DELAI_HEURES = int(os.getenv('RAPPELS_DELAI_HEURES', '24'))
+# cloturer_rendez_vous : les rendez-vous confirmés finis depuis CLOTURE_DELAI_HEURES heures
+# passent à 'termine', laissant ce délai au professionnel pour signaler une absence
+CLOTURE_DELAI_HEURES = int(os.getenv('CLOTURE_DELAI_HEURES', '24'))
+
+# Profilage (appointments/profiling.py) : fraction des requêtes mesurées (0 pour
+# désactiver) et nombre de mesures conservées par vue
+PROFILAGE_ECHANTILLON = float(os.getenv('PROFILAGE_ECHANTILLON', '1' if DEBUG else '0.02'))
+PROFILAGE_TAILLE = int(os.getenv('PROFILAGE_TAILLE', '1000'))
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
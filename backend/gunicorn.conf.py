@@ -0,0 +1,90 @@
+"""
+Configuration gunicorn, pilotée par variables d'environnement.
+
+- GUNICORN_WORKER_CLASS : uvicorn_worker.UvicornWorker (défaut, backend.asgi),
+  gthread ou sync (backend.wsgi)
+- GUNICORN_WORKERS : défaut 1 par cœur pour uvicorn (boucle d'événements),
+  2 x cœurs + 1 pour gthread / sync
+- GUNICORN_THREADS : threads par worker gthread (défaut : 4)
+- GUNICORN_PRELOAD : l'application est chargée une fois dans le maître avant le
+  fork (défaut : 1) ; les workers démarrent plus vite et partagent ses pages
+  mémoire en copie sur écriture. Un redémarrage à chaud (HUP) ne recharge alors
+  pas le code : redéployer en relançant le conteneur
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER : recyclage d'un worker
+  après ce nombre de requêtes (défaut : 1000 ± 100), l'aléa évite que tous les
+  workers redémarrent en même temps
+- GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE (secondes)
+- GUNICORN_BIND, GUNICORN_LOG_LEVEL
+
+Les migrations ne sont pas appliquées ici : service migrate de docker-compose.
+"""
+import gc
+import os
+
+
+def _entier(nom, defaut):
+    return int(os.getenv(nom, defaut))
+
+
+def _coeurs():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+if worker_class in ('sync', 'gthread'):
+    wsgi_app = 'backend.wsgi:application'
+    workers = _entier('GUNICORN_WORKERS', 2 * _coeurs() + 1)
+else:
+    wsgi_app = 'backend.asgi:application'
+    workers = _entier('GUNICORN_WORKERS', _coeurs())
+threads = _entier('GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+if wsgi_app == 'backend.asgi:application':
+    # Avant tout chargement des réglages : pool sur PostgreSQL, pas de connexions
+    # persistantes (voir DJANGO_ASGI dans backend/settings.py)
+    os.environ.setdefault('DJANGO_ASGI', '1')
+
+from backend import settings as reglages  # noqa: E402
+
+# Cache par processus : chaque worker aurait ses propres versions des données de
+# référence et des comptes, ses sessions et utilisateurs en cache ; une invalidation
+# (ou une déconnexion) ne serait vue que par le worker qui l'a faite
+if workers > 1 and reglages.CACHE_BACKEND == 'locmem':
+    raise RuntimeError(f'CACHE_BACKEND=locmem avec {workers} workers : choisir CACHE_BACKEND=file ou db')
+
+# Sans pool ni connexions persistantes, chaque requête ouvrirait sa connexion
+# PostgreSQL (sauf derrière pgbouncer, qui les garde ouvertes côté serveur)
+_base = reglages.DATABASES['default']
+if (_base['ENGINE'] == 'django.db.backends.postgresql' and not _base['OPTIONS'].get('pool')
+        and not _base['CONN_MAX_AGE'] and not _base['DISABLE_SERVER_SIDE_CURSORS']):
+    raise RuntimeError('PostgreSQL sans DATABASE_POOL ni DATABASE_CONN_MAX_AGE : une connexion par requête')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+max_requests = _entier('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _entier('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+timeout = _entier('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _entier('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _entier('GUNICORN_KEEPALIVE', 5)
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+# Fichier de battement de cœur en mémoire : /tmp peut être un disque lent en conteneur
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def when_ready(server):
+    # Objets chargés par le maître sortis du ramasse-miettes : ses passes dans les
+    # workers ne réécrivent plus leurs en-têtes, les pages restent partagées
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Une connexion ouverte par le maître ne doit pas être partagée entre processus
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
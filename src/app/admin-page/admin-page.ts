@@ -3,6 +3,7 @@ import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { HttpClient } from '@angular/common/http';
 import { Navbar } from '../navbar/navbar';
+import { PageCurseur } from '../services/rendezvous.service';
 
 interface Professionnel {
   id?: number;
@@ -90,6 +91,14 @@ export class AdminPage implements OnInit {
   pageRendezVous = signal(1);
   pageClients = signal(1);
   parPage = 20;
+  taillePageApi = 100;
+
+  totalProfessionnels = signal(0);
+  totalRendezVous = signal(0);
+  totalClients = signal(0);
+  cursorProfessionnels = signal<string | null>(null);
+  cursorRendezVous = signal<string | null>(null);
+  cursorClients = signal<string | null>(null);
   
   successMessage = signal('');
   errorMessage = signal('');
@@ -108,11 +117,28 @@ export class AdminPage implements OnInit {
     this.isEditingProf.set(false);
   }
 
-  loadProfessionnels() {
-    this.http.get<Professionnel[]>(`${this.apiUrl}/professionnels/manage/`, {
-      withCredentials: true
+  pageParams(cursor: string | null): Record<string, string> {
+    const params: Record<string, string> = { page_size: String(this.taillePageApi) };
+    if (cursor) {
+      params['cursor'] = cursor;
+    } else {
+      params['count'] = 'approx';
+    }
+    return params;
+  }
+
+  loadProfessionnels(cursor: string | null = null) {
+    this.http.get<PageCurseur<Professionnel>>(`${this.apiUrl}/professionnels/manage/`, {
+      withCredentials: true,
+      params: this.pageParams(cursor)
     }).subscribe({
-      next: (data) => this.professionnels.set(data),
+      next: (data) => {
+        this.professionnels.set(cursor ? [...this.professionnels(), ...data.results] : data.results);
+        this.cursorProfessionnels.set(data.next_cursor);
+        if (!cursor) {
+          this.totalProfessionnels.set(data.count ?? data.results.length);
+        }
+      },
       error: (err) => {
         console.error('Erreur chargement:', err);
         this.errorMessage.set('Erreur de chargement des professionnels');
@@ -128,11 +154,18 @@ export class AdminPage implements OnInit {
     });
   }
 
-  loadRendezVous() {
-    this.http.get<RendezVous[]>(`${this.apiUrl}/admin/rendez-vous/`, {
-      withCredentials: true
+  loadRendezVous(cursor: string | null = null) {
+    this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/admin/rendez-vous/`, {
+      withCredentials: true,
+      params: this.pageParams(cursor)
     }).subscribe({
-      next: (data) => this.rendezVous.set(data),
+      next: (data) => {
+        this.rendezVous.set(cursor ? [...this.rendezVous(), ...data.results] : data.results);
+        this.cursorRendezVous.set(data.next_cursor);
+        if (!cursor) {
+          this.totalRendezVous.set(data.count ?? data.results.length);
+        }
+      },
       error: (err) => {
         console.error('Erreur chargement rendez-vous:', err);
         this.errorMessage.set('Erreur de chargement des rendez-vous');
@@ -140,11 +173,18 @@ export class AdminPage implements OnInit {
     });
   }
 
-  loadClients() {
-    this.http.get<Client[]>(`${this.apiUrl}/admin/clients/`, {
-      withCredentials: true
+  loadClients(cursor: string | null = null) {
+    this.http.get<PageCurseur<Client>>(`${this.apiUrl}/admin/clients/`, {
+      withCredentials: true,
+      params: this.pageParams(cursor)
     }).subscribe({
-      next: (data) => this.clients.set(data),
+      next: (data) => {
+        this.clients.set(cursor ? [...this.clients(), ...data.results] : data.results);
+        this.cursorClients.set(data.next_cursor);
+        if (!cursor) {
+          this.totalClients.set(data.count ?? data.results.length);
+        }
+      },
       error: (err) => {
         console.error('Erreur chargement clients:', err);
         this.errorMessage.set('Erreur de chargement des clients');
@@ -281,20 +321,24 @@ export class AdminPage implements OnInit {
   }
 
   getTotalPagesProfessionnels(): number {
-    return Math.ceil(this.professionnels().length / this.parPage);
+    return Math.ceil(Math.max(this.totalProfessionnels(), this.professionnels().length) / this.parPage);
   }
 
   getTotalPagesRendezVous(): number {
-    return Math.ceil(this.rendezVous().length / this.parPage);
+    return Math.ceil(Math.max(this.totalRendezVous(), this.rendezVous().length) / this.parPage);
   }
 
   getTotalPagesClients(): number {
-    return Math.ceil(this.clients().length / this.parPage);
+    return Math.ceil(Math.max(this.totalClients(), this.clients().length) / this.parPage);
   }
 
   nextPageProfessionnels() {
     if (this.pageProfessionnels() < this.getTotalPagesProfessionnels()) {
       this.pageProfessionnels.set(this.pageProfessionnels() + 1);
+      const cursor = this.cursorProfessionnels();
+      if (cursor && this.pageProfessionnels() * this.parPage > this.professionnels().length) {
+        this.loadProfessionnels(cursor);
+      }
     }
   }
 
@@ -307,6 +351,10 @@ export class AdminPage implements OnInit {
   nextPageRendezVous() {
     if (this.pageRendezVous() < this.getTotalPagesRendezVous()) {
       this.pageRendezVous.set(this.pageRendezVous() + 1);
+      const cursor = this.cursorRendezVous();
+      if (cursor && this.pageRendezVous() * this.parPage > this.rendezVous().length) {
+        this.loadRendezVous(cursor);
+      }
     }
   }
 
@@ -319,6 +367,10 @@ export class AdminPage implements OnInit {
   nextPageClients() {
     if (this.pageClients() < this.getTotalPagesClients()) {
       this.pageClients.set(this.pageClients() + 1);
+      const cursor = this.cursorClients();
+      if (cursor && this.pageClients() * this.parPage > this.clients().length) {
+        this.loadClients(cursor);
+      }
     }
   }
 
@@ -50,7 +50,7 @@ export class Navbar {
   }
 
   checkIfProfessionnel(): void {
-    this.http.get('/api/rendez-vous/professionnel/', { withCredentials: true }).subscribe({
+    this.http.get('/api/rendez-vous/professionnel/', { params: { page_size: '1' }, withCredentials: true }).subscribe({
       next: () => {
         this.isProfessionnelSignal.set(true);
       },
@@ -4,6 +4,7 @@ import { FormsModule } from '@angular/forms';
 import { HttpClient } from '@angular/common/http';
 import { Navbar } from '../navbar/navbar';
 import { ConstantsService } from '../services/constants.service';
+import { PageCurseur } from '../services/rendezvous.service';
 
 interface User {
   id: number;
@@ -43,8 +44,11 @@ interface RendezVous {
   statut: string;
   mode: string;
   notes_patient: string;
+  absence_a_verifier: boolean;
 }
 
+type FiltreRendezVous = 'tous' | 'a_venir' | 'a_verifier';
+
 interface ProfessionnelProfile {
   id: number;
   nom: string;
@@ -97,7 +101,11 @@ export class ProfilPage implements OnInit {
   isEditingProfile = signal(false);
   
   rendezVousPatient = signal<RendezVous[]>([]);
+  cursorRendezVousPatient = signal<string | null>(null);
+  filtreRendezVousPatient = signal<FiltreRendezVous>('tous');
   rendezVousProfessionnel = signal<RendezVous[]>([]);
+  cursorRendezVousProfessionnel = signal<string | null>(null);
+  filtreRendezVousProfessionnel = signal<FiltreRendezVous>('tous');
   isProfessionnel = signal(false);
   activeTab = signal<'profile' | 'rdv-patient' | 'rdv-pro'>('profile');
 
@@ -142,10 +150,33 @@ export class ProfilPage implements OnInit {
     });
   }
 
+  // a_venir=1 : confirmés à partir d'aujourd'hui ; a_verifier=1 : clôturés automatiquement, présence à confirmer
+  paramsRendezVous(filtre: FiltreRendezVous, cursor: string | null = null): Record<string, string> {
+    const params: Record<string, string> = filtre === 'tous' ? {} : { [filtre]: '1' };
+    if (cursor) {
+      params['cursor'] = cursor;
+    }
+    return params;
+  }
+
+  setFiltreRendezVousPatient(filtre: FiltreRendezVous) {
+    this.filtreRendezVousPatient.set(filtre);
+    this.loadRendezVousPatient();
+  }
+
+  setFiltreRendezVousProfessionnel(filtre: FiltreRendezVous) {
+    this.filtreRendezVousProfessionnel.set(filtre);
+    this.loadRendezVousProfessionnel();
+  }
+
   loadRendezVousPatient() {
-    this.http.get<RendezVous[]>(`${this.apiUrl}/rendez-vous/`, { withCredentials: true }).subscribe({
+    this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/rendez-vous/`, {
+      params: this.paramsRendezVous(this.filtreRendezVousPatient()),
+      withCredentials: true
+    }).subscribe({
       next: (data) => {
-        this.rendezVousPatient.set(data);
+        this.rendezVousPatient.set(data.results);
+        this.cursorRendezVousPatient.set(data.next_cursor);
       },
       error: (err) => {
         console.error('Erreur chargement rendez-vous patient:', err);
@@ -154,10 +185,11 @@ export class ProfilPage implements OnInit {
   }
 
   checkIfProfessionnel() {
-    this.http.get<RendezVous[]>(`${this.apiUrl}/rendez-vous/professionnel/`, { withCredentials: true }).subscribe({
+    this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/rendez-vous/professionnel/`, { withCredentials: true }).subscribe({
       next: (data) => {
         this.isProfessionnel.set(true);
-        this.rendezVousProfessionnel.set(data);
+        this.rendezVousProfessionnel.set(data.results);
+        this.cursorRendezVousProfessionnel.set(data.next_cursor);
         this.loadProfessionnelProfile();
         this.loadDisponibilitesProfessionnel();
         this.loadCabinets();
@@ -191,16 +223,27 @@ export class ProfilPage implements OnInit {
     });
   }
 
+  loadRendezVousProfessionnel() {
+    this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/rendez-vous/professionnel/`, {
+      params: this.paramsRendezVous(this.filtreRendezVousProfessionnel()),
+      withCredentials: true
+    }).subscribe({
+      next: (data) => {
+        this.rendezVousProfessionnel.set(data.results);
+        this.cursorRendezVousProfessionnel.set(data.next_cursor);
+      },
+      error: (err) => {
+        console.error('Erreur chargement rendez-vous professionnel:', err);
+      }
+    });
+  }
+
   updateRendezVousStatut(rdvId: number, nouveauStatut: string) {
     this.http.put(`${this.apiUrl}/rendez-vous/${rdvId}/statut/`, { statut: nouveauStatut }, { withCredentials: true }).subscribe({
       next: () => {
-        this.http.get<RendezVous[]>(`${this.apiUrl}/rendez-vous/professionnel/`, { withCredentials: true }).subscribe({
-          next: (data) => {
-            this.rendezVousProfessionnel.set(data);
-            this.successMessage.set('Statut mis à jour');
-            setTimeout(() => this.successMessage.set(''), 3000);
-          }
-        });
+        this.loadRendezVousProfessionnel();
+        this.successMessage.set('Statut mis à jour');
+        setTimeout(() => this.successMessage.set(''), 3000);
       },
       error: (err) => {
         console.error('Erreur mise à jour statut:', err);
@@ -209,6 +252,40 @@ export class ProfilPage implements OnInit {
     });
   }
 
+  loadMoreRendezVousPatient() {
+    const cursor = this.cursorRendezVousPatient();
+    if (!cursor) return;
+    this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/rendez-vous/`, {
+      params: this.paramsRendezVous(this.filtreRendezVousPatient(), cursor),
+      withCredentials: true
+    }).subscribe({
+      next: (data) => {
+        this.rendezVousPatient.set([...this.rendezVousPatient(), ...data.results]);
+        this.cursorRendezVousPatient.set(data.next_cursor);
+      },
+      error: (err) => {
+        console.error('Erreur chargement rendez-vous patient:', err);
+      }
+    });
+  }
+
+  loadMoreRendezVousProfessionnel() {
+    const cursor = this.cursorRendezVousProfessionnel();
+    if (!cursor) return;
+    this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/rendez-vous/professionnel/`, {
+      params: this.paramsRendezVous(this.filtreRendezVousProfessionnel(), cursor),
+      withCredentials: true
+    }).subscribe({
+      next: (data) => {
+        this.rendezVousProfessionnel.set([...this.rendezVousProfessionnel(), ...data.results]);
+        this.cursorRendezVousProfessionnel.set(data.next_cursor);
+      },
+      error: (err) => {
+        console.error('Erreur chargement rendez-vous professionnel:', err);
+      }
+    });
+  }
+
   getStatutBadgeClass(statut: string): string {
     return this.constantsService.getStatutBadgeClass(statut);
   }
@@ -45,9 +45,19 @@ export class Reservation implements OnInit {
   loadRendezVous() {
     this.isLoading.set(true);
     this.errorMessage.set('');
-    this.rendezvousService.getRendezVous().subscribe({
+    this.rendezVousList.set([]);
+    this.loadPageRendezVous(null);
+  }
+
+  // Le calendrier a besoin de tous les rendez-vous : les pages sont suivies jusqu'à la dernière
+  loadPageRendezVous(cursor: string | null) {
+    this.rendezvousService.getRendezVous(cursor).subscribe({
       next: (data) => {
-        this.rendezVousList.set(data);
+        this.rendezVousList.set([...this.rendezVousList(), ...data.results]);
+        if (data.next_cursor) {
+          this.loadPageRendezVous(data.next_cursor);
+          return;
+        }
         this.isLoading.set(false);
         this.generateCalendar(); 
       },
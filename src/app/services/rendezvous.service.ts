@@ -47,6 +47,13 @@ export interface RendezVous {
   date_creation: string;
 }
 
+export interface PageCurseur<T> {
+  results: T[];
+  next_cursor: string | null;
+  count?: number;
+  count_exact?: boolean;
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -54,22 +61,28 @@ export class RendezvousService {
   private http = inject(HttpClient);
   private apiUrl = '/api';
 
-  getRendezVous(): Observable<RendezVous[]> {
+  getRendezVous(cursor: string | null = null, pageSize = 200): Observable<PageCurseur<RendezVous>> {
     const user = localStorage.getItem('currentUser');
     
     if (!user) {
       return new Observable(observer => {
-        observer.next([]);
+        observer.next({ results: [], next_cursor: null });
         observer.complete();
       });
     }
 
+    const params: Record<string, string> = { page_size: String(pageSize) };
+    if (cursor) {
+      params['cursor'] = cursor;
+    }
+
     const headers = new HttpHeaders({
       'Content-Type': 'application/json'
     });
     
-    return this.http.get<RendezVous[]>(`${this.apiUrl}/rendez-vous/`, { 
+    return this.http.get<PageCurseur<RendezVous>>(`${this.apiUrl}/rendez-vous/`, { 
       headers,
+      params,
       withCredentials: true 
     });
   }